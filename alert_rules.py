@@ -0,0 +1,345 @@
+import json
+import time
+from collections import namedtuple
+import numpy as np
+
+RULE_TYPES = ("above", "below", "pct_move", "ma_cross", "volume_spike")
+
+# Hysteresis defaults, in the unit each rule compares (see RuleEngine._compile)
+DEFAULT_HYSTERESIS = {"price_pct": 0.5, "pct_move": 0.25, "ma_cross": 0.1, "volume_spike": 0.5}
+DEFAULT_COOLDOWN = 300
+
+Alert = namedtuple("Alert", ["time", "name", "ticker", "type", "value", "level", "message"])
+
+
+# --- SINKS ---
+class ConsoleSink:
+    def send(self, alert):
+        print(f"  ⚠️ ALERT: {alert.message}")
+
+
+class JsonlSink:
+    """Appends one JSON line per alert"""
+
+    def __init__(self, path="alerts.jsonl"):
+        self.path = path
+
+    def send(self, alert):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(alert._asdict()) + "\n")
+
+
+class WebhookSink:
+    """POSTs each alert as JSON (e.g. to a chat incoming-webhook URL)"""
+
+    def __init__(self, url, timeout=5):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, alert):
+        import urllib.request
+        body = json.dumps({"text": alert.message, **alert._asdict()}).encode()
+        request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        try:
+            urllib.request.urlopen(request, timeout=self.timeout).close()
+        except OSError as e:
+            print(f"Webhook failed for {alert.ticker}: {e}")
+
+
+class CallbackSink:
+    def __init__(self, callback):
+        self.callback = callback
+
+    def send(self, alert):
+        self.callback(alert)
+
+
+SINKS = {"console": ConsoleSink, "jsonl": JsonlSink, "webhook": WebhookSink}
+
+
+def make_sinks(configs):
+    return [SINKS[c["type"]](**{k: v for k, v in c.items() if k != "type"}) for c in configs]
+
+
+# --- FEATURES ---
+class FeatureLayout:
+    """Row index of every feature the rules need; each row holds one value per ticker"""
+
+    def __init__(self, ma_windows=(), volume_windows=()):
+        self.ma_windows = sorted(set(ma_windows))
+        self.volume_windows = sorted(set(volume_windows))
+        self.rows = {"price": 0, "pct_move": 1}
+        for w in self.ma_windows:
+            self.rows[("ma", w)] = len(self.rows)
+        for w in self.volume_windows:
+            self.rows[("volume", w)] = len(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+
+def features_from_frames(layout, tickers, frames):
+    """Feature matrix (features x tickers) from per-ticker bar frames.
+
+    pct_move is the % change from the open of the last bar's session; ma rows
+    are the % distance of the price from its moving average; volume rows are
+    the last bar's volume over the average of the previous `window` bars.
+    """
+    features = np.full((len(layout), len(tickers)), np.nan)
+    for j, ticker in enumerate(tickers):
+        frame = frames.get(ticker)
+        if frame is None or frame.empty:
+            continue
+        close = frame["Close"].to_numpy(dtype=float)
+        price = close[-1]
+        features[0, j] = price
+        session = frame.index.normalize() == frame.index[-1].normalize()
+        reference = frame["Open"].to_numpy(dtype=float)[session.argmax()] if "Open" in frame else close[0]
+        features[1, j] = (price / reference - 1) * 100
+        for w in layout.ma_windows:
+            if len(close) >= w:
+                features[layout.rows[("ma", w)], j] = (price / close[-w:].mean() - 1) * 100
+        if "Volume" in frame:
+            volume = frame["Volume"].to_numpy(dtype=float)
+            for w in layout.volume_windows:
+                if len(volume) > w:
+                    average = volume[-w - 1:-1].mean()
+                    features[layout.rows[("volume", w)], j] = volume[-1] / average if average > 0 else np.nan
+    return features
+
+
+DAY_NS = 86_400_000_000_000
+
+
+def features_from_windows(layout, tickers, windows, columns=None, out=None):
+    """Feature matrix from per-ticker (ts ns, price, volume) arrays, e.g. TickStore.window views.
+
+    Same features as features_from_frames, with the session reference being the
+    first tick of the last tick's (UTC) day. Only reads the arrays, so views
+    of a ring buffer work without copying. With out and columns, only those
+    ticker columns of an existing matrix are recomputed.
+    """
+    features = np.full((len(layout), len(tickers)), np.nan) if out is None else out
+    for j in range(len(tickers)) if columns is None else columns:
+        ticker = tickers[j]
+        features[:, j] = np.nan
+        ts, close, volume = windows(ticker)
+        if not len(close):
+            continue
+        price = close[-1]
+        features[0, j] = price
+        day = ts // DAY_NS
+        features[1, j] = (price / close[np.searchsorted(day, day[-1])] - 1) * 100
+        for w in layout.ma_windows:
+            if len(close) >= w:
+                features[layout.rows[("ma", w)], j] = (price / (close[-w:].sum() / w) - 1) * 100
+        for w in layout.volume_windows:
+            if len(volume) > w:
+                average = volume[-w - 1:-1].sum() / w
+                features[layout.rows[("volume", w)], j] = volume[-1] / average if average > 0 else np.nan
+    return features
+
+
+# --- ENGINE ---
+class RuleEngine:
+    """Alert rules compiled into arrays and checked for all tickers in one pass per tick.
+
+    Every rule reduces to "feature x is beyond level in direction sign": the
+    value it watches is x = features[row, ticker]. A rule fires when the
+    condition becomes true while armed, then disarms until x moves back past
+    level by its hysteresis, so it fires once per crossing. A per-rule
+    cooldown also suppresses re-fires when a price flaps around the level; a
+    crossing held back by the cooldown stays armed and fires once the cooldown
+    has passed if x is still beyond the level. Level and MA-cross rules start
+    armed only if the first value seen is on the near side of the level, so a
+    price already past it at startup is not reported as a crossing.
+    """
+
+    def __init__(self, rules, sinks=(), defaults=None):
+        defaults = defaults or {}
+        rules = self._dedupe(rules)
+        self.rules = rules
+        self.sinks = list(sinks)
+        self.tickers = sorted({r["ticker"] for r in rules})
+        self._column = {t: j for j, t in enumerate(self.tickers)}
+        self._window_features = None
+        self.layout = FeatureLayout(
+            [r.get("window", 20) for r in rules if r["type"] == "ma_cross"],
+            [r.get("window", 30) for r in rules if r["type"] == "volume_spike"],
+        )
+
+        n = len(rules)
+        self.ticker_index = np.empty(n, dtype=np.int64)
+        self.row = np.empty(n, dtype=np.int64)
+        self.level = np.empty(n)
+        self.sign = np.empty(n)
+        self.absolute = np.zeros(n, dtype=bool)
+        self.hysteresis = np.empty(n)
+        self.cooldown = np.empty(n)
+        for i, rule in enumerate(rules):
+            self.ticker_index[i] = self._column[rule["ticker"]]
+            row, level, sign, absolute, hysteresis = self._compile(rule, defaults)
+            self.row[i], self.level[i], self.sign[i], self.absolute[i], self.hysteresis[i] = \
+                row, level, sign, absolute, hysteresis
+            self.cooldown[i] = rule.get("cooldown_seconds", defaults.get("cooldown_seconds", DEFAULT_COOLDOWN))
+        self.armed = np.ones(n, dtype=bool)
+        # Crossing rules take their armed state from the first value seen
+        self.observed = np.array([r["type"] not in ("above", "below", "ma_cross") for r in rules], dtype=bool)
+        self.last_fired = np.full(n, -np.inf)
+        self.price_driven = np.array([r["type"] != "volume_spike" for r in rules], dtype=bool)
+
+    @staticmethod
+    def _dedupe(rules):
+        seen, unique = set(), []
+        for rule in rules:
+            if rule["type"] not in RULE_TYPES:
+                raise ValueError(f"Unknown rule type {rule['type']!r} for {rule.get('ticker')}")
+            key = json.dumps({k: v for k, v in rule.items() if k != "name"}, sort_keys=True)
+            if key not in seen:
+                seen.add(key)
+                unique.append(rule)
+        return unique
+
+    def _compile(self, rule, defaults):
+        """(feature row, level, sign, compare |x|, hysteresis) for one rule"""
+        kind = rule["type"]
+        if kind in ("above", "below"):
+            level = float(rule["value"])
+            pct = rule.get("hysteresis_pct", defaults.get("hysteresis_pct", DEFAULT_HYSTERESIS["price_pct"]))
+            return 0, level, 1.0 if kind == "above" else -1.0, False, abs(level) * pct / 100
+        hysteresis = rule.get("hysteresis", defaults.get("hysteresis", {}).get(kind, DEFAULT_HYSTERESIS[kind]))
+        if kind == "pct_move":
+            direction = rule.get("direction", "any")
+            level = float(rule["value"])
+            if direction == "down":
+                return 1, -level, -1.0, False, hysteresis
+            return 1, level, 1.0, direction == "any", hysteresis
+        if kind == "ma_cross":
+            row = self.layout.rows[("ma", rule.get("window", 20))]
+            return row, 0.0, 1.0 if rule.get("direction", "above") == "above" else -1.0, False, hysteresis
+        row = self.layout.rows[("volume", rule.get("window", 30))]
+        return row, float(rule.get("value", 3.0)), 1.0, False, hysteresis
+
+    def evaluate(self, features, now=None):
+        """Check every rule against a (features x tickers) matrix; returns the alerts fired"""
+        now = time.time() if now is None else now
+        raw = features[self.row, self.ticker_index]
+        x = np.where(self.absolute, np.abs(raw), raw)
+        distance = self.sign * (x - self.level)
+        known = np.isfinite(distance)
+        beyond = known & (distance > 0)
+        rearm = known & (distance < -self.hysteresis)
+        first = known & ~self.observed
+        self.armed[first] = ~beyond[first]
+        self.observed |= known
+
+        crossing = beyond & self.armed
+        fire = crossing & (now - self.last_fired >= self.cooldown)
+        self.armed = (self.armed & ~fire) | rearm
+        self.last_fired[fire] = now
+
+        alerts = [self._alert(i, raw[i], features[0, self.ticker_index[i]], now) for i in np.flatnonzero(fire)]
+        for alert in alerts:
+            for sink in self.sinks:
+                sink.send(alert)
+        return alerts
+
+    def margins(self, features=None):
+        """Per ticker, the smallest relative price move that would trip one of its armed rules.
+
+        Price rules measure in dollars and pct_move/ma_cross in percent of the
+        price, so both convert to a fraction of the price; volume rules don't
+        depend on price and are ignored. inf when a ticker has no such rule.
+        Defaults to the features of the last check_windows call.
+        """
+        features = self._window_features if features is None else features
+        margins = np.full(len(self.tickers), np.inf)
+        if features is None:
+            return margins
+        raw = features[self.row, self.ticker_index]
+        x = np.where(self.absolute, np.abs(raw), raw)
+        price = features[0, self.ticker_index]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            relative = np.maximum(self.sign * (self.level - x), 0) / np.where(self.row == 0, price, 100.0)
+        use = self.armed & self.price_driven & np.isfinite(relative)
+        np.minimum.at(margins, self.ticker_index[use], relative[use])
+        return margins
+
+    def _alert(self, i, value, price, now):
+        rule = self.rules[i]
+        ticker, kind = rule["ticker"], rule["type"]
+        if kind in ("above", "below"):
+            message = f"{ticker} is {kind} ${rule['value']} (now ${price:,.2f})"
+        elif kind == "pct_move":
+            message = f"{ticker} moved {value:+.2f}% since the session open (now ${price:,.2f})"
+        elif kind == "ma_cross":
+            message = f"{ticker} crossed {rule.get('direction', 'above')} its {rule.get('window', 20)}-bar MA " \
+                      f"(now ${price:,.2f})"
+        else:
+            message = f"{ticker} volume is {value:.1f}x its {rule.get('window', 30)}-bar average"
+        name = rule.get("name", f"{ticker} {kind}")
+        return Alert(now, name, ticker, kind, float(value), float(self.level[i]), message)
+
+    def check_frames(self, frames, now=None):
+        return self.evaluate(features_from_frames(self.layout, self.tickers, frames), now)
+
+    def check_windows(self, windows, changed=None, now=None):
+        """windows(ticker) -> (ts, price, volume) arrays, as TickStore.window provides.
+
+        With changed (tickers that got ticks since the last call), only their
+        feature columns are recomputed; the rest are reused from the last call.
+        """
+        if changed is None or self._window_features is None:
+            self._window_features = features_from_windows(self.layout, self.tickers, windows)
+        else:
+            columns = [self._column[t] for t in changed if t in self._column]
+            features_from_windows(self.layout, self.tickers, windows, columns, self._window_features)
+        return self.evaluate(self._window_features, now)
+
+
+def load_rules(path="alert_rules.json", extra_sinks=()):
+    """RuleEngine and watchlist from a JSON config file"""
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    sinks = make_sinks(config.get("sinks", [{"type": "console"}])) + list(extra_sinks)
+    engine = RuleEngine(config["rules"], sinks, config.get("defaults"))
+    watchlist = list(dict.fromkeys(config.get("watchlist", []) + engine.tickers))
+    return engine, watchlist
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Time one vectorized pass over many rules and tickers")
+    parser.add_argument("--tickers", type=int, default=5000)
+    parser.add_argument("--rules-per-ticker", type=int, default=4)
+    parser.add_argument("--ticks", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    tickers = [f"T{i}" for i in range(args.tickers)]
+    kinds = ["below", "above", "pct_move", "ma_cross", "volume_spike"]
+    rules = []
+    for ticker in tickers:
+        for k in range(args.rules_per_ticker):
+            kind = kinds[k % len(kinds)]
+            rule = {"ticker": ticker, "type": kind, "value": {"below": 95, "above": 105, "pct_move": 2,
+                                                              "volume_spike": 3}.get(kind, 0)}
+            if kind == "ma_cross":
+                rule["window"] = 20
+            rules.append(rule)
+    fired = []
+    engine = RuleEngine(rules, [CallbackSink(fired.append)], {"cooldown_seconds": 0})
+
+    price = np.full(args.tickers, 100.0)
+    features = np.zeros((len(engine.layout), args.tickers))
+    t0 = time.perf_counter()
+    for tick in range(args.ticks):
+        price *= np.exp(rng.normal(0, 0.005, args.tickers))
+        features[0] = price
+        features[1] = (price / 100 - 1) * 100
+        features[2:] = rng.normal(0, 1, (len(engine.layout) - 2, args.tickers))
+        engine.evaluate(features, now=tick)
+    elapsed = time.perf_counter() - t0
+    print(f"{len(engine.rules)} rules over {args.tickers} tickers: {elapsed / args.ticks * 1000:.2f} ms per tick, "
+          f"{len(fired)} alerts in {args.ticks} ticks")
@@ -0,0 +1,359 @@
+import json
+import os
+import queue
+import re
+import sys
+import time
+from datetime import datetime
+
+PROMPT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "RTCFR_prompt.txt")
+SEVERITIES = ["P0", "P1", "P2", "P3"]
+
+# --- RULES ---
+# (pattern, severity, category). CPU/memory/disk thresholds are handled in classify_with_rules.
+RULES = [
+    (re.compile(r"connection pool (is )?exhausted|too many connections|max_connections"), "P0", "connections"),
+    (re.compile(r"\b(database|instance|server|node|cluster) (is )?(down|unreachable|not responding)"), "P0", "availability"),
+    (re.compile(r"replication (is )?(broken|stopped|failed)|replica (is )?down"), "P0", "replication"),
+    (re.compile(r"\b(corruption|corrupted|data loss)\b"), "P0", "integrity"),
+    (re.compile(r"failover (started|triggered|in progress)"), "P1", "availability"),
+    (re.compile(r"replication lag"), "P1", "replication"),
+    (re.compile(r"deadlock"), "P1", "locking"),
+    (re.compile(r"lock wait timeout|blocking sessions?"), "P2", "locking"),
+    (re.compile(r"slow quer(y|ies)|long[- ]running quer(y|ies)"), "P2", "performance"),
+    (re.compile(r"backup (failed|missed)"), "P2", "backup"),
+    (re.compile(r"backup (completed|succeeded)|maintenance (window|completed)"), "P3", "informational"),
+]
+RESOURCE_PATTERN = re.compile(r"\b(cpu|memory|disk|storage)\b[^%\d]*(\d+(?:\.\d+)?)\s*%")
+RESOURCE_THRESHOLDS = [(95, "P0"), (80, "P1"), (60, "P2")]
+HOST_PATTERN = re.compile(r"\bon\s+([a-z0-9][\w.-]*)")
+NUMBER_PATTERN = re.compile(r"\d+(?:\.\d+)?")
+
+
+def classify_with_rules(message):
+    """Return (severity, category) for well-known alert patterns, or None if ambiguous"""
+    text = message.lower()
+    result = None
+    for pattern, severity, category in RULES:
+        if pattern.search(text):
+            result = (severity, category)
+            break
+    if result is None:
+        match = RESOURCE_PATTERN.search(text)
+        if match:
+            value = float(match.group(2))
+            severity = next((sev for limit, sev in RESOURCE_THRESHOLDS if value >= limit), "P3")
+            result = (severity, match.group(1))
+    return result
+
+
+# --- INPUT ---
+def _parse_timestamp(value):
+    if value is None:
+        return time.time()
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+
+
+def parse_alert(line):
+    """Alert dict from a JSON line ({"message", "timestamp", "host"}) or a plain text line"""
+    line = line.strip()
+    if not line:
+        return None
+    if line.startswith("{"):
+        record = json.loads(line)
+        message = record.get("message") or record.get("alert") or ""
+        timestamp = _parse_timestamp(record.get("timestamp"))
+        host = record.get("host")
+    else:
+        message, timestamp, host = line.strip('"'), time.time(), None
+    if host is None:
+        match = HOST_PATTERN.search(message.lower())
+        host = match.group(1) if match else "unknown"
+    return {"message": message, "timestamp": timestamp, "host": host}
+
+
+def read_alert_file(path):
+    """Alerts from a JSONL/text file, or stdin when path is '-'"""
+    stream = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        for line in stream:
+            alert = parse_alert(line)
+            if alert:
+                yield alert
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def read_alert_queue(alert_queue, idle_timeout=1.0):
+    """Alerts from a local queue.Queue until None is put or it stays empty for idle_timeout"""
+    while True:
+        try:
+            item = alert_queue.get(timeout=idle_timeout)
+        except queue.Empty:
+            return
+        if item is None:
+            return
+        alert = parse_alert(item) if isinstance(item, str) else item
+        if alert:
+            yield alert
+
+
+# --- GROUPING ---
+def fingerprint(alert):
+    """Alerts that differ only in numbers (percentages, durations, counts) share a fingerprint"""
+    return alert["host"], NUMBER_PATTERN.sub("#", alert["message"].lower())
+
+
+def _close_expired(open_groups, now, window):
+    """Pop and yield groups whose window has passed before now (all of them when now is None)"""
+    while open_groups:
+        key, group = next(iter(open_groups.items()))  # oldest first: insertion follows first_seen
+        if now is not None and now - group["first_seen"] <= window:
+            return
+        del open_groups[key]
+        group["status"] = "closed"
+        yield group
+
+
+def group_alerts(alerts, window=300):
+    """Deduplicate repeated alerts within a time window (seconds).
+
+    The first alert of a fingerprint is yielded at once with status "open",
+    so a one-off P0 is never held back. Repeats within window seconds only
+    bump that group's count and last_seen. Once the window has passed (or
+    the stream ends) the same group is yielded again with status "closed"
+    and its final count.
+    """
+    open_groups = {}
+    for alert in alerts:
+        now = alert["timestamp"]
+        yield from _close_expired(open_groups, now, window)
+        key = fingerprint(alert)
+        group = open_groups.get(key)
+        if group is not None and now - group["first_seen"] <= window:
+            group["count"] += 1
+            group["last_seen"] = max(group["last_seen"], now)
+            continue
+        if group is not None:
+            # Out-of-order input left an expired group behind newer ones
+            del open_groups[key]
+            group["status"] = "closed"
+            yield group
+        group = {
+            "host": alert["host"],
+            "message": alert["message"],
+            "first_seen": now,
+            "last_seen": now,
+            "count": 1,
+            "status": "open",
+        }
+        open_groups[key] = group
+        yield group
+    yield from _close_expired(open_groups, None, window)
+
+
+# --- LLM ---
+def load_system_prompt(path=PROMPT_FILE):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def build_batch_prompt(groups):
+    """User prompt for a batch of ambiguous alert groups; the system prompt stays a fixed prefix"""
+    lines = [
+        "Triage each alert below. Reply with only a JSON array, one object per alert:",
+        '{"id": <id>, "severity": "P0|P1|P2|P3", "summary": "<one-line alert summary>"}',
+        "",
+    ]
+    for index, group in enumerate(groups):
+        repeated = f" (repeated {group['count']}x)" if group["count"] > 1 else ""
+        lines.append(f"{index}. [{group['host']}] {group['message']}{repeated}")
+    return "\n".join(lines)
+
+
+def parse_batch_response(text, size):
+    """Map alert index -> (severity, summary); unparseable entries are skipped"""
+    match = re.search(r"\[.*\]", text, re.S)
+    if not match:
+        return {}
+    try:
+        items = json.loads(match.group(0))
+    except ValueError:
+        return {}
+    results = {}
+    for item in items:
+        try:
+            index = int(item["id"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        severity = str(item.get("severity", "")).upper()
+        if 0 <= index < size and severity in SEVERITIES:
+            results[index] = (severity, item.get("summary", ""))
+    return results
+
+
+class OpenAITriageLLM:
+    """Chat completion call with the triage prompt as an unchanging system prefix"""
+
+    def __init__(self, model="gpt-4o-mini", api_key=None):
+        from openai import OpenAI
+        self.client = OpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY"))
+        self.model = model
+
+    def __call__(self, system_prompt, user_prompt):
+        response = self.client.chat.completions.create(
+            model=self.model,
+            temperature=0,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+        )
+        return response.choices[0].message.content
+
+
+class FakeTriageLLM:
+    """Local stand-in for the LLM: deterministic answers, optional latency"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def __call__(self, system_prompt, user_prompt):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        items = []
+        for line in user_prompt.splitlines():
+            match = re.match(r"(\d+)\. \[(.*?)\] (.*)", line)
+            if match:
+                severity = "P1" if re.search(r"error|fail|critical", match.group(3).lower()) else "P2"
+                items.append({"id": int(match.group(1)), "severity": severity, "summary": match.group(3)[:80]})
+        return json.dumps(items)
+
+
+# --- PIPELINE ---
+def triage(alerts, llm, system_prompt=None, window=300, batch_size=20, stats=None):
+    """Yield triage results per alert group.
+
+    Well-known patterns are classified by rules; ambiguous groups are sent
+    to the LLM in batches of batch_size. A group is reported when it is
+    classified, and again with status "closed", its final count and
+    last_seen if more repeats arrived after that.
+    """
+    system_prompt = system_prompt or load_system_prompt()
+    stats = stats if stats is not None else {}
+    stats.update({"alerts": 0, "groups": 0, "rule_classified": 0, "llm_classified": 0, "llm_calls": 0,
+                  "closed_updates": 0})
+    reported = {}  # id(group) -> (verdict fields, count when reported) for groups still open
+
+    def counted(stream):
+        for alert in stream:
+            stats["alerts"] += 1
+            yield alert
+
+    def report(group, **verdict):
+        if group["status"] == "open":
+            reported[id(group)] = (verdict, group["count"])
+        return dict(group, **verdict)
+
+    def flush(pending):
+        stats["llm_calls"] += 1
+        answers = parse_batch_response(llm(system_prompt, build_batch_prompt(pending)), len(pending))
+        for index, group in enumerate(pending):
+            severity, summary = answers.get(index, ("P2", "LLM gave no verdict; needs manual review"))
+            stats["llm_classified"] += 1
+            yield report(group, severity=severity, category="llm", summary=summary, classified_by="llm")
+
+    pending = []
+    for group in group_alerts(counted(alerts), window):
+        if group["status"] == "closed":
+            # Groups still waiting for the LLM are reported with their final count when flushed
+            verdict, count = reported.pop(id(group), (None, None))
+            if verdict is not None and group["count"] > count:
+                stats["closed_updates"] += 1
+                yield dict(group, **verdict)
+            continue
+        stats["groups"] += 1
+        verdict = classify_with_rules(group["message"])
+        if verdict:
+            stats["rule_classified"] += 1
+            yield report(group, severity=verdict[0], category=verdict[1], summary=group["message"],
+                         classified_by="rule")
+            continue
+        pending.append(group)
+        if len(pending) >= batch_size:
+            yield from flush(pending)
+            pending = []
+    if pending:
+        yield from flush(pending)
+
+
+def run(alerts, llm, output=None, **kwargs):
+    """Triage a stream, write JSONL results and return throughput stats"""
+    stats = {}
+    start = time.perf_counter()
+    out = open(output, "w", encoding="utf-8") if output else None
+    try:
+        for result in triage(alerts, llm, stats=stats, **kwargs):
+            if out:
+                out.write(json.dumps(result) + "\n")
+    finally:
+        if out:
+            out.close()
+    elapsed = time.perf_counter() - start
+    stats["seconds"] = elapsed
+    stats["alerts_per_sec"] = stats["alerts"] / elapsed if elapsed else 0.0
+    stats["llm_call_ratio"] = stats["llm_calls"] / stats["alerts"] if stats["alerts"] else 0.0
+    return stats
+
+
+def generate_sample_alerts(n=10000, seed=0):
+    """Synthetic alert stream for load testing (one alert per second of simulated time)"""
+    import random
+    rng = random.Random(seed)
+    hosts = ["prod-mysql-01", "prod-postgres-cluster", "prod-oracle-02", "stage-mysql-01", "prod-mssql-03"]
+    templates = [
+        "Database CPU utilization at {n}% for 10 minutes on {host}",
+        "Connection pool exhausted on {host}",
+        "Replication lag of {n} seconds on {host}",
+        "Slow query detected taking {n} seconds on {host}",
+        "Disk usage at {n}% on {host}",
+        "Deadlock detected on {host}",
+        "Unusual spike in temp table creation on {host}",
+        "Autovacuum not keeping up with table bloat on {host}",
+        "Checkpoint frequency warning on {host}",
+    ]
+    start = time.time()
+    for i in range(n):
+        message = rng.choice(templates).format(n=rng.randint(40, 99), host=rng.choice(hosts))
+        yield {"message": message, "timestamp": start + i, "host": HOST_PATTERN.search(message.lower()).group(1)}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Batch DBA alert triage using RTCFR_prompt.txt")
+    parser.add_argument("input", nargs="?", help="JSONL/text alert file, '-' for stdin (default: synthetic alerts)")
+    parser.add_argument("-o", "--output", help="write triage results as JSONL")
+    parser.add_argument("--window", type=int, default=300, help="dedup window in seconds")
+    parser.add_argument("--batch-size", type=int, default=20, help="ambiguous alerts per LLM call")
+    parser.add_argument("--fake-llm", action="store_true", help="use the local fake LLM")
+    parser.add_argument("--sample", type=int, default=10000, help="synthetic alerts when no input is given")
+    args = parser.parse_args()
+
+    alerts = read_alert_file(args.input) if args.input else generate_sample_alerts(args.sample)
+    llm = FakeTriageLLM() if args.fake_llm or not os.getenv("OPENAI_API_KEY") else OpenAITriageLLM()
+    stats = run(alerts, llm, output=args.output, window=args.window, batch_size=args.batch_size)
+
+    print("--- Alert Triage Summary ---")
+    print(f"Alerts:          {stats['alerts']}")
+    print(f"Groups:          {stats['groups']}")
+    print(f"Rule classified: {stats['rule_classified']}")
+    print(f"LLM classified:  {stats['llm_classified']} in {stats['llm_calls']} calls")
+    print(f"Closing updates: {stats['closed_updates']} (final repeat counts)")
+    print(f"Throughput:      {stats['alerts_per_sec']:,.0f} alerts/sec")
+    print(f"LLM call ratio:  {stats['llm_call_ratio']:.4f} calls per alert")
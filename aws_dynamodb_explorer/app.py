@@ -2,24 +2,32 @@ import streamlit as st
 import os
 import shutil
 from dotenv import load_dotenv
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import PromptTemplate
-from langchain_community.retrievers import BM25Retriever
-from tavily import TavilyClient
 import warnings
-import fitz  # PyMuPDF for image extraction
-from PIL import Image
 import io
 import base64
+from embedding_backend import MODEL_NAME, CachedQueryEmbeddings, get_embeddings, resolved_revision
+from index_catalog import IndexCatalog, catalog_from_vectorstore
+from query_router import QueryRouter
+from startup_profile import lazy_import, timed, record, mark, report
+from image_cache import ByteLRU, full_image_path, load_thumbnail_bytes, save_thumbnail
+from chat_store import ChatHistoryStore, llm_summarizer
+from rag_pipeline import (
+    VECTOR_STORE_DIR, build_vectorstore, make_vector_retriever, open_vectorstore, query_document,
+    search_images, split_pdf, vectorstore_exists
+)
+import time
+import uuid
 warnings.filterwarnings('ignore')
 
+# Heavy modules (langchain, torch, PyMuPDF, PIL, tavily, openai) are imported
+# lazily with lazy_import() on first use so the first page renders quickly
+
 # Load environment variables
 load_dotenv()
 
+# Number of chat messages rendered per page of history
+CHAT_WINDOW = 20
+
 # Page configuration
 st.set_page_config(page_title="AWS DynamoDB Doc Explorer", page_icon="🗄️", layout="wide")
 
@@ -32,15 +40,25 @@ if 'bm25_retriever' not in st.session_state:
     st.session_state.bm25_retriever = None
 if 'documents' not in st.session_state:
     st.session_state.documents = None
+if 'chat_session_id' not in st.session_state:
+    # Keep the session id in the URL so history survives reloads and restarts
+    st.session_state.chat_session_id = st.query_params.get("session") or uuid.uuid4().hex
+    st.query_params["session"] = st.session_state.chat_session_id
 if 'chat_history' not in st.session_state:
-    st.session_state.chat_history = []
+    st.session_state.chat_history = ChatHistoryStore(st.session_state.chat_session_id)
+if 'chat_window' not in st.session_state:
+    st.session_state.chat_window = CHAT_WINDOW
 if 'images_processed' not in st.session_state:
     st.session_state.images_processed = False
+if 'shown_images' not in st.session_state:
+    st.session_state.shown_images = {}
 
 def extract_images_from_pdf(pdf_path):
     """Extract images from PDF with their page numbers"""
     images = []
     try:
+        fitz = lazy_import("fitz")  # PyMuPDF for image extraction
+        Image = lazy_import("PIL.Image")
         pdf_document = fitz.open(pdf_path)
         
         for page_num in range(len(pdf_document)):
@@ -75,8 +93,7 @@ def describe_images_with_gpt4_vision(images, openai_api_key):
     descriptions = []
     
     try:
-        from openai import OpenAI
-        client = OpenAI(api_key=openai_api_key)
+        client = lazy_import("openai").OpenAI(api_key=openai_api_key)
         
         for img_data in images:
             # Convert PIL image to base64
@@ -120,6 +137,15 @@ def describe_images_with_gpt4_vision(images, openai_api_key):
     
     return descriptions
 
+def image_metadata(img_desc):
+    """Vector store metadata for an image description"""
+    return {
+        "type": "image",
+        "page": img_desc["page"],
+        "image_id": img_desc["id"],
+        "source": "pdf_image"
+    }
+
 def store_images_in_chroma(image_descriptions, vectorstore, embeddings):
     """Store image descriptions in Chroma vector store"""
     try:
@@ -130,12 +156,7 @@ def store_images_in_chroma(image_descriptions, vectorstore, embeddings):
         for img_desc in image_descriptions:
             doc = Document(
                 page_content=f"[IMAGE] {img_desc['description']}",
-                metadata={
-                    "type": "image",
-                    "page": img_desc["page"],
-                    "image_id": img_desc["id"],
-                    "source": "pdf_image"
-                }
+                metadata=image_metadata(img_desc)
             )
             image_docs.append(doc)
         
@@ -160,85 +181,130 @@ def save_images_locally(image_descriptions, output_dir="./pdf_images"):
         for img_desc in image_descriptions:
             image_path = os.path.join(output_dir, f"{img_desc['id']}.png")
             
-            # Save image
-            image = Image.open(io.BytesIO(img_desc["image_bytes"]))
+            # Save image and a size-bounded thumbnail used for rendering
+            image = lazy_import("PIL.Image").open(io.BytesIO(img_desc["image_bytes"]))
             image.save(image_path)
+            save_thumbnail(img_desc["id"], image, output_dir)
         
         return True
     except Exception as e:
         st.error(f"Error saving images: {str(e)}")
         return False
 
+@st.cache_resource(show_spinner=False)
+def thumbnail_cache():
+    """Byte-bounded LRU of thumbnail bytes shared by all sessions"""
+    return ByteLRU(max_bytes=int(os.getenv("THUMBNAIL_CACHE_MB", "64")) * 1024 * 1024)
+
 def load_image_from_disk(image_id, output_dir="./pdf_images"):
-    """Load image from disk by ID"""
-    try:
-        image_path = os.path.join(output_dir, f"{image_id}.png")
-        if os.path.exists(image_path):
-            return Image.open(image_path)
-        return None
-    except Exception as e:
-        return None
+    """Load image thumbnail bytes by ID (cached in memory); full images are loaded on demand"""
+    data = load_thumbnail_bytes(image_id, thumbnail_cache(), output_dir)
+    if data is not None:
+        # Offer the full-resolution original in the sidebar viewer
+        st.session_state.shown_images[image_id] = full_image_path(image_id, output_dir)
+    return data
+
+@st.cache_resource(show_spinner=False)
+def load_embeddings():
+    """Embedding model shared across reruns and sessions, with query vectors memoized"""
+    with timed("load embeddings"):
+        return CachedQueryEmbeddings(get_embeddings())
+
+@st.cache_resource(show_spinner=False)
+def load_router():
+    """Query intent router; its prototype vectors are embedded once"""
+    with timed("load router"):
+        return QueryRouter(load_embeddings())
+
+@st.cache_resource(show_spinner=False)
+def load_pdf_splits(pdf_path, mtime):
+    """Load and split the PDF once per file version (mtime is part of the cache key).
+    Chunks are kept in a compact ChunkStore; Documents are built only when LangChain needs them."""
+    with timed("load and split pdf"):
+        return split_pdf(pdf_path)
+
+@st.cache_data(show_spinner=False)
+def storage_status():
+    """Memoized status from the index catalog: (vector store exists, indexed image count).
+    Only an index built before catalogs existed is probed on disk.
+    Call storage_status.clear() after anything writes or deletes the stores."""
+    catalog = read_catalog()
+    if catalog is not None:
+        return True, catalog["chunks_by_type"].get("image", 0)
+    return vectorstore_exists(), 0
+
+@st.cache_data(show_spinner=False)
+def embedding_revision():
+    """Commit of the embedding model in use, resolved from the local model cache"""
+    load_embeddings()
+    return resolved_revision()
+
+@st.cache_data(show_spinner=False)
+def read_catalog():
+    """Index catalog as a dict, memoized until read_catalog.clear() after a rebuild"""
+    catalog = IndexCatalog.load(VECTOR_STORE_DIR)
+    return catalog.data if catalog else None
+
+def save_catalog(catalog, build_started=None, revision=None):
+    """Record embedding model, disk usage and build time, then persist the catalog"""
+    extra = {"revision": revision} if revision else {}
+    catalog.set_embedding(MODEL_NAME, os.getenv("EMBEDDING_BACKEND", "huggingface"), **extra)
+    catalog.measure_disk(index=VECTOR_STORE_DIR, images="./pdf_images")
+    if build_started:
+        catalog.set_build(build_started)
+    catalog.save(VECTOR_STORE_DIR)
+    read_catalog.clear()
+    storage_status.clear()  # it reads the catalog
 
 def load_and_process_pdf(pdf_path, openai_api_key=None, process_images=False, force_reprocess=False):
     """Load PDF and create vector store with BM25 reranking"""
     try:
-        # Create embeddings using HuggingFace
-        embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2"
-        )
-        
-        # Check if Chroma DB already exists
-        chroma_exists = os.path.exists("./chroma_db") and os.path.exists("./chroma_db/chroma.sqlite3")
-        images_exist = os.path.exists("./pdf_images") and len(os.listdir("./pdf_images")) > 0
+        # Embeddings (backend, batch size and threads from EMBEDDING_* env vars), cached across reruns
+        embeddings = load_embeddings()
+        ChunkStoreBM25Retriever = lazy_import("chunk_store").ChunkStoreBM25Retriever
+        
+        # Check if the vector store already exists
+        chroma_exists, image_count = storage_status()
+        
+        # Vectors from another embedding model or revision can't be searched with this one: rebuild
+        stored = read_catalog()
+        if chroma_exists and not force_reprocess and stored is not None and \
+                not IndexCatalog(stored).embedding_matches(MODEL_NAME, embedding_revision(),
+                                                           os.getenv("EMBEDDING_BACKEND", "huggingface")):
+            st.warning("⚠️ The index was built with a different embedding model, rebuilding it. "
+                       "Click 'Reload PDF Document' to index images again.")
+            import shutil
+            shutil.rmtree(VECTOR_STORE_DIR, ignore_errors=True)
+            read_catalog.clear()
+            storage_status.clear()
+            chroma_exists, force_reprocess = False, True
+        
+        # Load and split the PDF (cached until the file changes)
+        splits = load_pdf_splits(pdf_path, os.path.getmtime(pdf_path))
         
         if chroma_exists and not force_reprocess:
             # Load existing vectorstore
-            vectorstore = Chroma(
-                persist_directory="./chroma_db",
-                embedding_function=embeddings
-            )
+            with timed("open vector store"):
+                vectorstore = open_vectorstore(embeddings)
             
-            # Load PDF for BM25 retriever
-            loader = PyPDFLoader(pdf_path)
-            documents = loader.load()
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1500,
-                chunk_overlap=300,
-                length_function=len
-            )
-            splits = text_splitter.split_documents(documents)
+            # Index built before catalogs existed: backfill once from stored metadata
+            if read_catalog() is None:
+                save_catalog(catalog_from_vectorstore(vectorstore))
+            image_count = read_catalog()["chunks_by_type"].get("image", 0)
             
             # Create retrievers - increase k to get more results including images
-            vector_retriever = vectorstore.as_retriever(
-                search_kwargs={"k": 15}  # Increased to ensure images are retrieved
-            )
-            bm25_retriever = BM25Retriever.from_documents(splits)
-            bm25_retriever.k = 8
-            
-            # Count images
-            image_count = len(os.listdir("./pdf_images")) if images_exist else 0
+            vector_retriever = make_vector_retriever(vectorstore, k=15)  # Increased to ensure images are retrieved
+            bm25_retriever = ChunkStoreBM25Retriever.from_store(splits, k=8)
             
             return vectorstore, vector_retriever, bm25_retriever, splits, image_count
         
         # Process from scratch if not exists or force reprocess
-        # Load PDF
-        loader = PyPDFLoader(pdf_path)
-        documents = loader.load()
-        
-        # Split text using recursive character splitter with larger chunks for tables
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1500,
-            chunk_overlap=300,
-            length_function=len
-        )
-        splits = text_splitter.split_documents(documents)
+        build_started = time.time()
+        catalog = IndexCatalog()
         
-        # Create Chroma vector store
-        vectorstore = Chroma.from_documents(
-            documents=splits,
-            embedding=embeddings,
-            persist_directory="./chroma_db"
-        )
+        # Create vector store
+        vectorstore = build_vectorstore(splits.to_documents(), embeddings)
+        catalog.add_chunks(splits.metadatas())
         
         # Process images if requested
         image_count = 0
@@ -264,6 +330,7 @@ def load_and_process_pdf(pdf_path, openai_api_key=None, process_images=False, fo
                 
                 if success:
                     image_count = len(image_descriptions)
+                    catalog.add_chunks(image_metadata(d) for d in image_descriptions)
                     st.success(f"✅ Successfully processed {image_count} images")
                 else:
                     st.error("Failed to store images in Chroma")
@@ -271,11 +338,10 @@ def load_and_process_pdf(pdf_path, openai_api_key=None, process_images=False, fo
                 st.warning("No images found in PDF")
         
         # Create retrievers with more results to include images
-        vector_retriever = vectorstore.as_retriever(
-            search_kwargs={"k": 15}  # Increased to ensure images are retrieved
-        )
-        bm25_retriever = BM25Retriever.from_documents(splits)
-        bm25_retriever.k = 8
+        vector_retriever = make_vector_retriever(vectorstore, k=15)  # Increased to ensure images are retrieved
+        bm25_retriever = ChunkStoreBM25Retriever.from_store(splits, k=8)
+        save_catalog(catalog, build_started, embedding_revision())
+        storage_status.clear()
         
         # Return both retrievers for ensemble approach
         return vectorstore, vector_retriever, bm25_retriever, splits, image_count
@@ -283,121 +349,13 @@ def load_and_process_pdf(pdf_path, openai_api_key=None, process_images=False, fo
         st.error(f"Error processing PDF: {str(e)}")
         return None, None, None, None, 0
 
-def query_document(question, vector_retriever, bm25_retriever, llm):
-    """Query the document using RAG with BM25 reranking"""
-    try:
-        # Get documents from vector retriever (includes both text and images)
-        vector_docs = vector_retriever.invoke(question)
-        
-        # Get documents from BM25 (text only)
-        bm25_docs = bm25_retriever.invoke(question)
-        
-        # Separate images from vector results
-        image_docs = [doc for doc in vector_docs if doc.metadata.get("type") == "image"]
-        text_vector_docs = [doc for doc in vector_docs if doc.metadata.get("type") != "image"]
-        
-        # Rerank images based on question keywords
-        if image_docs:
-            question_lower = question.lower()
-            # Extract key terms from question
-            key_terms = [word for word in question_lower.split() 
-                        if word not in ['show', 'me', 'the', 'a', 'an', 'can', 'you', 'picture', 'image', 'diagram', 'figure']]
-            
-            # Score each image based on keyword matches
-            scored_images = []
-            for doc in image_docs:
-                content_lower = doc.page_content.lower()
-                # Count how many key terms appear in the description
-                score = sum(1 for term in key_terms if term in content_lower)
-                # Boost score if multiple words appear together
-                if len(key_terms) >= 2:
-                    phrase = ' '.join(key_terms[:3])  # Check first 3 words as phrase
-                    if phrase in content_lower:
-                        score += 5  # Big boost for phrase match
-                scored_images.append((score, doc))
-            
-            # Sort by score descending
-            scored_images.sort(key=lambda x: x[0], reverse=True)
-            
-            # Only keep images with score > 0 (at least one keyword match)
-            image_docs = [doc for score, doc in scored_images if score > 0]
-        
-        # Combine and deduplicate text documents (simple ensemble)
-        all_docs = []
-        seen_content = set()
-        
-        # Add BM25 results first (keyword matching)
-        for doc in bm25_docs:
-            if doc.page_content not in seen_content:
-                all_docs.append(doc)
-                seen_content.add(doc.page_content)
-        
-        # Add vector text results (semantic matching)
-        for doc in text_vector_docs:
-            if doc.page_content not in seen_content:
-                all_docs.append(doc)
-                seen_content.add(doc.page_content)
-        
-        # Add top ranked images (limit to top 2 most relevant)
-        all_docs.extend(image_docs[:2])
-        
-        if not all_docs or len(all_docs) == 0:
-            return "NOT_FOUND_IN_DOCUMENT", []
-        
-        # Create context from retrieved documents (use top 6, excluding images for text context)
-        text_docs_for_context = [doc for doc in all_docs if doc.metadata.get("type") != "image"][:6]
-        context = "\n\n".join([doc.page_content for doc in text_docs_for_context])
-        
-        # If we have images, add their descriptions to context
-        if image_docs:
-            image_context = "\n\n".join([doc.page_content for doc in image_docs[:2]])
-            context = f"{context}\n\n{image_context}" if context else image_context
-        
-        # Create prompt with strict instructions
-        prompt = f"""You are a document assistant. Your ONLY job is to answer questions using the context provided below.
-
-Context from document:
-{context}
-
-Question: {question}
-
-CRITICAL RULES:
-- You MUST ONLY use information from the context above
-- DO NOT use your general knowledge or training data
-- If the context does not contain information to answer the question, respond with EXACTLY: "NOT_FOUND_IN_DOCUMENT"
-- If the context mentions the topic even briefly, provide that information
-- DO NOT make up or infer information not present in the context
-
-Answer:"""
-        
-        # Get response from LLM
-        response = llm.invoke(prompt)
-        answer = response.content if hasattr(response, 'content') else str(response)
-        
-        # Additional validation: check if answer contains keywords from context
-        if answer and "NOT_FOUND_IN_DOCUMENT" not in answer:
-            # Extract key terms from the question
-            question_lower = question.lower()
-            context_lower = context.lower()
-            
-            # Check if the answer topic is actually in the context
-            # For questions about specific AWS services not in doc
-            if any(term in question_lower for term in ['migration service', 'dms', 'rds', 's3', 'lambda', 'ec2']) and \
-               not any(term in context_lower for term in ['migration', 'dms']):
-                answer = "NOT_FOUND_IN_DOCUMENT"
-        
-        # Return all docs including images
-        return answer, all_docs[:10]
-    except Exception as e:
-        return f"Error querying document: {str(e)}", []
-
 def web_search_tavily(question, tavily_api_key):
     """Perform web search using Tavily API"""
     try:
         if not tavily_api_key:
             return None
         
-        tavily_client = TavilyClient(api_key=tavily_api_key)
+        tavily_client = lazy_import("tavily").TavilyClient(api_key=tavily_api_key)
         response = tavily_client.search(query=question, max_results=3)
         
         if response and 'results' in response and len(response['results']) > 0:
@@ -430,25 +388,28 @@ with st.sidebar:
     st.markdown("---")
     st.markdown("### 📄 Document Status")
     
-    # Diagnostic: Check what's in Chroma
-    if st.session_state.vectorstore and st.button("Check Vector Store Contents"):
-        try:
-            # Query for all image documents
-            test_results = st.session_state.vectorstore.similarity_search("image timeline diagram", k=20)
-            image_count_in_db = sum(1 for doc in test_results if doc.metadata.get("type") == "image")
-            st.info(f"Found {image_count_in_db} images in vector store out of {len(test_results)} total documents")
-            
-            # Show sample
-            for doc in test_results[:5]:
-                st.write(f"Type: {doc.metadata.get('type', 'text')}, Content preview: {doc.page_content[:100]}")
-        except Exception as e:
-            st.error(f"Error checking vector store: {str(e)}")
+    # Index statistics recorded at ingest time (no probe searches)
+    if st.session_state.vectorstore:
+        catalog = read_catalog()
+        with st.expander("📊 Index catalog"):
+            if catalog:
+                by_type = catalog["chunks_by_type"]
+                st.write(f"Chunks: {sum(by_type.values())} ({', '.join(f'{t}: {n}' for t, n in by_type.items())})")
+                st.write(f"Pages with text: {len(catalog['chunks_by_page'].get('text', {}))}, "
+                         f"pages with images: {len(catalog['chunks_by_page'].get('image', {}))}")
+                st.write(f"Sources: {', '.join(catalog['chunks_by_source'])}")
+                st.write(f"Embedding: {catalog['embedding'].get('model')} ({catalog['embedding'].get('backend')})")
+                st.write(f"On disk: {sum(catalog['disk_bytes'].values()) / 1024 / 1024:,.1f} MB")
+                if catalog["built_at"]:
+                    built = time.strftime('%Y-%m-%d %H:%M', time.localtime(catalog["built_at"]))
+                    st.write(f"Built: {built} in {catalog['build_seconds']:,.1f} s")
+            else:
+                st.write("No catalog yet")
     
     # Auto-load PDF on first run
     if st.session_state.vectorstore is None and openai_api_key:
         # Check if already processed
-        chroma_exists = os.path.exists("./chroma_db") and os.path.exists("./chroma_db/chroma.sqlite3")
-        images_exist = os.path.exists("./pdf_images") and len(os.listdir("./pdf_images")) > 0
+        chroma_exists, _ = storage_status()
         
         if chroma_exists:
             st.warning("⚠️ Loading existing database - images may not be indexed. Click 'Reload PDF Document' to reprocess with images.")
@@ -464,8 +425,8 @@ with st.sidebar:
                     st.session_state.vector_retriever = vector_retriever
                     st.session_state.bm25_retriever = bm25_retriever
                     st.session_state.documents = documents
-                    st.session_state.images_processed = images_exist
-                    st.info(f"✅ Loaded existing database! ({image_count} images found on disk)")
+                    st.session_state.images_processed = image_count > 0
+                    st.info(f"✅ Loaded existing database! ({image_count} images indexed)")
                 else:
                     st.error("Failed to load vector database")
         else:
@@ -515,15 +476,19 @@ with st.sidebar:
                 
                 time.sleep(1)  # Give time for connections to close
                 
-                if os.path.exists("./chroma_db"):
+                if os.path.exists(VECTOR_STORE_DIR):
                     try:
-                        shutil.rmtree("./chroma_db")
+                        shutil.rmtree(VECTOR_STORE_DIR)
                     except PermissionError:
-                        st.error("Please close the app and manually delete the 'chroma_db' folder, then restart.")
+                        st.error(f"Please close the app and manually delete the '{VECTOR_STORE_DIR}' folder, then restart.")
                         st.stop()
                 
                 if os.path.exists("./pdf_images"):
                     shutil.rmtree("./pdf_images")
+                storage_status.clear()
+                read_catalog.clear()
+                thumbnail_cache().clear()
+                st.session_state.shown_images = {}
                 
                 with st.spinner("Reprocessing PDF and images from scratch..."):
                     vectorstore, vector_retriever, bm25_retriever, documents, image_count = load_and_process_pdf(
@@ -546,9 +511,31 @@ with st.sidebar:
                 st.error(f"Error during reload: {str(e)}")
                 st.info("Please restart the app to reload the document.")
     
+    # Full-resolution originals are only read when picked here
+    if st.session_state.shown_images:
+        full_image_id = st.selectbox(
+            "🖼️ View full-resolution image",
+            ["None"] + list(st.session_state.shown_images)
+        )
+        if full_image_id != "None":
+            full_path = st.session_state.shown_images[full_image_id]
+            if os.path.exists(full_path):
+                st.image(full_path, caption=full_image_id, use_container_width=True)
+            else:
+                st.error(f"Could not load image {full_image_id} from disk")
+    
     if st.button("Clear Chat History"):
-        st.session_state.chat_history = []
+        st.session_state.chat_history.clear()
+        st.session_state.chat_window = CHAT_WINDOW
         st.rerun()
+    
+    with st.expander("⏱️ Startup profile"):
+        timings = report()
+        if timings:
+            for stage, seconds in timings.items():
+                st.write(f"{stage}: {seconds * 1000:,.0f} ms")
+        else:
+            st.write("No timings recorded yet")
 
 # Main chat interface
 if not openai_api_key:
@@ -557,115 +544,158 @@ if not openai_api_key:
 elif not st.session_state.vectorstore:
     st.info("⏳ Loading PDF document... Please wait.")
 else:
-    # Display chat history
-    for message in st.session_state.chat_history:
+    # Display the most recent window of chat history; older turns load on demand
+    total_messages = st.session_state.chat_history.count()
+    if total_messages > st.session_state.chat_window:
+        if st.button(f"Load older messages ({total_messages - st.session_state.chat_window} hidden)"):
+            st.session_state.chat_window += CHAT_WINDOW
+            st.rerun()
+    for message in st.session_state.chat_history.recent(st.session_state.chat_window):
         with st.chat_message(message["role"]):
             st.markdown(message["content"])
     
+    mark("time to interactive")
+    
     # Chat input
     if question := st.chat_input("Ask a question about your document..."):
+        query_start = time.perf_counter()
         # Display user message
         with st.chat_message("user"):
             st.markdown(question)
-        st.session_state.chat_history.append({"role": "user", "content": question})
+        question_id = st.session_state.chat_history.append("user", question)
         
         # Generate response
         with st.chat_message("assistant"):
             with st.spinner("Thinking..."):
-                # Initialize LLM with strict settings
-                llm = ChatOpenAI(
-                    model_name="gpt-3.5-turbo",
-                    temperature=0,
-                    openai_api_key=openai_api_key,
-                    model_kwargs={"top_p": 0.1}  # More deterministic
-                )
-                
-                # Debug: Test direct retrieval from vectorstore
-                st.write("Debug: Testing direct vectorstore retrieval...")
-                test_results = st.session_state.vectorstore.similarity_search(question, k=15)
-                test_images = [doc for doc in test_results if doc.metadata.get("type") == "image"]
-                st.write(f"Direct vectorstore search found {len(test_images)} images out of {len(test_results)} docs")
+                # Route the question so stages the plan doesn't need are skipped
+                plan = load_router().route(question, web_available=bool(tavily_api_key))
+                plan_name = plan.name
+                st.write(f"Debug: Query plan: {plan.name} ({plan.reason}); stages: {', '.join(plan.stages)}")
                 
-                # Query document (this will now retrieve both text and image descriptions from Chroma)
-                answer, sources = query_document(question, st.session_state.vector_retriever, st.session_state.bm25_retriever, llm)
-                
-                # Debug: Show what was retrieved
-                st.write(f"Debug: Retrieved {len(sources)} documents")
-                for i, doc in enumerate(sources[:5]):
-                    doc_type = doc.metadata.get("type", "text")
-                    st.write(f"  {i+1}. Type: {doc_type}, Content: {doc.page_content[:80]}...")
-                
-                # Check if any retrieved sources are images
-                image_sources = [doc for doc in sources if doc.metadata.get("type") == "image"]
-                st.write(f"Debug: {len(image_sources)} are images")
+                if plan_name == "web":
+                    web_result = web_search_tavily(question, tavily_api_key)
+                    if web_result:
+                        final_answer = f"Based on web search:\n\n{web_result}"
+                    else:
+                        st.write("Debug: Web search returned nothing, falling back to text RAG")
+                        plan_name = "text"
                 
-                # Display images if found
-                if image_sources:
-                    st.markdown("### Found relevant image(s):")
-                    for doc in image_sources:
-                        image_id = doc.metadata.get("image_id")
-                        page = doc.metadata.get("page")
-                        
-                        st.write(f"Debug: Loading image {image_id} from page {page}")
+                if plan_name == "image":
+                    image_sources = search_images(question, st.session_state.vectorstore)
+                    if image_sources:
+                        st.markdown("### Found relevant image(s):")
+                        for doc in image_sources:
+                            image_id = doc.metadata.get("image_id")
+                            page = doc.metadata.get("page")
+                            
+                            image = load_image_from_disk(image_id)
+                            if image:
+                                st.image(image, caption=f"Page {page}", use_container_width=True)
+                                description = doc.page_content.replace("[IMAGE] ", "")
+                                st.markdown(f"**Description:** {description}")
+                                st.markdown("---")
+                            else:
+                                st.error(f"Could not load image {image_id} from disk")
                         
-                        # Load image from disk
-                        image = load_image_from_disk(image_id)
-                        if image:
-                            st.image(image, caption=f"Page {page}", use_container_width=True)
-                            # Extract description from document content (remove [IMAGE] prefix)
-                            description = doc.page_content.replace("[IMAGE] ", "")
-                            st.markdown(f"**Description:** {description}")
-                            st.markdown("---")
-                        else:
-                            st.error(f"Could not load image {image_id} from disk")
-                    
-                    final_answer = f"I found {len(image_sources)} relevant image(s) from the document (shown above).\n\n"
-                    if "NOT_FOUND_IN_DOCUMENT" not in answer:
-                        final_answer += f"Additional context: {answer}"
+                        final_answer = f"I found {len(image_sources)} relevant image(s) from the document (shown above)."
+                    else:
+                        st.write("Debug: No matching images, falling back to text RAG")
+                        plan_name = "text"
                 
-                # Corrective RAG logic
-                elif "NOT_FOUND_IN_DOCUMENT" in answer:
-                    # Try alternative retrieval with more aggressive search
-                    alt_vector_retriever = st.session_state.vectorstore.as_retriever(
-                        search_kwargs={"k": 10}
+                if plan_name == "text":
+                    # Initialize LLM with strict settings
+                    llm = lazy_import("langchain_openai").ChatOpenAI(
+                        model_name="gpt-3.5-turbo",
+                        temperature=0,
+                        openai_api_key=openai_api_key,
+                        model_kwargs={"top_p": 0.1}  # More deterministic
+                    )
+                    
+                    # Bounded memory of earlier turns for follow-up questions
+                    conversation = st.session_state.chat_history.conversation_context(
+                        summarize=llm_summarizer(llm),
+                        before_id=question_id
                     )
-                    st.session_state.bm25_retriever.k = 10
-                    answer_corrective, sources_corrective = query_document(question, alt_vector_retriever, st.session_state.bm25_retriever, llm)
                     
-                    # Check again for images in corrective retrieval
-                    image_sources_corrective = [doc for doc in sources_corrective if doc.metadata.get("type") == "image"]
+                    # Query document (this will now retrieve both text and image descriptions from Chroma)
+                    answer, sources = query_document(question, st.session_state.vector_retriever, st.session_state.bm25_retriever, llm, conversation)
+                    
+                    # Debug: Show what was retrieved
+                    st.write(f"Debug: Retrieved {len(sources)} documents")
+                    for i, doc in enumerate(sources[:5]):
+                        doc_type = doc.metadata.get("type", "text")
+                        st.write(f"  {i+1}. Type: {doc_type}, Content: {doc.page_content[:80]}...")
+                    
+                    # Check if any retrieved sources are images
+                    image_sources = [doc for doc in sources if doc.metadata.get("type") == "image"]
+                    st.write(f"Debug: {len(image_sources)} are images")
                     
-                    if image_sources_corrective:
+                    # Display images if found
+                    if image_sources:
                         st.markdown("### Found relevant image(s):")
-                        for doc in image_sources_corrective:
+                        for doc in image_sources:
                             image_id = doc.metadata.get("image_id")
                             page = doc.metadata.get("page")
-                            
+                        
+                            st.write(f"Debug: Loading image {image_id} from page {page}")
+                        
+                            # Load image from disk
                             image = load_image_from_disk(image_id)
                             if image:
                                 st.image(image, caption=f"Page {page}", use_container_width=True)
+                                # Extract description from document content (remove [IMAGE] prefix)
                                 description = doc.page_content.replace("[IMAGE] ", "")
                                 st.markdown(f"**Description:** {description}")
                                 st.markdown("---")
+                            else:
+                                st.error(f"Could not load image {image_id} from disk")
+                    
+                        final_answer = f"I found {len(image_sources)} relevant image(s) from the document (shown above).\n\n"
+                        if "NOT_FOUND_IN_DOCUMENT" not in answer:
+                            final_answer += f"Additional context: {answer}"
+                    
+                    # Corrective RAG logic
+                    elif "NOT_FOUND_IN_DOCUMENT" in answer:
+                        # Try alternative retrieval with more aggressive search
+                        alt_vector_retriever = make_vector_retriever(st.session_state.vectorstore, k=10)
+                        st.session_state.bm25_retriever.k = 10
+                        answer_corrective, sources_corrective = query_document(question, alt_vector_retriever, st.session_state.bm25_retriever, llm, conversation)
+                    
+                        # Check again for images in corrective retrieval
+                        image_sources_corrective = [doc for doc in sources_corrective if doc.metadata.get("type") == "image"]
+                    
+                        if image_sources_corrective:
+                            st.markdown("### Found relevant image(s):")
+                            for doc in image_sources_corrective:
+                                image_id = doc.metadata.get("image_id")
+                                page = doc.metadata.get("page")
+                            
+                                image = load_image_from_disk(image_id)
+                                if image:
+                                    st.image(image, caption=f"Page {page}", use_container_width=True)
+                                    description = doc.page_content.replace("[IMAGE] ", "")
+                                    st.markdown(f"**Description:** {description}")
+                                    st.markdown("---")
                         
-                        final_answer = f"I found {len(image_sources_corrective)} relevant image(s) from the document (shown above)."
+                            final_answer = f"I found {len(image_sources_corrective)} relevant image(s) from the document (shown above)."
                     
-                    # Reset BM25 k value
-                    st.session_state.bm25_retriever.k = 6
+                        # Reset BM25 k value
+                        st.session_state.bm25_retriever.k = 6
                     
-                    if "NOT_FOUND_IN_DOCUMENT" in answer_corrective and not image_sources_corrective:
-                        # Perform web search using Tavily
-                        st.warning("⚠️ Answer is not available in uploaded document, searching the web...")
-                        web_result = web_search_tavily(question, tavily_api_key)
+                        if "NOT_FOUND_IN_DOCUMENT" in answer_corrective and not image_sources_corrective:
+                            # Perform web search using Tavily
+                            st.warning("⚠️ Answer is not available in uploaded document, searching the web...")
+                            web_result = web_search_tavily(question, tavily_api_key)
                         
-                        if web_result:
-                            final_answer = f"Based on web search:\n\n{web_result}"
-                        else:
-                            final_answer = "I couldn't find relevant information in the document or web. Please try rephrasing your question."
-                    elif not image_sources_corrective:
-                        final_answer = answer_corrective
-                else:
-                    final_answer = answer
-                
+                            if web_result:
+                                final_answer = f"Based on web search:\n\n{web_result}"
+                            else:
+                                final_answer = "I couldn't find relevant information in the document or web. Please try rephrasing your question."
+                        elif not image_sources_corrective:
+                            final_answer = answer_corrective
+                    else:
+                        final_answer = answer
+                    
                 st.markdown(final_answer)
-                st.session_state.chat_history.append({"role": "assistant", "content": final_answer})
+                st.session_state.chat_history.append("assistant", final_answer)
+                record("first query", time.perf_counter() - query_start)
@@ -0,0 +1,155 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from embedding_backend import CachedQueryEmbeddings, get_embeddings
+from rag_pipeline import make_vector_retriever, open_vectorstore, query_document, split_pdf, vectorstore_exists
+
+
+class LimitedLLM:
+    """Caps concurrent LLM calls with a shared semaphore and times them per question"""
+
+    def __init__(self, llm, semaphore):
+        self.llm = llm
+        self.semaphore = semaphore
+        self.seconds = 0.0
+        self.calls = 0
+
+    def invoke(self, prompt):
+        with self.semaphore:
+            start = time.perf_counter()
+            try:
+                return self.llm.invoke(prompt)
+            finally:
+                self.seconds += time.perf_counter() - start
+                self.calls += 1
+
+
+def read_questions(path):
+    """(id, question) pairs from JSONL lines like {"id": ..., "question": ...}; id defaults to line number"""
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            yield str(record.get("id", line_number)), record["question"]
+
+
+def completed_ids(output_path):
+    """IDs already answered in a previous (possibly interrupted) run; rows with an error are retried"""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                if not record.get("error"):
+                    done.add(str(record["id"]))
+            except (ValueError, KeyError):
+                continue  # partial last line from an interrupted write
+    return done
+
+
+def source_ids(docs, chunk_ids):
+    """Image ID or chunk-N for every source, whichever retriever found it"""
+    return [
+        {
+            "id": doc.metadata.get("image_id") or doc.metadata.get("chunk_id") or chunk_ids.get(doc.page_content),
+            "type": doc.metadata.get("type", "text"),
+            "page": doc.metadata.get("page"),
+        }
+        for doc in docs
+    ]
+
+
+def answer_question(question_id, question, vector_retriever, bm25_retriever, llm, semaphore, chunk_ids):
+    start = time.perf_counter()
+    limited = LimitedLLM(llm, semaphore)
+    try:
+        answer, sources = query_document(question, vector_retriever, bm25_retriever, limited, raise_errors=True)
+    except Exception as e:
+        # Recorded but not counted as done, so the next run retries it
+        return {"id": question_id, "question": question, "error": f"{type(e).__name__}: {e}"}
+    total = time.perf_counter() - start
+    return {
+        "id": question_id,
+        "question": question,
+        "answer": answer,
+        "found": "NOT_FOUND_IN_DOCUMENT" not in answer,
+        "sources": source_ids(sources, chunk_ids),
+        "timing": {
+            "total_seconds": round(total, 4),
+            "llm_seconds": round(limited.seconds, 4),
+            "retrieval_seconds": round(total - limited.seconds, 4),
+        },
+    }
+
+
+def run(questions_path, output_path, pdf_path="atc22-elhemali.pdf", workers=8, max_llm_calls=4,
+        batch_size=64, llm=None):
+    """Answer every question not yet in output_path, appending one JSON line per answer"""
+    if not vectorstore_exists():
+        raise SystemExit("No vector index found. Build it first by running the Streamlit app.")
+
+    # Load the index once for the whole run
+    embeddings = CachedQueryEmbeddings(get_embeddings(), max_queries=batch_size * 4)
+    vectorstore = open_vectorstore(embeddings)
+    vector_retriever = make_vector_retriever(vectorstore, k=15)
+    from chunk_store import ChunkStoreBM25Retriever
+    store = split_pdf(pdf_path)
+    bm25_retriever = ChunkStoreBM25Retriever.from_store(store, k=8)
+    chunk_ids = store.chunk_ids_by_text()
+
+    if llm is None:
+        from langchain_openai import ChatOpenAI
+        llm = ChatOpenAI(model_name="gpt-3.5-turbo", temperature=0, model_kwargs={"top_p": 0.1})
+    semaphore = threading.BoundedSemaphore(max_llm_calls)
+
+    done = completed_ids(output_path)
+    pending = [(qid, q) for qid, q in read_questions(questions_path) if qid not in done]
+    print(f"{len(done)} already answered, {len(pending)} to go")
+
+    write_lock = threading.Lock()
+    answered = failed = 0
+    start = time.perf_counter()
+    with open(output_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=workers) as pool:
+        for offset in range(0, len(pending), batch_size):
+            batch = pending[offset:offset + batch_size]
+            # One batched embedding call per batch; retrievers then hit the query cache
+            embeddings.embed_queries([q for _, q in batch])
+            futures = [
+                pool.submit(answer_question, qid, q, vector_retriever, bm25_retriever, llm, semaphore, chunk_ids)
+                for qid, q in batch
+            ]
+            for future in futures:
+                result = future.result()
+                with write_lock:
+                    out.write(json.dumps(result) + "\n")
+                    out.flush()  # every finished answer survives an interruption
+                if "error" in result:
+                    failed += 1
+                else:
+                    answered += 1
+            elapsed = time.perf_counter() - start
+            print(f"{answered}/{len(pending)} answered ({answered / elapsed:.2f} questions/sec)")
+    if failed:
+        print(f"{failed} failed; run again to retry them")
+    return answered
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions against the document index")
+    parser.add_argument("questions", help='JSONL with {"id": ..., "question": ...} per line')
+    parser.add_argument("output", help="JSONL answers; rerunning resumes where it stopped")
+    parser.add_argument("--pdf", default="atc22-elhemali.pdf")
+    parser.add_argument("--workers", type=int, default=8, help="retrieval worker threads")
+    parser.add_argument("--max-llm-calls", type=int, default=4, help="concurrent LLM calls")
+    parser.add_argument("--batch-size", type=int, default=64, help="questions embedded per batch")
+    args = parser.parse_args()
+
+    run(args.questions, args.output, args.pdf, args.workers, args.max_llm_calls, args.batch_size)
@@ -0,0 +1,136 @@
+import sqlite3
+import time
+from contextlib import closing
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_session ON messages (session_id, id);
+CREATE TABLE IF NOT EXISTS summaries (
+    session_id TEXT PRIMARY KEY,
+    summary TEXT NOT NULL,
+    summary_upto INTEGER NOT NULL
+);
+"""
+
+
+def _format(messages):
+    return "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+
+
+class ChatHistoryStore:
+    """Chat history for one session, persisted in a local SQLite file"""
+
+    def __init__(self, session_id, db_path="./chat_history.sqlite3"):
+        self.session_id = session_id
+        self.db_path = db_path
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        # One short-lived connection per call keeps this safe across Streamlit threads
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def append(self, role, content):
+        with closing(self._connect()) as conn, conn:
+            cur = conn.execute(
+                "INSERT INTO messages (session_id, role, content, created) VALUES (?, ?, ?, ?)",
+                (self.session_id, role, content, time.time())
+            )
+            return cur.lastrowid
+
+    def count(self):
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM messages WHERE session_id = ?", (self.session_id,)
+            ).fetchone()[0]
+
+    def recent(self, limit, before_id=None):
+        """Latest `limit` messages (older than before_id if given), oldest first"""
+        query = "SELECT id, role, content FROM messages WHERE session_id = ?"
+        params = [self.session_id]
+        if before_id is not None:
+            query += " AND id < ?"
+            params.append(before_id)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        with closing(self._connect()) as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [{"id": r[0], "role": r[1], "content": r[2]} for r in reversed(rows)]
+
+    def after(self, after_id, before_id=None):
+        """All messages newer than after_id (and older than before_id if given), oldest first"""
+        query = "SELECT id, role, content FROM messages WHERE session_id = ? AND id > ?"
+        params = [self.session_id, after_id]
+        if before_id is not None:
+            query += " AND id < ?"
+            params.append(before_id)
+        with closing(self._connect()) as conn:
+            rows = conn.execute(query + " ORDER BY id", params).fetchall()
+        return [{"id": r[0], "role": r[1], "content": r[2]} for r in rows]
+
+    def clear(self):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM messages WHERE session_id = ?", (self.session_id,))
+            conn.execute("DELETE FROM summaries WHERE session_id = ?", (self.session_id,))
+
+    def _summary(self):
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT summary, summary_upto FROM summaries WHERE session_id = ?", (self.session_id,)
+            ).fetchone()
+        return row if row else ("", 0)
+
+    def _save_summary(self, summary, upto):
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO summaries (session_id, summary, summary_upto) VALUES (?, ?, ?)",
+                (self.session_id, summary, upto)
+            )
+
+    def conversation_context(self, keep_turns=3, fold_every=4, summarize=None, max_summary_chars=1500,
+                             before_id=None):
+        """Bounded memory for follow-up questions: a rolling summary plus the last few turns.
+
+        Messages that fall out of the recent window are folded into the summary
+        once `fold_every` of them have accumulated, so `summarize` (e.g. an LLM
+        call) runs only occasionally. Without a summarizer the summary keeps the
+        tail of the older conversation, capped at max_summary_chars. Pass
+        before_id to leave out the message currently being answered.
+        """
+        summary, upto = self._summary()
+        # Everything not summarized yet, so no older message is skipped when upto moves past it
+        recent = self.after(upto, before_id=before_id)
+        pending = recent[:-keep_turns * 2] if len(recent) > keep_turns * 2 else []
+
+        if len(pending) >= fold_every:
+            text = f"{summary}\n{_format(pending)}".strip()
+            summary = summarize(text) if summarize else text
+            summary = summary[-max_summary_chars:]
+            upto = pending[-1]["id"]
+            self._save_summary(summary, upto)
+            recent = [m for m in recent if m["id"] > upto]
+
+        parts = []
+        if summary:
+            parts.append(f"Summary of earlier conversation: {summary}")
+        if recent:
+            parts.append(_format(recent))
+        return "\n".join(parts)
+
+
+def llm_summarizer(llm):
+    """Summarize folded conversation text with a chat model"""
+    def summarize(text):
+        response = llm.invoke(
+            "Summarize this conversation in under 120 words. Keep the topics, "
+            f"entities and any open questions.\n\n{text}"
+        )
+        return response.content if hasattr(response, "content") else str(response)
+    return summarize
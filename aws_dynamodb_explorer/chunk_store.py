@@ -0,0 +1,200 @@
+from array import array
+from typing import Any
+from pydantic import ConfigDict
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+
+def chunk_id(index):
+    """Stable source ID of a chunk, shared by BM25 hits and vector store hits"""
+    return f"chunk-{index}"
+
+
+class ChunkView:
+    """Lightweight handle to one chunk; becomes a Document only when asked"""
+
+    __slots__ = ("_store", "index")
+
+    def __init__(self, store, index):
+        self._store = store
+        self.index = index
+
+    @property
+    def text(self):
+        return self._store.text(self.index)
+
+    @property
+    def metadata(self):
+        return self._store.metadata(self.index)
+
+    def to_document(self):
+        return Document(page_content=self.text, metadata={**self.metadata, "chunk_id": chunk_id(self.index)},
+                        id=chunk_id(self.index))
+
+    def __repr__(self):
+        return f"ChunkView({self.index}, page={self.metadata.get('page')})"
+
+
+class ChunkStore:
+    """Compact chunk storage for retrieval state.
+
+    Page text lives once in a single string buffer and every chunk is a
+    (start, end) slice of it, so the overlap between neighbouring chunks is
+    not duplicated. Metadata is stored once per page; each chunk only keeps
+    the index of its page in an int array.
+    """
+
+    def __init__(self):
+        self._parts = []
+        self._length = 0
+        self._buffer = ""
+        self._starts = array("q")
+        self._ends = array("q")
+        self._chunk_pages = array("i")
+        self._page_metadata = []
+
+    @classmethod
+    def from_pages(cls, pages, text_splitter):
+        """Split page Documents without creating a Document per chunk"""
+        store = cls()
+        for page in pages:
+            store.add_page(page.page_content, page.metadata, text_splitter.split_text(page.page_content))
+        store.buffer  # join once up front so readers on other threads never race the join
+        return store
+
+    def add_page(self, text, metadata, chunks):
+        page_index = len(self._page_metadata)
+        self._page_metadata.append(dict(metadata))
+        base = self._length
+        self._append(text)
+
+        search_from = 0
+        for chunk in chunks:
+            position = text.find(chunk, search_from)
+            if position < 0:
+                position = text.find(chunk)
+            if position < 0:
+                # Splitter changed the text (e.g. custom separators); keep a private copy
+                start = self._length
+                self._append(chunk)
+            else:
+                start = base + position
+                search_from = position + 1
+            self._starts.append(start)
+            self._ends.append(start + len(chunk))
+            self._chunk_pages.append(page_index)
+
+    def _append(self, text):
+        self._parts.append(text)
+        self._length += len(text)
+
+    @property
+    def buffer(self):
+        # Join pending parts once; later reads reuse the contiguous buffer
+        if self._parts:
+            self._buffer = self._buffer + "".join(self._parts)
+            self._parts = []
+        return self._buffer
+
+    def text(self, index):
+        return self.buffer[self._starts[index]:self._ends[index]]
+
+    def metadata(self, index):
+        return dict(self._page_metadata[self._chunk_pages[index]])
+
+    def metadatas(self):
+        for index in range(len(self)):
+            yield self._page_metadata[self._chunk_pages[index]]
+
+    def page_of(self, index):
+        return self._page_metadata[self._chunk_pages[index]].get("page")
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return ChunkView(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield ChunkView(self, index)
+
+    def texts(self):
+        for index in range(len(self)):
+            yield self.text(index)
+
+    def chunk_ids_by_text(self):
+        """{chunk text: chunk ID}, to label hits from indexes built before chunk_id was in the metadata"""
+        ids = {}
+        for index, text in enumerate(self.texts()):
+            ids.setdefault(text, chunk_id(index))
+        return ids
+
+    def to_documents(self, indices=None):
+        """Materialize Documents at the LangChain boundary"""
+        indices = range(len(self)) if indices is None else indices
+        return [ChunkView(self, i).to_document() for i in indices]
+
+    def nbytes(self):
+        """Approximate bytes held by the buffer and offset arrays"""
+        import sys
+        size = sys.getsizeof(self.buffer)
+        for arr in (self._starts, self._ends, self._chunk_pages):
+            size += arr.itemsize * len(arr)
+        return size + sum(sys.getsizeof(m) for m in self._page_metadata)
+
+
+class ChunkStoreBM25Retriever(BaseRetriever):
+    """BM25 over a ChunkStore that builds Documents only for the top k hits"""
+
+    store: ChunkStore
+    vectorizer: Any
+    k: int = 4
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @classmethod
+    def from_store(cls, store, k=4, **kwargs):
+        from rank_bm25 import BM25Okapi
+        vectorizer = BM25Okapi([text.split() for text in store.texts()])
+        return cls(store=store, vectorizer=vectorizer, k=k, **kwargs)
+
+    def _get_relevant_documents(self, query, *, run_manager: CallbackManagerForRetrieverRun):
+        scores = self.vectorizer.get_scores(query.split())
+        top = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:self.k]
+        return self.store.to_documents(top)
+
+
+if __name__ == "__main__":
+    import argparse
+    import tracemalloc
+    from langchain_community.document_loaders import PyPDFLoader
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    parser = argparse.ArgumentParser(description="Compare memory of Document chunks and ChunkStore")
+    parser.add_argument("--pdf", default="atc22-elhemali.pdf")
+    args = parser.parse_args()
+
+    pages = PyPDFLoader(args.pdf).load()
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1500, chunk_overlap=300, length_function=len)
+
+    tracemalloc.start()
+    splits = splitter.split_documents(pages)
+    documents_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    store = ChunkStore.from_pages(pages, splitter)
+    store.buffer
+    store_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    assert [doc.page_content for doc in splits] == list(store.texts())
+    print(f"{len(pages)} pages, {len(store)} chunks")
+    print(f"Document list: {documents_bytes / len(pages):,.0f} bytes/page")
+    print(f"ChunkStore:    {store_bytes / len(pages):,.0f} bytes/page")
@@ -0,0 +1,231 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from langchain_core.embeddings import Embeddings
+
+# Model used for both ingest and query embeddings; pin a commit hash to keep indexes reusable across upgrades
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+MODEL_REVISION = os.getenv("EMBEDDING_MODEL_REVISION", "main")
+
+# Quantized int8 exports shipped in the all-MiniLM-L6-v2 model repo
+ONNX_INT8_FILES = {
+    "avx512_vnni": "onnx/model_qint8_avx512_vnni.onnx",
+    "avx2": "onnx/model_qint8_avx2.onnx",
+    "arm64": "onnx/model_qint8_arm64.onnx",
+}
+
+
+def _default_onnx_file():
+    """Pick the int8 ONNX export that matches this CPU"""
+    import platform
+    machine = platform.machine().lower()
+    if machine in ("arm64", "aarch64"):
+        return ONNX_INT8_FILES["arm64"]
+    try:
+        with open("/proc/cpuinfo") as f:
+            if "avx512_vnni" in f.read():
+                return ONNX_INT8_FILES["avx512_vnni"]
+    except OSError:
+        pass
+    return ONNX_INT8_FILES["avx2"]
+
+
+class SentenceTransformerEmbeddings(Embeddings):
+    """LangChain embeddings on top of SentenceTransformer with a torch or ONNX backend"""
+
+    def __init__(self, model_name=MODEL_NAME, backend="torch", batch_size=64,
+                 num_threads=None, onnx_file=None, multi_process_min=None):
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self.backend = backend
+        self.batch_size = batch_size
+        self.num_threads = num_threads
+        # Texts at or above this count are encoded with a multi-process pool
+        self.multi_process_min = multi_process_min
+
+        model_kwargs = {}
+        if backend == "onnx":
+            model_kwargs["file_name"] = onnx_file or _default_onnx_file()
+            model_kwargs["provider"] = "CPUExecutionProvider"
+            if num_threads:
+                import onnxruntime
+                session_options = onnxruntime.SessionOptions()
+                session_options.intra_op_num_threads = num_threads
+                model_kwargs["session_options"] = session_options
+        elif num_threads:
+            import torch
+            torch.set_num_threads(num_threads)
+
+        self.model = SentenceTransformer(
+            model_name,
+            revision=MODEL_REVISION,
+            device="cpu",
+            backend=backend,
+            model_kwargs=model_kwargs or None
+        )
+
+    def embed_documents(self, texts):
+        texts = [text.replace("\n", " ") for text in texts]
+        if self.multi_process_min and len(texts) >= self.multi_process_min:
+            pool = self.model.start_multi_process_pool()
+            try:
+                vectors = self.model.encode_multi_process(texts, pool, batch_size=self.batch_size)
+            finally:
+                self.model.stop_multi_process_pool(pool)
+        else:
+            vectors = self.model.encode(texts, batch_size=self.batch_size)
+        return vectors.tolist()
+
+    def embed_query(self, text):
+        return self.model.encode([text.replace("\n", " ")], batch_size=1)[0].tolist()
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """Wraps an embedding backend and memoizes query vectors (LRU), so routing
+    and retrieval for the same question embed it only once"""
+
+    def __init__(self, base, max_queries=1024):
+        self.base = base
+        self.max_queries = max_queries
+        self._vectors = OrderedDict()
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        return self.base.embed_documents(texts)
+
+    def embed_query(self, text):
+        with self._lock:
+            vector = self._vectors.get(text)
+            if vector is not None:
+                self._vectors.move_to_end(text)
+                return vector
+        vector = self.base.embed_query(text)
+        with self._lock:
+            self._vectors[text] = vector
+            if len(self._vectors) > self.max_queries:
+                self._vectors.popitem(last=False)
+        return vector
+
+    def embed_queries(self, texts):
+        """Embed many queries in one batch, reusing and filling the cache"""
+        with self._lock:
+            missing = list(dict.fromkeys(t for t in texts if t not in self._vectors))
+        if missing:
+            vectors = self.base.embed_documents(missing)
+            with self._lock:
+                for text, vector in zip(missing, vectors):
+                    self._vectors[text] = vector
+                while len(self._vectors) > self.max_queries:
+                    self._vectors.popitem(last=False)
+        return [self.embed_query(t) for t in texts]
+
+
+def resolved_revision(model_name=MODEL_NAME, revision=MODEL_REVISION):
+    """Commit hash of the locally cached model snapshot (revision as given if it can't be resolved)"""
+    try:
+        from huggingface_hub import snapshot_download
+        return os.path.basename(snapshot_download(model_name, revision=revision, local_files_only=True))
+    except Exception:
+        return revision
+
+
+def get_embeddings(backend=None, batch_size=None, num_threads=None, multi_process_min=None):
+    """Create the embedding backend configured by arguments or EMBEDDING_* env vars"""
+    backend = backend or os.getenv("EMBEDDING_BACKEND", "huggingface")
+    batch_size = batch_size or int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+    num_threads = num_threads or int(os.getenv("EMBEDDING_THREADS", "0")) or None
+    if multi_process_min is None:
+        multi_process_min = int(os.getenv("EMBEDDING_MULTI_PROCESS_MIN", "0")) or None
+
+    if backend == "huggingface":
+        # Original default PyTorch path
+        from langchain_huggingface import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(
+            model_name=MODEL_NAME,
+            model_kwargs={"revision": MODEL_REVISION},
+            encode_kwargs={"batch_size": batch_size}
+        )
+    if backend in ("torch", "onnx"):
+        return SentenceTransformerEmbeddings(
+            backend=backend,
+            batch_size=batch_size,
+            num_threads=num_threads,
+            multi_process_min=multi_process_min
+        )
+    raise ValueError(f"Unknown embedding backend: {backend}")
+
+
+def benchmark(pdf_path, queries, backends=("huggingface", "onnx"), k=10, batch_size=64, num_threads=None):
+    """Compare embedding throughput and top-k retrieval agreement against the first backend"""
+    import numpy as np
+    from langchain_community.document_loaders import PyPDFLoader
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    documents = PyPDFLoader(pdf_path).load()
+    splits = RecursiveCharacterTextSplitter(
+        chunk_size=1500,
+        chunk_overlap=300,
+        length_function=len
+    ).split_documents(documents)
+    texts = [doc.page_content for doc in splits]
+
+    results = []
+    baseline_top = None
+    for backend in backends:
+        embeddings = get_embeddings(backend=backend, batch_size=batch_size, num_threads=num_threads)
+        embeddings.embed_documents(texts[:batch_size])  # warm up
+
+        start = time.perf_counter()
+        doc_vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+        ingest_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        query_vectors = np.asarray([embeddings.embed_query(q) for q in queries], dtype=np.float32)
+        query_seconds = time.perf_counter() - start
+
+        # Cosine top-k per query
+        doc_vectors /= np.linalg.norm(doc_vectors, axis=1, keepdims=True)
+        query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+        top = np.argsort(-(query_vectors @ doc_vectors.T), axis=1)[:, :k]
+
+        if baseline_top is None:
+            baseline_top = top
+        agreement = np.mean([
+            len(set(a) & set(b)) / k for a, b in zip(top, baseline_top)
+        ])
+        results.append({
+            "backend": backend,
+            "chunks": len(texts),
+            "chunks_per_sec": len(texts) / ingest_seconds,
+            "query_ms": 1000 * query_seconds / max(len(queries), 1),
+            f"top{k}_agreement": float(agreement),
+        })
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends")
+    parser.add_argument("--pdf", default="atc22-elhemali.pdf")
+    parser.add_argument("--backends", default="huggingface,torch,onnx")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    sample_queries = [
+        "What is PutItem in DynamoDB API?",
+        "How does DynamoDB handle partition splits?",
+        "Explain the DynamoDB timeline",
+        "Show me log replica on a log node",
+        "How are read and write capacity units admitted?",
+        "What is global admission control?",
+        "How does DynamoDB ensure durability with write-ahead logs?",
+        "How are transactions implemented?",
+    ]
+    for row in benchmark(args.pdf, sample_queries, args.backends.split(","), args.k, args.batch_size, args.threads):
+        print(", ".join(f"{key}={value:.3f}" if isinstance(value, float) else f"{key}={value}"
+                        for key, value in row.items()))
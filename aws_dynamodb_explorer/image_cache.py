@@ -0,0 +1,103 @@
+import io
+import os
+import threading
+from collections import OrderedDict
+
+# Longest thumbnail side in pixels and encoding used for rendering
+THUMBNAIL_MAX_SIDE = 800
+THUMBNAIL_FORMAT = "WEBP"
+THUMBNAIL_QUALITY = 80
+
+
+def thumbnail_path(image_id, output_dir="./pdf_images"):
+    return os.path.join(output_dir, f"{image_id}.thumb.{THUMBNAIL_FORMAT.lower()}")
+
+
+def full_image_path(image_id, output_dir="./pdf_images"):
+    return os.path.join(output_dir, f"{image_id}.png")
+
+
+def make_thumbnail(image, max_side=THUMBNAIL_MAX_SIDE, fmt=THUMBNAIL_FORMAT, quality=THUMBNAIL_QUALITY):
+    """Encode a size-bounded copy of a PIL image"""
+    thumb = image.copy()
+    thumb.thumbnail((max_side, max_side))
+    if fmt == "JPEG" and thumb.mode not in ("RGB", "L"):
+        thumb = thumb.convert("RGB")
+    elif thumb.mode not in ("RGB", "RGBA", "L"):
+        thumb = thumb.convert("RGBA")
+    buffered = io.BytesIO()
+    thumb.save(buffered, format=fmt, quality=quality)
+    return buffered.getvalue()
+
+
+def save_thumbnail(image_id, image, output_dir="./pdf_images"):
+    """Write the thumbnail next to the original PNG"""
+    data = make_thumbnail(image)
+    with open(thumbnail_path(image_id, output_dir), "wb") as f:
+        f.write(data)
+    return data
+
+
+class ByteLRU:
+    """Thread-safe LRU cache bounded by total value size in bytes"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._items[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._items)
+
+
+def load_thumbnail_bytes(image_id, cache, output_dir="./pdf_images"):
+    """Thumbnail bytes from the cache, then disk; backfills thumbnails for older ingests"""
+    data = cache.get(image_id)
+    if data is not None:
+        return data
+    path = thumbnail_path(image_id, output_dir)
+    try:
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                data = f.read()
+        elif os.path.exists(full_image_path(image_id, output_dir)):
+            from PIL import Image
+            with Image.open(full_image_path(image_id, output_dir)) as image:
+                data = save_thumbnail(image_id, image, output_dir)
+        else:
+            return None
+    except OSError:
+        return None
+    cache.put(image_id, data)
+    return data
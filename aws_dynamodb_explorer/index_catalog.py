@@ -0,0 +1,136 @@
+import json
+import os
+import time
+from collections import Counter
+
+CATALOG_VERSION = 1
+CATALOG_FILE = "catalog.json"
+
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _precision(backend):
+    return "int8" if backend == "onnx" else "fp32"
+
+
+class IndexCatalog:
+    """Index statistics maintained at ingest time and read back in O(1).
+
+    Records chunk counts by type, page and source, the embedding model and
+    revision, on-disk size and build time in a small JSON file next to the index, so
+    the UI and monitoring never have to scan or probe the vector store.
+    """
+
+    def __init__(self, data=None):
+        self.data = data or {
+            "catalog_version": CATALOG_VERSION,
+            "chunks_by_type": {},
+            "chunks_by_page": {},
+            "chunks_by_source": {},
+            "embedding": {},
+            "disk_bytes": {},
+            "built_at": None,
+            "build_seconds": None,
+        }
+
+    @classmethod
+    def load(cls, index_dir):
+        """Catalog stored in index_dir, or None if the index has none yet"""
+        path = os.path.join(index_dir, CATALOG_FILE)
+        try:
+            with open(path, encoding="utf-8") as f:
+                return cls(json.load(f))
+        except (OSError, ValueError):
+            return None
+
+    def save(self, index_dir):
+        os.makedirs(index_dir, exist_ok=True)
+        tmp = os.path.join(index_dir, CATALOG_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp, os.path.join(index_dir, CATALOG_FILE))
+
+    def add_chunks(self, metadatas):
+        """Count chunks from their metadata dicts (type defaults to text)"""
+        by_type = Counter(self.data["chunks_by_type"])
+        by_source = Counter(self.data["chunks_by_source"])
+        by_page = {t: Counter(pages) for t, pages in self.data["chunks_by_page"].items()}
+        for metadata in metadatas:
+            chunk_type = metadata.get("type", "text")
+            by_type[chunk_type] += 1
+            by_source[str(metadata.get("source", "unknown"))] += 1
+            by_page.setdefault(chunk_type, Counter())[str(metadata.get("page", "unknown"))] += 1
+        self.data["chunks_by_type"] = dict(by_type)
+        self.data["chunks_by_source"] = dict(by_source)
+        self.data["chunks_by_page"] = {t: dict(pages) for t, pages in by_page.items()}
+
+    def set_embedding(self, model, backend, **extra):
+        self.data["embedding"] = {"model": model, "backend": backend, **extra}
+
+    def embedding_matches(self, model, revision=None, backend=None):
+        """Whether the index was embedded with this model, revision and vector precision.
+
+        An unrecorded revision is not checked. The torch backends (huggingface,
+        torch) give the same fp32 vectors; onnx gives int8-quantized ones.
+        """
+        embedding = self.data["embedding"]
+        if embedding.get("model") != model:
+            return False
+        if backend is not None and _precision(embedding.get("backend")) != _precision(backend):
+            return False
+        return revision is None or embedding.get("revision") in (None, revision)
+
+    def set_build(self, started, finished=None):
+        finished = finished or time.time()
+        self.data["built_at"] = finished
+        self.data["build_seconds"] = round(finished - started, 3)
+
+    def measure_disk(self, **dirs):
+        """Record on-disk size of each named directory, e.g. index=..., images=..."""
+        self.data["disk_bytes"] = {name: _dir_size(path) for name, path in dirs.items()}
+
+    # --- Readers ---
+    @property
+    def total_chunks(self):
+        return sum(self.data["chunks_by_type"].values())
+
+    def count(self, chunk_type):
+        return self.data["chunks_by_type"].get(chunk_type, 0)
+
+    @property
+    def disk_bytes(self):
+        return sum(self.data["disk_bytes"].values())
+
+
+def catalog_from_vectorstore(vectorstore):
+    """Backfill a catalog for an index built before catalogs existed (one full metadata scan)"""
+    catalog = IndexCatalog()
+    if hasattr(vectorstore, "_metadatas"):
+        metadatas = vectorstore._metadatas
+    else:
+        metadatas = vectorstore.get(include=["metadatas"])["metadatas"]
+    catalog.add_chunks(m or {} for m in metadatas)
+    return catalog
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Print the index catalog as JSON (for monitoring)")
+    default_dir = "./vector_index" if os.getenv("VECTOR_STORE") == "numpy" else "./chroma_db"
+    parser.add_argument("index_dir", nargs="?", default=default_dir)
+    args = parser.parse_args()
+
+    catalog = IndexCatalog.load(args.index_dir)
+    if catalog is None:
+        raise SystemExit(f"No {CATALOG_FILE} in {args.index_dir}")
+    print(json.dumps(catalog.data, indent=2))
@@ -0,0 +1,87 @@
+import math
+import re
+from collections import namedtuple
+
+# A plan names the pipeline to run and the stages it needs, for the trace
+Plan = namedtuple("Plan", ["name", "reason", "stages"])
+
+PLAN_STAGES = {
+    "image": ["image vector search", "keyword rerank"],
+    "text": ["vector search", "bm25", "image rerank", "llm"],
+    "web": ["web search"],
+}
+
+# Keyword shortcuts only for unambiguous asks; everything else goes to the classifier
+IMAGE_PATTERN = re.compile(
+    r"\b(show|display)\b.*\b(diagram|figure|image|picture|chart|graph|illustration|timeline)s?\b"
+)
+
+WEB_PATTERN = re.compile(
+    r"\b(latest|news|release notes)\b"
+    # AWS services the DynamoDB paper does not cover
+    r"|\b(migration service|dms|rds|s3|lambda|ec2)\b"
+)
+
+# Example questions per plan for the embedding classifier
+PROTOTYPES = {
+    "image": [
+        "show me the architecture diagram",
+        "what does the figure of the request routing look like",
+        "picture of the DynamoDB timeline",
+        "display the chart of latency over time",
+    ],
+    "text": [
+        "what is PutItem in the DynamoDB API",
+        "explain how partitions are split",
+        "how does DynamoDB ensure durability",
+        "what is global admission control",
+        "how are transactions implemented",
+        "how does provisioned capacity affect cost and throttling",
+    ],
+    "web": [
+        "what is the latest DynamoDB pricing",
+        "recent AWS announcements for databases",
+        "how do I connect AWS Lambda to a queue",
+        "compare DynamoDB with MongoDB Atlas costs this year",
+    ],
+}
+
+
+def _normalize(vector):
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+def _dot(a, b):
+    return sum(x * y for x, y in zip(a, b))
+
+
+class QueryRouter:
+    """Cheap local router: keyword rules first, then nearest-centroid over the query vector"""
+
+    def __init__(self, embeddings, prototypes=PROTOTYPES, margin=0.05):
+        self.embeddings = embeddings
+        self.margin = margin
+        self.centroids = {}
+        for name, examples in prototypes.items():
+            vectors = [_normalize(v) for v in embeddings.embed_documents(examples)]
+            centroid = [sum(column) / len(vectors) for column in zip(*vectors)]
+            self.centroids[name] = _normalize(centroid)
+
+    def route(self, question, web_available=True):
+        question_lower = question.lower()
+        if IMAGE_PATTERN.search(question_lower):
+            return Plan("image", "keyword rule", PLAN_STAGES["image"])
+        if web_available and WEB_PATTERN.search(question_lower):
+            return Plan("web", "keyword rule", PLAN_STAGES["web"])
+
+        # Query vector comes from the embedding cache and is reused by retrieval
+        query = _normalize(self.embeddings.embed_query(question))
+        scores = {name: _dot(query, centroid) for name, centroid in self.centroids.items()}
+        if not web_available:
+            scores.pop("web", None)
+        best = max(scores, key=scores.get)
+        if best != "text" and scores[best] - scores.get("text", -1.0) < self.margin:
+            best = "text"
+        reason = "classifier " + ", ".join(f"{name}={score:.2f}" for name, score in scores.items())
+        return Plan(best, reason, PLAN_STAGES[best])
@@ -0,0 +1,189 @@
+import os
+from dotenv import load_dotenv
+from startup_profile import lazy_import
+
+# Retrieval pipeline shared by the Streamlit app and the batch CLI (no Streamlit imports here)
+
+# Load environment variables before reading the backend settings below
+load_dotenv()
+
+# Vector store backend: "chroma" (default) or "numpy" (in-process memmap index)
+VECTOR_STORE = os.getenv("VECTOR_STORE", "chroma")
+VECTOR_STORE_DIR = "./vector_index" if VECTOR_STORE == "numpy" else "./chroma_db"
+# NumPy store only: from this many chunks on, search the nearest k-means (IVF) lists instead of every row
+VECTOR_IVF_MIN_CHUNKS = int(os.getenv("VECTOR_IVF_MIN_CHUNKS", "50000"))
+VECTOR_IVF_NPROBE = int(os.getenv("VECTOR_IVF_NPROBE", "8"))
+
+def split_pdf(pdf_path):
+    """Load the PDF and split it into a compact ChunkStore"""
+    loader = lazy_import("langchain_community.document_loaders").PyPDFLoader(pdf_path)
+    documents = loader.load()
+    # Split text using recursive character splitter with larger chunks for tables
+    text_splitter = lazy_import("langchain_text_splitters").RecursiveCharacterTextSplitter(
+        chunk_size=1500,
+        chunk_overlap=300,
+        length_function=len
+    )
+    return lazy_import("chunk_store").ChunkStore.from_pages(documents, text_splitter)
+
+def vectorstore_exists():
+    """Check whether a persisted vector store is on disk"""
+    if VECTOR_STORE == "numpy":
+        return os.path.exists(os.path.join(VECTOR_STORE_DIR, "docs.json"))
+    return os.path.exists("./chroma_db") and os.path.exists("./chroma_db/chroma.sqlite3")
+
+def open_vectorstore(embeddings):
+    """Open the persisted vector store"""
+    if VECTOR_STORE == "numpy":
+        return lazy_import("vector_index").NumpyVectorStore(embeddings, persist_directory=VECTOR_STORE_DIR)
+    return lazy_import("langchain_community.vectorstores").Chroma(
+        persist_directory=VECTOR_STORE_DIR,
+        embedding_function=embeddings
+    )
+
+def build_vectorstore(splits, embeddings):
+    """Create and persist a vector store from document chunks"""
+    if VECTOR_STORE == "numpy":
+        return lazy_import("vector_index").NumpyVectorStore.from_documents(
+            splits, embeddings, persist_directory=VECTOR_STORE_DIR
+        )
+    return lazy_import("langchain_community.vectorstores").Chroma.from_documents(
+        documents=splits,
+        embedding=embeddings,
+        persist_directory=VECTOR_STORE_DIR
+    )
+
+def make_vector_retriever(vectorstore, k=15):
+    """Vector retriever; a large NumPy index gets an IVF index (built once) and probes only nprobe lists"""
+    search_kwargs = {"k": k}
+    if VECTOR_STORE == "numpy" and len(vectorstore) >= VECTOR_IVF_MIN_CHUNKS:
+        if not vectorstore.has_ivf:
+            vectorstore.build_ivf()
+        search_kwargs["nprobe"] = VECTOR_IVF_NPROBE
+    return vectorstore.as_retriever(search_kwargs=search_kwargs)
+
+def rerank_images(question, image_docs):
+    """Rerank image documents by keyword matches with the question"""
+    if not image_docs:
+        return image_docs
+    question_lower = question.lower()
+    # Extract key terms from question
+    key_terms = [word for word in question_lower.split() 
+                if word not in ['show', 'me', 'the', 'a', 'an', 'can', 'you', 'picture', 'image', 'diagram', 'figure']]
+    
+    # Score each image based on keyword matches
+    scored_images = []
+    for doc in image_docs:
+        content_lower = doc.page_content.lower()
+        # Count how many key terms appear in the description
+        score = sum(1 for term in key_terms if term in content_lower)
+        # Boost score if multiple words appear together
+        if len(key_terms) >= 2:
+            phrase = ' '.join(key_terms[:3])  # Check first 3 words as phrase
+            if phrase in content_lower:
+                score += 5  # Big boost for phrase match
+        scored_images.append((score, doc))
+    
+    # Sort by score descending
+    scored_images.sort(key=lambda x: x[0], reverse=True)
+    
+    # Only keep images with score > 0 (at least one keyword match)
+    image_docs = [doc for score, doc in scored_images if score > 0]
+    return image_docs
+
+def search_images(question, vectorstore, k=15):
+    """Image-only lookup: vector search restricted to image chunks, then keyword rerank"""
+    image_docs = vectorstore.similarity_search(question, k=k, filter={"type": "image"})
+    return rerank_images(question, image_docs)[:2]
+
+def query_document(question, vector_retriever, bm25_retriever, llm, conversation="", raise_errors=False):
+    """Query the document using RAG with BM25 reranking (errors become the answer unless raise_errors)"""
+    try:
+        # Get documents from vector retriever (includes both text and images)
+        vector_docs = vector_retriever.invoke(question)
+        
+        # Get documents from BM25 (text only)
+        bm25_docs = bm25_retriever.invoke(question)
+        
+        # Separate images from vector results
+        image_docs = [doc for doc in vector_docs if doc.metadata.get("type") == "image"]
+        text_vector_docs = [doc for doc in vector_docs if doc.metadata.get("type") != "image"]
+        
+        # Rerank images based on question keywords
+        image_docs = rerank_images(question, image_docs)
+        
+        # Combine and deduplicate text documents (simple ensemble)
+        all_docs = []
+        seen_content = set()
+        
+        # Add BM25 results first (keyword matching)
+        for doc in bm25_docs:
+            if doc.page_content not in seen_content:
+                all_docs.append(doc)
+                seen_content.add(doc.page_content)
+        
+        # Add vector text results (semantic matching)
+        for doc in text_vector_docs:
+            if doc.page_content not in seen_content:
+                all_docs.append(doc)
+                seen_content.add(doc.page_content)
+        
+        # Add top ranked images (limit to top 2 most relevant)
+        all_docs.extend(image_docs[:2])
+        
+        if not all_docs or len(all_docs) == 0:
+            return "NOT_FOUND_IN_DOCUMENT", []
+        
+        # Create context from retrieved documents (use top 6, excluding images for text context)
+        text_docs_for_context = [doc for doc in all_docs if doc.metadata.get("type") != "image"][:6]
+        context = "\n\n".join([doc.page_content for doc in text_docs_for_context])
+        
+        # If we have images, add their descriptions to context
+        if image_docs:
+            image_context = "\n\n".join([doc.page_content for doc in image_docs[:2]])
+            context = f"{context}\n\n{image_context}" if context else image_context
+        
+        # Earlier turns only help resolve follow-ups like "what about its latency?"
+        conversation_block = ""
+        if conversation:
+            conversation_block = f"\nConversation so far (use only to understand what a follow-up question refers to):\n{conversation}\n"
+        
+        # Create prompt with strict instructions
+        prompt = f"""You are a document assistant. Your ONLY job is to answer questions using the context provided below.
+
+Context from document:
+{context}
+{conversation_block}
+Question: {question}
+
+CRITICAL RULES:
+- You MUST ONLY use information from the context above
+- DO NOT use your general knowledge or training data
+- If the context does not contain information to answer the question, respond with EXACTLY: "NOT_FOUND_IN_DOCUMENT"
+- If the context mentions the topic even briefly, provide that information
+- DO NOT make up or infer information not present in the context
+
+Answer:"""
+        
+        # Get response from LLM
+        response = llm.invoke(prompt)
+        answer = response.content if hasattr(response, 'content') else str(response)
+        
+        # Additional validation: check if answer contains keywords from context
+        if answer and "NOT_FOUND_IN_DOCUMENT" not in answer:
+            # Extract key terms from the question
+            question_lower = question.lower()
+            context_lower = context.lower()
+            
+            # Check if the answer topic is actually in the context
+            # For questions about specific AWS services not in doc
+            if any(term in question_lower for term in ['migration service', 'dms', 'rds', 's3', 'lambda', 'ec2']) and \
+               not any(term in context_lower for term in ['migration', 'dms']):
+                answer = "NOT_FOUND_IN_DOCUMENT"
+        
+        # Return all docs including images
+        return answer, all_docs[:10]
+    except Exception as e:
+        if raise_errors:
+            raise
+        return f"Error querying document: {str(e)}", []
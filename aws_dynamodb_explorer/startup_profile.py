@@ -0,0 +1,125 @@
+import sys
+import time
+import importlib
+import subprocess
+from contextlib import contextmanager
+
+# Heavy modules app.py imports lazily on first use
+HEAVY_MODULES = [
+    "langchain_community.document_loaders",
+    "langchain_community.vectorstores",
+    "langchain_community.retrievers",
+    "langchain_text_splitters",
+    "langchain_huggingface",
+    "langchain_openai",
+    "sentence_transformers",
+    "fitz",
+    "PIL.Image",
+    "tavily",
+    "openai",
+]
+
+# Stage name -> seconds. Lives in this module so it survives Streamlit reruns.
+_timings = {}
+_process_start = time.perf_counter()
+
+
+def lazy_import(name):
+    """Import a module on first use and record how long the import took"""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    _timings.setdefault(f"import {name}", time.perf_counter() - start)
+    return module
+
+
+@contextmanager
+def timed(stage):
+    """Record the duration of the first run of a stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _timings.setdefault(stage, time.perf_counter() - start)
+
+
+def record(stage, seconds):
+    """Record a duration measured by the caller (first value wins)"""
+    _timings.setdefault(stage, seconds)
+
+
+def mark(stage):
+    """Record time elapsed since the process started, e.g. time to interactive"""
+    _timings.setdefault(stage, time.perf_counter() - _process_start)
+
+
+def report():
+    """Recorded timings in seconds, in the order they happened"""
+    return dict(_timings)
+
+
+def cold_import_report(modules=HEAVY_MODULES):
+    """Time each module's import in a fresh interpreter, so nothing is already cached"""
+    results = {}
+    for name in modules:
+        code = (
+            "import time, importlib; s = time.perf_counter(); "
+            f"importlib.import_module({name!r}); print(time.perf_counter() - s)"
+        )
+        proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+        results[name] = float(proc.stdout.strip()) if proc.returncode == 0 else None
+    return results
+
+
+def first_query_report(pdf_path, question):
+    """Time a cold index load and first retrieval the way app.py runs them"""
+    timings = {}
+    start = time.perf_counter()
+    from embedding_backend import get_embeddings
+    embeddings = get_embeddings()
+    timings["load embeddings"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    loaders = lazy_import("langchain_community.document_loaders")
+    splitters = lazy_import("langchain_text_splitters")
+    text_splitter = splitters.RecursiveCharacterTextSplitter(
+        chunk_size=1500,
+        chunk_overlap=300,
+        length_function=len
+    )
+    from chunk_store import ChunkStore, ChunkStoreBM25Retriever
+    splits = ChunkStore.from_pages(loaders.PyPDFLoader(pdf_path).load(), text_splitter)
+    timings["load and split pdf"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ChunkStoreBM25Retriever.from_store(splits, k=8).invoke(question)
+    embeddings.embed_query(question)
+    timings["first query (bm25 + query embedding)"] = time.perf_counter() - start
+    return timings
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Cold-start profile for app.py")
+    parser.add_argument("--pdf", default="atc22-elhemali.pdf")
+    parser.add_argument("--question", default="What is PutItem in DynamoDB API?")
+    parser.add_argument("--skip-query", action="store_true")
+    args = parser.parse_args()
+
+    print("Import time per module (fresh interpreter):")
+    total = 0.0
+    for name, seconds in cold_import_report().items():
+        if seconds is None:
+            print(f"  {name:40} not installed")
+        else:
+            total += seconds
+            print(f"  {name:40} {seconds * 1000:8.1f} ms")
+    print(f"  {'(sum)':40} {total * 1000:8.1f} ms")
+
+    if not args.skip_query:
+        print("\nFirst query latency:")
+        for stage, seconds in first_query_report(args.pdf, args.question).items():
+            print(f"  {stage:40} {seconds * 1000:8.1f} ms")
@@ -0,0 +1,292 @@
+import os
+import json
+import time
+import uuid
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+# Rows scored per block so float16 -> float32 conversion stays cache sized
+BLOCK_ROWS = 65536
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _top_k(scores, k):
+    """Indices of the k highest scores, best first"""
+    if k >= len(scores):
+        return np.argsort(-scores)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+class NumpyVectorStore(VectorStore):
+    """In-process vector store: normalized float16 embeddings in a memory-mapped matrix.
+
+    Search is an exact dot product with argpartition top-k. For large corpora
+    build_ivf() adds a coarse k-means index that only scores the nearest lists.
+    Metadata filters on "type" and "page" are evaluated on column arrays.
+    """
+
+    def __init__(self, embedding, persist_directory=None):
+        self._embedding = embedding
+        self.persist_directory = persist_directory
+        self._matrix = np.zeros((0, 0), dtype=np.float16)
+        self._ids = []
+        self._texts = []
+        self._metadatas = []
+        self._types = np.zeros(0, dtype=object)
+        self._pages = np.zeros(0, dtype=np.int32)
+        self._centroids = None
+        self._lists = None
+        if persist_directory and os.path.exists(os.path.join(persist_directory, "docs.json")):
+            self._load()
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    # --- Persistence ---
+    def _path(self, name):
+        return os.path.join(self.persist_directory, name)
+
+    def _load(self):
+        with open(self._path("docs.json"), encoding="utf-8") as f:
+            docs = json.load(f)
+        self._ids = docs["ids"]
+        self._texts = docs["texts"]
+        self._metadatas = docs["metadatas"]
+        self._matrix = np.load(self._path("embeddings.npy"), mmap_mode="r")
+        if os.path.exists(self._path("ivf.npz")):
+            ivf = np.load(self._path("ivf.npz"))
+            self._centroids = ivf["centroids"]
+            self._lists = ivf["lists"]
+        self._refresh_columns()
+
+    def _save(self):
+        if not self.persist_directory:
+            return
+        os.makedirs(self.persist_directory, exist_ok=True)
+        # Write to temp files and swap so readers never see a partial index.
+        # The old memmap is released first so the swap also works on Windows.
+        matrix = np.asarray(self._matrix, dtype=np.float16)
+        self._matrix = matrix
+        tmp = self._path("embeddings.tmp.npy")
+        np.save(tmp, matrix)
+        os.replace(tmp, self._path("embeddings.npy"))
+        with open(self._path("docs.tmp.json"), "w", encoding="utf-8") as f:
+            json.dump({"ids": self._ids, "texts": self._texts, "metadatas": self._metadatas}, f)
+        os.replace(self._path("docs.tmp.json"), self._path("docs.json"))
+        self._save_ivf()
+        self._matrix = np.load(self._path("embeddings.npy"), mmap_mode="r")
+
+    def _save_ivf(self):
+        if not self.persist_directory:
+            return
+        if self._centroids is not None:
+            np.savez(self._path("ivf.npz"), centroids=self._centroids, lists=self._lists)
+        elif os.path.exists(self._path("ivf.npz")):
+            os.remove(self._path("ivf.npz"))
+
+    def _refresh_columns(self):
+        self._types = np.array([m.get("type", "text") for m in self._metadatas], dtype=object)
+        self._pages = np.array([int(m.get("page", -1)) for m in self._metadatas], dtype=np.int32)
+
+    # --- Writes ---
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = list(metadatas) if metadatas else [{} for _ in texts]
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+        vectors = _normalize(self._embedding.embed_documents(texts)).astype(np.float16)
+
+        if len(self._matrix):
+            self._matrix = np.concatenate([np.asarray(self._matrix), vectors])
+        else:
+            self._matrix = vectors
+        self._ids.extend(ids)
+        self._texts.extend(texts)
+        self._metadatas.extend(metadatas)
+        self._refresh_columns()
+        # New rows invalidate the coarse index; rebuild it explicitly
+        self._centroids = None
+        self._lists = None
+        self._save()
+        return ids
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, persist_directory=None, **kwargs):
+        store = cls(embedding, persist_directory=persist_directory)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
+
+    @property
+    def has_ivf(self):
+        return self._centroids is not None
+
+    def build_ivf(self, n_lists=None, iterations=10, seed=0):
+        """Cluster rows into n_lists k-means lists for approximate search"""
+        n = len(self._matrix)
+        if n == 0:
+            return
+        n_lists = min(n_lists or int(np.sqrt(n)) or 1, n)
+        rng = np.random.default_rng(seed)
+        sample = np.asarray(self._matrix[rng.choice(n, size=min(n, n_lists * 64), replace=False)], dtype=np.float32)
+        centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)]
+        for _ in range(iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(n_lists):
+                members = sample[assign == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+            centroids = _normalize(centroids)
+
+        lists = np.empty(n, dtype=np.int32)
+        for start in range(0, n, BLOCK_ROWS):
+            block = np.asarray(self._matrix[start:start + BLOCK_ROWS], dtype=np.float32)
+            lists[start:start + BLOCK_ROWS] = np.argmax(block @ centroids.T, axis=1)
+        self._centroids = centroids
+        self._lists = lists
+        self._save_ivf()
+
+    # --- Reads ---
+    def _filter_mask(self, filter):
+        if not filter:
+            return None
+        mask = np.ones(len(self._matrix), dtype=bool)
+        for key, value in filter.items():
+            if key == "type":
+                values = value if isinstance(value, (list, tuple, set)) else [value]
+                mask &= np.isin(self._types, list(values))
+            elif key == "page":
+                values = value if isinstance(value, (list, tuple, set)) else [value]
+                mask &= np.isin(self._pages, [int(v) for v in values])
+            else:
+                mask &= np.array([m.get(key) == value for m in self._metadatas], dtype=bool)
+        return mask
+
+    def _candidates(self, query, mask, nprobe):
+        """Row indices to score: everything, or the rows of the nprobe nearest IVF lists"""
+        if self._centroids is None or not nprobe:
+            rows = None
+        else:
+            probe = _top_k(self._centroids @ query, nprobe)
+            rows = np.flatnonzero(np.isin(self._lists, probe))
+        if mask is not None:
+            rows = np.flatnonzero(mask) if rows is None else rows[mask[rows]]
+        return rows
+
+    def _search(self, query_vector, k, filter=None, nprobe=None):
+        if len(self._matrix) == 0:
+            return []
+        query = _normalize(query_vector)
+        rows = self._candidates(query, self._filter_mask(filter), nprobe)
+        if rows is None:
+            scores = np.empty(len(self._matrix), dtype=np.float32)
+            for start in range(0, len(self._matrix), BLOCK_ROWS):
+                block = np.asarray(self._matrix[start:start + BLOCK_ROWS], dtype=np.float32)
+                scores[start:start + BLOCK_ROWS] = block @ query
+            top = _top_k(scores, k)
+            return [(int(i), float(scores[i])) for i in top]
+        if len(rows) == 0:
+            return []
+        scores = np.asarray(self._matrix[rows], dtype=np.float32) @ query
+        top = _top_k(scores, k)
+        return [(int(rows[i]), float(scores[i])) for i in top]
+
+    def _document(self, row):
+        return Document(page_content=self._texts[row], metadata=dict(self._metadatas[row]), id=self._ids[row])
+
+    def similarity_search_by_vector_with_score(self, embedding, k=4, filter=None, nprobe=None, **kwargs):
+        return [(self._document(row), score) for row, score in self._search(embedding, k, filter, nprobe)]
+
+    def similarity_search_with_score(self, query, k=4, filter=None, nprobe=None, **kwargs):
+        query_vector = self._embedding.embed_query(query)
+        return self.similarity_search_by_vector_with_score(query_vector, k, filter, nprobe)
+
+    def similarity_search_by_vector(self, embedding, k=4, filter=None, nprobe=None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, filter, nprobe)]
+
+    def similarity_search(self, query, k=4, filter=None, nprobe=None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter, nprobe)]
+
+    def _select_relevance_score_fn(self):
+        # Scores are cosine similarities in [-1, 1]
+        return lambda score: (score + 1.0) / 2.0
+
+    def get_by_ids(self, ids):
+        wanted = set(ids)
+        return [self._document(row) for row, doc_id in enumerate(self._ids) if doc_id in wanted]
+
+    def __len__(self):
+        return len(self._ids)
+
+
+def benchmark(pdf_path, queries, k=15, chroma_dir="./bench_chroma", numpy_dir="./bench_vector_index", nprobe=4):
+    """Compare query latency and recall@k of Chroma and the NumPy store against exact search"""
+    import shutil
+    from langchain_community.document_loaders import PyPDFLoader
+    from langchain_community.vectorstores import Chroma
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    from embedding_backend import get_embeddings
+
+    embeddings = get_embeddings()
+    splits = RecursiveCharacterTextSplitter(
+        chunk_size=1500,
+        chunk_overlap=300,
+        length_function=len
+    ).split_documents(PyPDFLoader(pdf_path).load())
+    for path in (chroma_dir, numpy_dir):
+        shutil.rmtree(path, ignore_errors=True)
+
+    chroma = Chroma.from_documents(documents=splits, embedding=embeddings, persist_directory=chroma_dir)
+    store = NumpyVectorStore.from_documents(splits, embeddings, persist_directory=numpy_dir)
+    query_vectors = [embeddings.embed_query(q) for q in queries]
+
+    # Exact float32 ground truth
+    exact_matrix = _normalize(embeddings.embed_documents([doc.page_content for doc in splits]))
+    truth = [set(store._texts[i] for i in _top_k(exact_matrix @ _normalize(q), k)) for q in query_vectors]
+
+    def run(search):
+        start = time.perf_counter()
+        found = [set(doc.page_content for doc in search(q)) for q in query_vectors]
+        ms = 1000 * (time.perf_counter() - start) / len(query_vectors)
+        recall = np.mean([len(f & t) / len(t) for f, t in zip(found, truth)])
+        return ms, float(recall)
+
+    results = {
+        "chroma": run(lambda q: chroma.similarity_search_by_vector(q, k=k)),
+        "numpy_exact": run(lambda q: store.similarity_search_by_vector(q, k=k)),
+    }
+    store.build_ivf()
+    results["numpy_ivf"] = run(lambda q: store.similarity_search_by_vector(q, k=k, nprobe=nprobe))
+    return len(splits), results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark NumpyVectorStore against Chroma")
+    parser.add_argument("--pdf", default="atc22-elhemali.pdf")
+    parser.add_argument("-k", type=int, default=15)
+    parser.add_argument("--nprobe", type=int, default=4)
+    args = parser.parse_args()
+
+    sample_queries = [
+        "What is PutItem in DynamoDB API?",
+        "How does DynamoDB handle partition splits?",
+        "Explain the DynamoDB timeline",
+        "Show me log replica on a log node",
+        "What is global admission control?",
+        "How are transactions implemented?",
+    ]
+    chunks, results = benchmark(args.pdf, sample_queries, k=args.k, nprobe=args.nprobe)
+    print(f"{chunks} chunks, k={args.k}")
+    for name, (ms, recall) in results.items():
+        print(f"{name:12} {ms:8.2f} ms/query  recall@{args.k}={recall:.3f}")
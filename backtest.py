@@ -0,0 +1,127 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from indicators import sma_kernel
+
+YEAR_BARS = 252
+FAST_WINDOWS = (10, 20, 50)
+SLOW_WINDOWS = (100, 150, 200)
+
+
+def sweep_pairs(fast_windows=FAST_WINDOWS, slow_windows=SLOW_WINDOWS):
+    return [(fast, slow) for fast in fast_windows for slow in slow_windows if fast < slow]
+
+
+def _metrics(strategy, active, position):
+    """CAGR, Sharpe, max drawdown and trade count along the bar axis (axis=-2)"""
+    bars = active.sum(axis=-2)
+    equity = np.cumprod(1 + strategy, axis=-2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cagr = equity[..., -1, :] ** (YEAR_BARS / bars) - 1
+        masked = np.where(active, strategy, np.nan)
+        sharpe = np.nanmean(masked, axis=-2) / np.nanstd(masked, axis=-2, ddof=1) * np.sqrt(YEAR_BARS)
+    drawdown = (equity / np.maximum.accumulate(equity, axis=-2) - 1).min(axis=-2)
+    previous = np.concatenate([np.zeros_like(position[..., :1, :]), position[..., :-1, :]], axis=-2)
+    trades = ((position != 0) & (position != previous)).sum(axis=-2)
+    return cagr, sharpe, drawdown, trades
+
+
+def backtest(close, pairs, cost=0.001, allow_short=False):
+    """Moving-average crossover results for every (fast, slow) pair and ticker.
+
+    close is a dates x tickers matrix. Each distinct window is computed once
+    for all tickers; signals, returns and metrics are then evaluated as one
+    (pairs x bars x tickers) array. The position decided at a bar's close is
+    held over the next bar, and cost is charged per unit of turnover.
+    """
+    values = close.to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = values[1:] / values[:-1] - 1
+    tradable = np.isfinite(returns)
+    returns = np.where(tradable, returns, 0.0)
+
+    windows = sorted({w for pair in pairs for w in pair})
+    sma = {w: sma_kernel((values,), None, window=w)[0][0] for w in windows}
+    fast = np.stack([sma[f] for f, _ in pairs])[:, :-1]
+    slow = np.stack([sma[s] for _, s in pairs])[:, :-1]
+
+    valid = np.isfinite(fast) & np.isfinite(slow)
+    position = np.where(fast > slow, 1.0, -1.0 if allow_short else 0.0)
+    position = np.where(valid, position, 0.0)
+    previous = np.concatenate([np.zeros_like(position[:, :1]), position[:, :-1]], axis=1)
+    strategy = position * returns - cost * np.abs(position - previous)
+
+    cagr, sharpe, drawdown, trades = _metrics(strategy, valid & tradable, position)
+    index = pd.MultiIndex.from_tuples(
+        [(f, s, t) for f, s in pairs for t in close.columns], names=["Fast", "Slow", "Ticker"]
+    )
+    return pd.DataFrame({
+        "CAGR": cagr.ravel(), "Sharpe": sharpe.ravel(), "Max Drawdown": drawdown.ravel(), "Trades": trades.ravel(),
+    }, index=index)
+
+
+def buy_and_hold(close):
+    """Benchmark metrics per ticker for holding over the whole history"""
+    values = close.to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = values[1:] / values[:-1] - 1
+    active = np.isfinite(returns)
+    returns = np.where(active, returns, 0.0)
+    cagr, sharpe, drawdown, _ = _metrics(returns, active, active.astype(float))
+    return pd.DataFrame({"CAGR": cagr, "Sharpe": sharpe, "Max Drawdown": drawdown},
+                        index=close.columns.rename("Ticker"))
+
+
+def run_sweep(close, pairs, cost=0.001, allow_short=False, processes=0, chunk_size=8):
+    """Backtest all pairs, optionally fanning chunks of pairs out to worker processes"""
+    if processes <= 1 or len(pairs) <= chunk_size:
+        return backtest(close, pairs, cost, allow_short)
+    chunks = [pairs[i:i + chunk_size] for i in range(0, len(pairs), chunk_size)]
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        parts = pool.map(backtest, [close] * len(chunks), chunks, [cost] * len(chunks), [allow_short] * len(chunks))
+        return pd.concat(list(parts))
+
+
+def summarize(results):
+    """Average across tickers per parameter pair, best Sharpe first"""
+    return results.groupby(level=["Fast", "Slow"]).mean().sort_values("Sharpe", ascending=False)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from datetime import datetime, timedelta
+    from screener import price_matrix
+    from sectors import all_tickers
+
+    parser = argparse.ArgumentParser(description="Sweep MA-crossover windows across every sector ticker")
+    parser.add_argument("--fast", type=int, nargs="+", default=list(range(5, 55, 5)))
+    parser.add_argument("--slow", type=int, nargs="+", default=list(range(60, 260, 10)))
+    parser.add_argument("--cost", type=float, default=0.001, help="cost per unit of turnover")
+    parser.add_argument("--short", action="store_true", help="go short when fast < slow")
+    parser.add_argument("--processes", type=int, default=0)
+    parser.add_argument("--days", type=int, default=930)
+    parser.add_argument("--stub", action="store_true", help="use the local stub source (no network)")
+    args = parser.parse_args()
+
+    start = datetime.now() - timedelta(days=args.days)
+    if args.stub:
+        from bulk_loader import StubBatchFetch
+        stub = StubBatchFetch()
+        frames = {t: stub.bars(t, start, datetime.now()) for t in all_tickers()}
+    else:
+        from bulk_loader import BulkLoader
+        from price_store import default_store
+        store = default_store()
+        BulkLoader(store).load_all(start)
+        frames = {t: store.read(t, start=start) for t in all_tickers()}
+    close = price_matrix(frames)
+
+    pairs = sweep_pairs(args.fast, args.slow)
+    t0 = time.perf_counter()
+    results = run_sweep(close, pairs, args.cost, args.short, args.processes)
+    elapsed = time.perf_counter() - t0
+    print(f"{len(pairs)} pairs x {close.shape[1]} tickers x {close.shape[0]} bars in {elapsed:.2f}s")
+    print(summarize(results).head(10).round(3).to_string())
+    print("\nBuy and hold (mean across tickers):")
+    print(buy_and_hold(close).mean().round(3).to_string())
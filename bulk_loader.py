@@ -0,0 +1,182 @@
+import random
+import time
+import zlib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from price_store import _clean, default_store, yahoo_fetch
+from sectors import all_tickers, sectors
+
+
+# --- BATCH FETCHERS ---
+# A batch fetcher takes (tickers, start, end, interval) and returns {ticker: frame}.
+# Tickers it could not load are simply missing from the result.
+def yahoo_batch_fetch(tickers, start, end, interval="1d"):
+    """One multi-ticker Yahoo Finance download, split back into per-ticker frames"""
+    import yfinance as yf
+    data = yf.download(tickers, start=start, end=end, interval=interval, group_by="ticker",
+                       threads=True, progress=False)
+    frames = {}
+    for ticker in tickers:
+        if isinstance(data.columns, pd.MultiIndex):
+            if ticker not in data.columns.get_level_values(0):
+                continue
+            frame = data[ticker].dropna(how="all")
+        else:
+            frame = data  # a single ticker comes back without the ticker level
+        if not frame.empty:
+            frames[ticker] = frame
+    return frames
+
+
+def batch_from_fetcher(fetcher):
+    """Adapt a per-ticker fetcher (e.g. FixtureFetcher) to the batch interface"""
+    def batch_fetch(tickers, start, end, interval="1d"):
+        frames = {}
+        for ticker in tickers:
+            frame = fetcher(ticker, start, end, interval)
+            if frame is not None and not frame.empty:
+                frames[ticker] = frame
+        return frames
+    return batch_fetch
+
+
+class StubBatchFetch:
+    """Local stub source: deterministic random-walk daily bars, optional failures and latency"""
+
+    def __init__(self, fail=(), fail_rate=0.0, latency=0.0, seed=0):
+        self.fail = set(fail)
+        self.fail_rate = fail_rate
+        self.latency = latency
+        self.seed = seed
+        self.calls = []
+
+    def bars(self, ticker, start, end):
+        index = pd.bdate_range(pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize(), inclusive="left")
+        rng = np.random.default_rng([zlib.crc32(ticker.encode()), self.seed])
+        # Walk from a fixed origin so overlapping ranges return the same bars
+        offset = int(np.busday_count("2000-01-03", index[0].date())) if len(index) else 0
+        steps = rng.normal(0.0003, 0.015, size=offset + len(index))
+        close = pd.Series(100 * np.exp(np.cumsum(steps)[offset:]), index=index)
+        return pd.DataFrame({
+            "Open": close.shift(1).fillna(close), "High": close * 1.01, "Low": close * 0.99,
+            "Close": close, "Volume": 1_000_000.0,
+        }, index=index)
+
+    def __call__(self, tickers, start, end, interval="1d"):
+        self.calls.append(list(tickers))
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail_rate and random.random() < self.fail_rate:
+            raise ConnectionError("stub: batch request failed")
+        return {t: self.bars(t, start, end) for t in tickers if t not in self.fail}
+
+
+# --- LOADER ---
+class BulkLoader:
+    """Fills a PriceStore for many tickers in multi-ticker batches fetched concurrently.
+
+    Tickers are grouped by the range they are missing (after the first load
+    every ticker misses the same top-up range), each group is split into
+    batches, and batches run on a thread pool. A failed batch is retried with
+    backoff; tickers still missing are then retried one by one so a single bad
+    ticker never fails the rest of its batch.
+    """
+
+    def __init__(self, store, batch_fetch=None, batch_size=20, workers=4, retries=2, backoff=1.0):
+        self.store = store
+        if batch_fetch is None and store.fetcher is not None:
+            batch_fetch = yahoo_batch_fetch if store.fetcher is yahoo_fetch else batch_from_fetcher(store.fetcher)
+        self.batch_fetch = batch_fetch
+        self.batch_size = batch_size
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+
+    def _with_retry(self, tickers, start, end, interval):
+        for attempt in range(self.retries + 1):
+            try:
+                return self.batch_fetch(tickers, start, end, interval), None
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                if attempt < self.retries:
+                    time.sleep(self.backoff * 2 ** attempt)
+        return {}, error
+
+    def _load_batch(self, tickers, start, end, interval):
+        frames, error = self._with_retry(tickers, start, end, interval)
+        status = {}
+        for ticker in tickers:
+            frame = _clean(frames.get(ticker))
+            if frame is None and len(tickers) > 1:
+                # Isolate the ticker: retry it alone
+                single, error = self._with_retry([ticker], start, end, interval)
+                frame = _clean(single.get(ticker))
+            if frame is None and error:
+                status[ticker] = error
+                continue
+            # An empty answer still stamps the fetch time (e.g. no new bars on a holiday)
+            self.store.write(ticker, interval, frame, covered_from=start)
+            status[ticker] = "ok" if frame is not None else "no data"
+        return status
+
+    def load(self, tickers, start, end=None, interval="1d"):
+        """Bring every ticker up to date; returns {ticker: "ok" | "cached" | "no data" | error}"""
+        end = end or datetime.now() + timedelta(days=1)
+        status = {}
+        groups = defaultdict(list)
+        for ticker in tickers:
+            ranges = self.store.missing_ranges(ticker, start, end, interval)
+            if not ranges or self.batch_fetch is None:
+                status[ticker] = "cached"
+            for missing in ranges:
+                groups[missing].append(ticker)
+
+        if self.batch_fetch is not None:
+            jobs = [
+                (group[i:i + self.batch_size], range_start, range_end)
+                for (range_start, range_end), group in groups.items()
+                for i in range(0, len(group), self.batch_size)
+            ]
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                futures = [pool.submit(self._load_batch, batch, s, e, interval) for batch, s, e in jobs]
+                for future in futures:
+                    for ticker, result in future.result().items():
+                        # A ticker with two missing ranges keeps its first failure
+                        if status.get(ticker) in (None, "ok", "no data"):
+                            status[ticker] = result
+        return status
+
+    def load_sector(self, sector, start, end=None, interval="1d"):
+        return self.load(sectors[sector], start, end, interval)
+
+    def load_all(self, start, end=None, interval="1d"):
+        return self.load(all_tickers(), start, end, interval)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fill the local price store for a sector or all sectors")
+    parser.add_argument("--sector", choices=list(sectors), help="default: all sectors")
+    parser.add_argument("--days", type=int, default=930)
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--stub", action="store_true", help="use the local stub source (no network)")
+    parser.add_argument("--root", default="./price_data")
+    args = parser.parse_args()
+
+    store = default_store(args.root)
+    stub = StubBatchFetch(fail=["ZOMATO.NS"]) if args.stub else None
+    loader = BulkLoader(store, batch_fetch=stub, batch_size=args.batch_size, workers=args.workers, backoff=0.1)
+    start = datetime.now() - timedelta(days=args.days)
+
+    t0 = time.perf_counter()
+    status = loader.load_sector(args.sector, start) if args.sector else loader.load_all(start)
+    elapsed = time.perf_counter() - t0
+    for ticker, result in status.items():
+        print(f"{ticker:15} {result}")
+    failed = sum(1 for r in status.values() if r not in ("ok", "cached", "no data"))
+    print(f"{len(status)} tickers in {elapsed:.2f}s, {failed} failed")
@@ -0,0 +1,211 @@
+import threading
+import numpy as np
+import pandas as pd
+
+
+class RollingMoments:
+    """Rolling covariance and correlation of N return series, updated one bar at a time.
+
+    Keeps the last `window` return vectors in a ring buffer plus running sums
+    over the window: pairwise counts, sums and cross products. Each new bar adds
+    its outer products and subtracts those of the bar leaving the window, so an
+    update costs O(N^2) instead of O(window * N^2). Missing returns (NaN) are
+    excluded pairwise. Sums are rebuilt from the buffer every `refresh_every`
+    bars to stop floating-point drift from accumulating.
+    """
+
+    def __init__(self, n, window=126, refresh_every=None):
+        self.n = n
+        self.window = window
+        self.refresh_every = refresh_every or window
+        self.buffer = np.zeros((window, n))
+        self.valid = np.zeros((window, n), dtype=bool)
+        self.pos = 0
+        self.seen = 0
+        self._reset_sums()
+
+    def _reset_sums(self):
+        self.count = np.zeros((self.n, self.n))   # bars where both i and j are valid
+        self.sum_x = np.zeros((self.n, self.n))   # sum of x_i over those bars
+        self.cross = np.zeros((self.n, self.n))   # sum of x_i * x_j over those bars
+
+    def _add(self, x, valid, sign):
+        v = valid.astype(float)
+        self.count += sign * np.outer(v, v)
+        self.sum_x += sign * np.outer(x, v)
+        self.cross += sign * np.outer(x, x)
+
+    def update(self, returns):
+        """Push one bar of returns (length N, NaN for missing)"""
+        returns = np.asarray(returns, dtype=float)
+        valid = np.isfinite(returns)
+        x = np.where(valid, returns, 0.0)
+        if self.seen >= self.window:
+            self._add(self.buffer[self.pos], self.valid[self.pos], -1.0)
+        self.buffer[self.pos] = x
+        self.valid[self.pos] = valid
+        self._add(x, valid, 1.0)
+        self.pos = (self.pos + 1) % self.window
+        self.seen += 1
+        if self.seen % self.refresh_every == 0:
+            self.refresh()
+
+    def revise_last(self, returns):
+        """Replace the most recent bar's returns (e.g. a partial bar that has since closed)"""
+        returns = np.asarray(returns, dtype=float)
+        valid = np.isfinite(returns)
+        x = np.where(valid, returns, 0.0)
+        last = (self.pos - 1) % self.window
+        self._add(self.buffer[last], self.valid[last], -1.0)
+        self.buffer[last] = x
+        self.valid[last] = valid
+        self._add(x, valid, 1.0)
+
+    def update_many(self, returns):
+        returns = np.atleast_2d(np.asarray(returns, dtype=float))
+        if len(returns) < self.window:
+            for row in returns:
+                self.update(row)
+            return
+        # Only the last `window` bars matter: load them and rebuild the sums in one go
+        last = returns[-self.window:]
+        valid = np.isfinite(last)
+        self.buffer[:] = np.where(valid, last, 0.0)
+        self.valid[:] = valid
+        self.pos = 0
+        self.seen += len(returns)
+        self.refresh()
+
+    def refresh(self):
+        """Recompute the window sums exactly from the buffer"""
+        # Unfilled buffer rows are zero and invalid, so they add nothing
+        v = self.valid.astype(float)
+        x = self.buffer
+        self.count = v.T @ v
+        self.sum_x = x.T @ v
+        self.cross = x.T @ x
+
+    def covariance(self):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cov = (self.cross - self.sum_x * self.sum_x.T / self.count) / (self.count - 1)
+        return np.where(self.count > 1, cov, np.nan)
+
+    def correlation(self):
+        cov = self.covariance()
+        std = np.sqrt(np.diag(cov))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = cov / np.outer(std, std)
+        return np.clip(corr, -1.0, 1.0)
+
+
+class RollingCorrelation:
+    """Rolling moments over a dates x tickers price matrix, advanced only by new bars.
+
+    The last bar seen may still have been forming; if its prices have changed
+    by the next advance(), its return is revised before new bars are added.
+    """
+
+    def __init__(self, tickers, window=126):
+        self.tickers = list(tickers)
+        self.moments = RollingMoments(len(self.tickers), window)
+        self.last_bar = None
+        self.last_prices = None
+        self.prev_prices = None  # prices of the bar before last_bar, to revise its return
+        self._lock = threading.Lock()
+
+    def advance(self, close):
+        """Feed the bars of close after the last one already seen; returns how many were added"""
+        with self._lock:
+            close = close.reindex(columns=self.tickers)
+            if self.last_bar is not None:
+                if self.last_bar in close.index:
+                    self._revise(close.loc[self.last_bar].to_numpy(dtype=float))
+                close = close.loc[close.index > self.last_bar]
+            if close.empty:
+                return 0
+            values = close.to_numpy(dtype=float)
+            if self.last_prices is not None:
+                values = np.vstack([self.last_prices, values])
+            with np.errstate(divide="ignore", invalid="ignore"):
+                returns = values[1:] / values[:-1] - 1
+            self.moments.update_many(returns)
+            self.last_bar = close.index[-1]
+            self.last_prices = values[-1]
+            self.prev_prices = values[-2] if len(values) > 1 else None
+            return len(returns)
+
+    def _revise(self, prices):
+        if np.array_equal(prices, self.last_prices, equal_nan=True):
+            return
+        if self.prev_prices is not None:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                self.moments.revise_last(prices / self.prev_prices - 1)
+        self.last_prices = prices
+
+    def covariance(self):
+        return pd.DataFrame(self.moments.covariance(), index=self.tickers, columns=self.tickers)
+
+    def correlation(self):
+        return pd.DataFrame(self.moments.correlation(), index=self.tickers, columns=self.tickers)
+
+
+def min_variance_weights(cov, shrinkage=0.1, long_only=True, max_iter=50):
+    """Minimum-variance portfolio weights from a covariance DataFrame.
+
+    The covariance is shrunk towards its diagonal so it stays invertible when
+    there are more tickers than bars. With long_only, tickers that get a
+    negative weight are dropped and the rest re-solved until none are left.
+    Tickers without a usable variance get zero weight.
+    """
+    names = cov.index
+    sigma = cov.to_numpy(dtype=float)
+    usable = np.isfinite(np.diag(sigma)) & (np.diag(sigma) > 0)
+    weights = np.zeros(len(names))
+    active = np.flatnonzero(usable)
+    for _ in range(max_iter):
+        if not len(active):
+            break
+        sub = np.nan_to_num(sigma[np.ix_(active, active)])
+        sub = (1 - shrinkage) * sub + shrinkage * np.diag(np.diag(sub))
+        raw = np.linalg.solve(sub, np.ones(len(active)))
+        w = raw / raw.sum()
+        if not long_only or (w >= 0).all():
+            weights[active] = w
+            break
+        active = active[w > 0]
+    return pd.Series(weights, index=names)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Time incremental vs full rolling covariance")
+    parser.add_argument("--tickers", type=int, default=300)
+    parser.add_argument("--bars", type=int, default=650)
+    parser.add_argument("--window", type=int, default=126)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    factor = rng.normal(0, 0.01, size=(args.bars, 1))
+    returns = factor + rng.normal(0, 0.015, size=(args.bars, args.tickers))
+    index = pd.bdate_range("2024-01-01", periods=args.bars + 1)
+    close = pd.DataFrame(100 * np.vstack([np.ones(args.tickers), np.cumprod(1 + returns, axis=0)]),
+                         index=index, columns=[f"T{i}" for i in range(args.tickers)])
+
+    engine = RollingCorrelation(close.columns, args.window)
+    t0 = time.perf_counter()
+    engine.advance(close.iloc[:-1])
+    t1 = time.perf_counter()
+    engine.advance(close)
+    t2 = time.perf_counter()
+    full = close.pct_change().iloc[-args.window:].cov()
+    t3 = time.perf_counter()
+    weights = min_variance_weights(engine.covariance())
+    t4 = time.perf_counter()
+
+    error = np.nanmax(np.abs(engine.covariance().to_numpy() - full.to_numpy()))
+    print(f"{args.tickers} tickers, window {args.window}")
+    print(f"warm-up {args.bars} bars: {(t1 - t0) * 1000:.0f} ms, +1 bar: {(t2 - t1) * 1000:.2f} ms, "
+          f"full window recompute: {(t3 - t2) * 1000:.1f} ms, max abs diff {error:.2e}")
+    print(f"min-variance weights: {(t4 - t3) * 1000:.1f} ms, {int((weights > 0).sum())} tickers held")
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+PX_PER_CANDLE = 4  # narrower candles are unreadable anyway
+PX_PER_LINE_POINT = 1
+
+
+def candle_budget(width_px):
+    return max(int(width_px // PX_PER_CANDLE), 10)
+
+
+def line_budget(width_px):
+    return max(int(width_px // PX_PER_LINE_POINT), 10)
+
+
+def downsample_ohlc(frame, max_points):
+    """Merge consecutive bars into at most max_points candles.
+
+    Each bucket keeps the first open, highest high, lowest low, last close and
+    total volume, labelled with the bucket's first timestamp, so wicks and
+    gaps survive. Buckets are aligned to the first bar so they stay stable as
+    new bars are appended.
+    """
+    n = len(frame)
+    if n <= max_points:
+        return frame
+    size = -(-n // max_points)
+    starts = np.arange(0, n, size)
+    ends = np.append(starts[1:], n) - 1
+    columns = {}
+    if "Open" in frame:
+        columns["Open"] = frame["Open"].to_numpy(dtype=float)[starts]
+    if "High" in frame:
+        columns["High"] = np.fmax.reduceat(frame["High"].to_numpy(dtype=float), starts)
+    if "Low" in frame:
+        columns["Low"] = np.fmin.reduceat(frame["Low"].to_numpy(dtype=float), starts)
+    if "Close" in frame:
+        columns["Close"] = frame["Close"].to_numpy(dtype=float)[ends]
+    if "Volume" in frame:
+        columns["Volume"] = np.add.reduceat(np.nan_to_num(frame["Volume"].to_numpy(dtype=float)), starts)
+    return pd.DataFrame(columns, index=frame.index[starts])
+
+
+def lttb(x, y, max_points):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets.
+
+    Keeps the first and last point and, from each bucket in between, the point
+    forming the largest triangle with the previously kept point and the
+    average of the next bucket, which preserves peaks and troughs.
+    """
+    n = len(x)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    every = (n - 2) / (max_points - 2)
+    edges = (np.arange(max_points - 1) * every).astype(int) + 1
+    edges[-1] = n - 1
+    kept = np.empty(max_points, dtype=int)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(max_points - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        kept[i + 1] = a
+    return kept
+
+
+def lttb_series(series, max_points):
+    """LTTB over a time-indexed Series; NaN points (e.g. MA warm-up) are dropped first"""
+    series = series.dropna()
+    if len(series) <= max_points:
+        return series
+    x = series.index.asi8 if isinstance(series.index, pd.DatetimeIndex) else np.arange(len(series))
+    return series.iloc[lttb(x, series.to_numpy(dtype=float), max_points)]
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import time
+    from datetime import datetime, timedelta
+    import plotly.graph_objects as go
+    from bulk_loader import StubBatchFetch
+
+    parser = argparse.ArgumentParser(description="Compare figure size with and without downsampling")
+    parser.add_argument("--years", type=int, default=20)
+    parser.add_argument("--width", type=int, default=1400)
+    args = parser.parse_args()
+
+    end = datetime(2026, 1, 1)
+    frame = StubBatchFetch().bars("TEST.NS", end - timedelta(days=365 * args.years), end)
+    ma = frame["Close"].rolling(200).mean()
+
+    def figure(candles, line):
+        fig = go.Figure(go.Candlestick(x=candles.index, open=candles["Open"], high=candles["High"],
+                                       low=candles["Low"], close=candles["Close"]))
+        fig.add_trace(go.Scatter(x=line.index, y=line))
+        return len(fig.to_json())
+
+    t0 = time.perf_counter()
+    candles = downsample_ohlc(frame, candle_budget(args.width))
+    line = lttb_series(ma, line_budget(args.width))
+    elapsed = (time.perf_counter() - t0) * 1000
+    print(json.dumps({
+        "bars": len(frame), "candles": len(candles), "line_points": len(line),
+        "downsample_ms": round(elapsed, 2),
+        "full_json_bytes": figure(frame, ma), "downsampled_json_bytes": figure(candles, line),
+    }, indent=2))
@@ -0,0 +1,282 @@
+import threading
+from collections import OrderedDict, defaultdict, namedtuple
+import numpy as np
+import pandas as pd
+
+# --- KERNELS ---
+# Kernels work on 2-D float arrays (bars x tickers) and never modify their inputs.
+# Each takes (inputs, state, **params) and returns (outputs, state); the state
+# carries everything needed to continue after the last bar, so new bars can be
+# processed without touching the old ones. state=None starts from scratch.
+
+
+def _nan_rows(rows, columns):
+    return np.full((rows, columns), np.nan)
+
+
+def _rolling_sums(values, window):
+    """Rolling sum and sum of squares via cumulative sums; NaN unless the window is full"""
+    valid = np.isfinite(values)
+    # Centre each column to keep the sum of squares well conditioned
+    with np.errstate(all="ignore"):
+        centre = np.nanmean(values, axis=0) if len(values) else np.zeros(values.shape[1])
+    centred = np.where(valid, values - np.nan_to_num(centre), 0.0)
+    zero = np.zeros((1, values.shape[1]))
+    s1 = np.vstack([zero, np.cumsum(centred, axis=0)])
+    s2 = np.vstack([zero, np.cumsum(centred * centred, axis=0)])
+    count = np.vstack([zero, np.cumsum(valid, axis=0)])
+    sums = _nan_rows(*values.shape)
+    squares = _nan_rows(*values.shape)
+    full = (count[window:] - count[:-window]) == window
+    sums[window - 1:] = np.where(full, s1[window:] - s1[:-window], np.nan)
+    squares[window - 1:] = np.where(full, s2[window:] - s2[:-window], np.nan)
+    return sums, squares, np.nan_to_num(centre)
+
+
+def _with_tail(x, state, window):
+    """Prepend the previous window-1 bars; the new tail is always exactly window-1 rows"""
+    tail = _nan_rows(window - 1, x.shape[1]) if state is None else state
+    full = np.vstack([tail, x])
+    return full, full[len(full) - (window - 1):]
+
+
+def _ewm(values, alpha, last):
+    """Recursive exponential smoothing down the rows, vectorised across columns.
+
+    Seeds with the first value (pandas ewm(adjust=False)); NaN inputs carry the
+    previous value forward.
+    """
+    out = np.empty_like(values)
+    prev = last.copy()
+    for i, row in enumerate(values):
+        prev = np.where(np.isnan(prev), row, np.where(np.isnan(row), prev, prev + alpha * (row - prev)))
+        out[i] = prev
+    return out, prev
+
+
+def sma_kernel(inputs, state, window=50):
+    (close,) = inputs
+    full, tail = _with_tail(close, state, window)
+    sums, _, centre = _rolling_sums(full, window)
+    return (sums[window - 1:] / window + centre,), tail
+
+
+def bollinger_kernel(inputs, state, window=20, k=2.0):
+    (close,) = inputs
+    full, tail = _with_tail(close, state, window)
+    sums, squares, centre = _rolling_sums(full, window)
+    mean = sums / window
+    std = np.sqrt(np.maximum(squares / window - mean * mean, 0.0))
+    mid = (mean + centre)[window - 1:]
+    std = std[window - 1:]
+    return (mid, mid + k * std, mid - k * std), tail
+
+
+def ema_kernel(inputs, state, span=20):
+    (close,) = inputs
+    last = np.full(close.shape[1], np.nan) if state is None else state
+    out, last = _ewm(close, 2.0 / (span + 1), last)
+    return (out,), last
+
+
+def macd_kernel(inputs, state, fast=12, slow=26, signal=9):
+    (close,) = inputs
+    empty = np.full(close.shape[1], np.nan)
+    fast_last, slow_last, signal_last = state if state is not None else (empty, empty, empty)
+    fast_ema, fast_last = _ewm(close, 2.0 / (fast + 1), fast_last)
+    slow_ema, slow_last = _ewm(close, 2.0 / (slow + 1), slow_last)
+    macd = fast_ema - slow_ema
+    signal_line, signal_last = _ewm(macd, 2.0 / (signal + 1), signal_last)
+    return (macd, signal_line, macd - signal_line), (fast_last, slow_last, signal_last)
+
+
+def rsi_kernel(inputs, state, period=14):
+    (close,) = inputs
+    n = close.shape[1]
+    empty = np.full(n, np.nan)
+    prev_close, gain_last, loss_last, seen = state if state is not None else (empty, empty, empty, np.zeros(n))
+    delta = np.diff(np.vstack([prev_close, close]), axis=0)
+    gains = np.where(np.isnan(delta), np.nan, np.maximum(delta, 0.0))
+    losses = np.where(np.isnan(delta), np.nan, np.maximum(-delta, 0.0))
+    avg_gain, gain_last = _ewm(gains, 1.0 / period, gain_last)
+    avg_loss, loss_last = _ewm(losses, 1.0 / period, loss_last)
+    counts = seen + np.cumsum(np.isfinite(delta), axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = np.where(avg_loss == 0, 100.0, 100.0 - 100.0 / (1.0 + avg_gain / avg_loss))
+    rsi = np.where(counts >= period, rsi, np.nan)
+    if len(close):
+        prev_close = np.where(np.isnan(close[-1]), prev_close, close[-1])
+        seen = counts[-1]
+    return (rsi,), (prev_close, gain_last, loss_last, seen)
+
+
+def atr_kernel(inputs, state, period=14):
+    high, low, close = inputs
+    n = close.shape[1]
+    empty = np.full(n, np.nan)
+    prev_close, atr_last, seen = state if state is not None else (empty, empty, np.zeros(n))
+    previous = np.vstack([prev_close, close[:-1]])
+    # fmax ignores NaN, so the first bar falls back to high - low
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - previous), np.abs(low - previous)))
+    atr, atr_last = _ewm(true_range, 1.0 / period, atr_last)
+    counts = seen + np.cumsum(np.isfinite(true_range), axis=0)
+    atr = np.where(counts >= period, atr, np.nan)
+    if len(close):
+        prev_close = np.where(np.isnan(close[-1]), prev_close, close[-1])
+        seen = counts[-1]
+    return (atr,), (prev_close, atr_last, seen)
+
+
+Indicator = namedtuple("Indicator", ["inputs", "outputs", "kernel", "defaults"])
+
+INDICATORS = {
+    "sma": Indicator(("Close",), ("sma",), sma_kernel, {"window": 50}),
+    "ema": Indicator(("Close",), ("ema",), ema_kernel, {"span": 20}),
+    "rsi": Indicator(("Close",), ("rsi",), rsi_kernel, {"period": 14}),
+    "macd": Indicator(("Close",), ("macd", "signal", "hist"), macd_kernel, {"fast": 12, "slow": 26, "signal": 9}),
+    "bollinger": Indicator(("Close",), ("mid", "upper", "lower"), bollinger_kernel, {"window": 20, "k": 2.0}),
+    "atr": Indicator(("High", "Low", "Close"), ("atr",), atr_kernel, {"period": 14}),
+}
+
+
+# --- STATE HELPERS ---
+def _stack_states(states):
+    """Per-ticker states (arrays whose last axis has length 1) -> one state for the batch"""
+    if states[0] is None:
+        return None
+    if isinstance(states[0], tuple):
+        return tuple(np.concatenate(parts, axis=-1) for parts in zip(*states))
+    return np.concatenate(states, axis=-1)
+
+
+def _column_state(state, j):
+    if isinstance(state, tuple):
+        return tuple(part[..., j:j + 1] for part in state)
+    return state[..., j:j + 1]
+
+
+def _last_row(frame, columns):
+    return np.array([frame[column].to_numpy()[-1] for column in columns], dtype=float)
+
+
+# --- ENGINE ---
+class IndicatorEngine:
+    """Computes indicators for many tickers at once and caches them incrementally.
+
+    Results are cached per (ticker, indicator, params) together with the last
+    bar they cover. A call with the same last bar (same date and same input
+    values) is a cache hit; a revised last bar is recomputed, and when new bars
+    have been appended only those (plus the previous last bar, which may have
+    been a partial live bar) are run through the kernel, continuing from the
+    saved state. Tickers whose pending bars share the same dates are stacked
+    into one array and computed in a single kernel call. Input frames are
+    never modified; returned frames are shared and should be treated as
+    read-only.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "incremental": 0, "full": 0}
+
+    def _plan(self, key, index, last_row):
+        """(cached result, start position, state) for computing bars from start onward"""
+        entry = self._cache.get(key)
+        if entry is not None:
+            cached = entry["index"]
+            if (len(cached) == len(index) and cached[0] == index[0] and cached[-1] == index[-1]
+                    and np.array_equal(entry["last_row"], last_row, equal_nan=True)):
+                self._cache.move_to_end(key)
+                return entry["result"], len(index), None
+            start = len(cached) - 1
+            if len(index) > start and index[0] == cached[0] and index[start] == cached[-1]:
+                return entry["result"], start, entry["state_prev"]
+        return None, 0, None
+
+    def compute_many(self, frames, name, **params):
+        """{ticker: OHLCV frame} -> {ticker: DataFrame of the indicator's outputs}"""
+        spec = INDICATORS[name]
+        params = {**spec.defaults, **params}
+        key_params = tuple(sorted(params.items()))
+        results = {}
+        groups = defaultdict(list)
+        with self._lock:
+            for ticker, frame in frames.items():
+                if frame is None or frame.empty:
+                    continue
+                key = (ticker, name, key_params)
+                last_row = _last_row(frame, spec.inputs)
+                cached, start, state = self._plan(key, frame.index, last_row)
+                if start == len(frame.index):
+                    results[ticker] = cached
+                    self.stats["hits"] += 1
+                    continue
+                self.stats["incremental" if cached is not None else "full"] += 1
+                pending = frame.index[start:]
+                groups[(len(pending), pending[0], pending[-1], state is None)].append(
+                    (ticker, key, frame, start, cached, state, last_row))
+
+        for jobs in groups.values():
+            inputs = tuple(
+                np.column_stack([frame[column].iloc[start:].to_numpy(dtype=float) for _, _, frame, start, _, _, _ in jobs])
+                for column in spec.inputs
+            )
+            state = _stack_states([job[5] for job in jobs])
+            # Keep the state before the last bar so a revised last bar can be recomputed
+            head, state_prev = spec.kernel(tuple(x[:-1] for x in inputs), state, **params)
+            tail, _ = spec.kernel(tuple(x[-1:] for x in inputs), state_prev, **params)
+            outputs = [np.vstack([h, t]) for h, t in zip(head, tail)]
+
+            for j, (ticker, key, frame, start, cached, _, last_row) in enumerate(jobs):
+                values = np.column_stack([out[:, j] for out in outputs])
+                if cached is not None:
+                    values = np.vstack([cached.to_numpy()[:start], values])
+                result = pd.DataFrame(values, index=frame.index, columns=list(spec.outputs))
+                results[ticker] = result
+                with self._lock:
+                    self._cache[key] = {
+                        "index": frame.index,
+                        "result": result,
+                        "state_prev": _column_state(state_prev, j),
+                        "last_row": last_row,
+                    }
+                    self._cache.move_to_end(key)
+                    while len(self._cache) > self.max_entries:
+                        self._cache.popitem(last=False)
+        return results
+
+    def compute(self, ticker, frame, name, **params):
+        """Indicator outputs for one ticker, aligned to frame.index"""
+        return self.compute_many({ticker: frame}, name, **params).get(ticker)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from datetime import datetime, timedelta
+
+    parser = argparse.ArgumentParser(description="Time full vs incremental indicator computation")
+    parser.add_argument("--tickers", type=int, default=30)
+    parser.add_argument("--bars", type=int, default=650)
+    args = parser.parse_args()
+
+    from bulk_loader import StubBatchFetch
+    stub = StubBatchFetch()
+    end = datetime(2026, 1, 1)
+    start = end - timedelta(days=int(args.bars * 7 / 5))
+    frames = {f"T{i}": stub.bars(f"T{i}", start, end) for i in range(args.tickers)}
+
+    engine = IndicatorEngine()
+    for label, data in [("full", frames), ("cached", frames),
+                        ("+1 bar", {t: stub.bars(t, start, end + timedelta(days=3)) for t in frames})]:
+        t0 = time.perf_counter()
+        for name in INDICATORS:
+            engine.compute_many(data, name)
+        print(f"{label:8} {len(data)} tickers x {len(INDICATORS)} indicators: "
+              f"{(time.perf_counter() - t0) * 1000:.1f} ms")
+    print(engine.stats)
@@ -0,0 +1,273 @@
+import time
+import warnings
+from datetime import date, datetime, time as clock, timedelta
+from zoneinfo import ZoneInfo
+import numpy as np
+
+# Full-day closures and early closes published by each exchange; extend these every year
+US_HOLIDAYS = {
+    "2025-01-01", "2025-01-09", "2025-01-20", "2025-02-17", "2025-04-18", "2025-05-26", "2025-06-19",
+    "2025-07-04", "2025-09-01", "2025-11-27", "2025-12-25",
+    "2026-01-01", "2026-01-19", "2026-02-16", "2026-04-03", "2026-05-25", "2026-06-19", "2026-07-03",
+    "2026-09-07", "2026-11-26", "2026-12-25",
+}
+US_EARLY_CLOSE = {"2025-07-03", "2025-11-28", "2025-12-24", "2026-11-27", "2026-12-24"}
+NSE_HOLIDAYS = {
+    "2025-02-26", "2025-03-14", "2025-03-31", "2025-04-10", "2025-04-14", "2025-04-18", "2025-05-01",
+    "2025-08-15", "2025-08-27", "2025-10-02", "2025-10-21", "2025-10-22", "2025-11-05", "2025-12-25",
+    "2026-01-26", "2026-03-03", "2026-03-26", "2026-03-31", "2026-04-03", "2026-04-14", "2026-05-01",
+    "2026-05-28", "2026-06-26", "2026-09-14", "2026-10-02", "2026-10-20", "2026-11-10", "2026-11-24",
+    "2026-12-25",
+}
+
+
+class Exchange:
+    """Regular trading session of an exchange in its local time zone, with holidays and early closes.
+
+    Holidays are only known up to the last year listed; dates after that warn
+    once and are treated as regular weekdays.
+    """
+
+    def __init__(self, name, tz, open_at, close_at, holidays=(), early_close=(), early_close_at=None):
+        self.name = name
+        self.tz = ZoneInfo(tz)
+        self.open_at = open_at
+        self.close_at = close_at
+        self.holidays = {date.fromisoformat(d) for d in holidays}
+        self.early_close = {date.fromisoformat(d) for d in early_close}
+        self.early_close_at = early_close_at
+        self.calendar_ends = max((d.year for d in self.holidays), default=None)
+        self._warned = False
+
+    def _check_calendar(self, day):
+        if self.calendar_ends is None or day.year <= self.calendar_ends or self._warned:
+            return
+        self._warned = True
+        warnings.warn(f"{self.name} holiday calendar ends in {self.calendar_ends}: {day.year} holidays are treated as "
+                      f"trading days until they are added to market_schedule.py", stacklevel=3)
+
+    def session(self, day):
+        """(open, close) as epoch seconds for a local date, or None when the exchange is shut"""
+        self._check_calendar(day)
+        if day.weekday() >= 5 or day in self.holidays:
+            return None
+        close_at = self.early_close_at if day in self.early_close else self.close_at
+        return (datetime.combine(day, self.open_at, self.tz).timestamp(),
+                datetime.combine(day, close_at, self.tz).timestamp())
+
+    def is_open(self, now=None):
+        now = time.time() if now is None else now
+        session = self.session(datetime.fromtimestamp(now, self.tz).date())
+        return session is not None and session[0] <= now < session[1]
+
+    def next_open(self, now=None):
+        """Epoch seconds of the next session open after now (now itself while open)"""
+        now = time.time() if now is None else now
+        day = datetime.fromtimestamp(now, self.tz).date()
+        for offset in range(15):
+            session = self.session(day + timedelta(days=offset))
+            if session is not None and now < session[1]:
+                return max(session[0], now)
+        raise ValueError(f"No {self.name} session in the next two weeks; check its holiday list")
+
+
+EXCHANGES = {
+    "US": Exchange("US", "America/New_York", clock(9, 30), clock(16, 0), US_HOLIDAYS, US_EARLY_CLOSE, clock(13, 0)),
+    "NSE": Exchange("NSE", "Asia/Kolkata", clock(9, 15), clock(15, 30), NSE_HOLIDAYS),
+}
+
+
+def exchange_of(ticker):
+    return EXCHANGES["NSE"] if ticker.endswith((".NS", ".BO")) else EXCHANGES["US"]
+
+
+def volatility(ts, price, bars=60):
+    """Per-second volatility of log returns over the last `bars` ticks (NaN if too few)"""
+    ts, price = ts[-bars - 1:], price[-bars - 1:]
+    if len(price) < 3:
+        return np.nan
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.diff(np.log(price))
+        seconds = np.diff(ts) / 1e9
+    usable = np.isfinite(returns) & (seconds > 0)
+    if usable.sum() < 2:
+        return np.nan
+    return float(np.sqrt(returns[usable].var(ddof=1) / seconds[usable].mean()))
+
+
+class PollScheduler:
+    """Decides when each ticker is polled next.
+
+    Closed exchanges are not polled until their next open. While open, the
+    interval is how long the price would typically take to cover the distance
+    to the ticker's nearest armed alert threshold, (margin / (z * vol))^2 for
+    a per-second volatility vol. Calm tickers far from any rule are polled
+    rarely and volatile ones near a threshold often, within [min_interval,
+    max_interval]. Tickers without price rules use the base interval. Failures
+    back off exponentially, and a ticker whose last bar hasn't changed for
+    idle_after seconds (halted or illiquid) waits half its quiet time, which
+    also grows geometrically.
+    """
+
+    def __init__(self, tickers, rules=None, windows=None, base=15, min_interval=5, max_interval=120, z=3.0,
+                 idle_after=180):
+        self.tickers = list(tickers)
+        self.rules = rules
+        self.windows = windows
+        self.base = base
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.z = z
+        self.next_due = dict.fromkeys(self.tickers, 0.0)
+        self.interval = dict.fromkeys(self.tickers, float(base))
+        self.failures = dict.fromkeys(self.tickers, 0)
+        self.idle_after = idle_after
+        self.last_seen = {}
+        self.changed_at = {}
+        self.started = None
+        self.polls = 0
+        self.requests = 0
+        self.open_seconds = dict.fromkeys(self.tickers, 0.0)  # for the fixed-interval comparison
+        self.clock = None
+
+    def due(self, now=None):
+        """Tickers to poll now; closed tickers are pushed to their exchange's next open"""
+        now = time.time() if now is None else now
+        self._advance_clock(now)
+        due = []
+        for ticker in self.tickers:
+            if self.next_due[ticker] > now:
+                continue
+            opens = exchange_of(ticker).next_open(now)
+            if opens > now:
+                self.next_due[ticker] = opens
+            else:
+                due.append(ticker)
+        return due
+
+    def _advance_clock(self, now):
+        if self.started is None:
+            self.started = self.clock = now
+        for ticker in self.tickers:
+            exchange = exchange_of(ticker)
+            # Open time between clock and now, sampled at the ends (calls are at most minutes apart)
+            if exchange.is_open(self.clock) and exchange.is_open(now):
+                self.open_seconds[ticker] += now - self.clock
+        self.clock = now
+
+    def next_wake(self):
+        return min(self.next_due.values(), default=time.time() + self.base)
+
+    def _adaptive(self, ticker, margin):
+        if self.windows is None or not np.isfinite(margin):
+            return self.base
+        ts, price, _ = self.windows(ticker)
+        vol = volatility(ts, price)
+        if not np.isfinite(vol) or vol <= 0:
+            return self.base
+        return (margin / (self.z * vol)) ** 2
+
+    def record(self, polled, failed=(), now=None, requests=0):
+        """Schedule the next poll of each polled ticker after a poll (failed: tickers that errored)"""
+        now = time.time() if now is None else now
+        self.polls += len(polled)
+        self.requests += requests
+        margins = {}
+        if self.rules is not None:
+            margins = dict(zip(self.rules.tickers, self.rules.margins()))
+        for ticker in polled:
+            if ticker in failed:
+                self.failures[ticker] += 1
+                interval = self.base * 2 ** self.failures[ticker]
+            else:
+                self.failures[ticker] = 0
+                last = self.windows(ticker)[0][-1:] if self.windows is not None else ()
+                last = int(last[0]) if len(last) else None
+                if last != self.last_seen.get(ticker) or ticker not in self.changed_at:
+                    self.last_seen[ticker] = last
+                    self.changed_at[ticker] = now
+                interval = self._adaptive(ticker, margins.get(ticker, np.inf))
+                quiet = now - self.changed_at[ticker]
+                if quiet > self.idle_after:
+                    interval = max(interval, quiet / 2)
+            interval = float(np.clip(interval, self.min_interval, self.max_interval))
+            self.interval[ticker] = interval
+            self.next_due[ticker] = now + interval
+
+    def fixed_polls(self):
+        """Ticker polls a fixed `base`-second loop would have made over the same time"""
+        if self.started is None:
+            return 0
+        return int((self.clock - self.started) / self.base * len(self.tickers))
+
+    def budget_report(self):
+        fixed = self.fixed_polls()
+        during_open = int(sum(self.open_seconds.values()) / self.base)
+        saved = 1 - self.polls / fixed if fixed else 0.0
+        saved_open = 1 - self.polls / during_open if during_open else 0.0
+        return (f"{self.polls} ticker polls in {self.requests} requests vs {fixed} at a fixed {self.base}s: "
+                f"{saved:.0%} saved overall, {saved_open:.0%} vs fixed polling during open sessions only")
+
+    def summary(self, now=None):
+        """One line: open/closed exchanges and the spread of current intervals"""
+        now = time.time() if now is None else now
+        parts = []
+        for name, exchange in EXCHANGES.items():
+            tickers = [t for t in self.tickers if exchange_of(t) is exchange]
+            if not tickers:
+                continue
+            if exchange.is_open(now):
+                intervals = [self.interval[t] for t in tickers]
+                parts.append(f"{name} open, polling every {min(intervals):.0f}-{max(intervals):.0f}s")
+            else:
+                opens = datetime.fromtimestamp(exchange.next_open(now), exchange.tz)
+                parts.append(f"{name} closed until {opens:%a %d %b %H:%M} {exchange.tz.key}")
+        return "; ".join(parts)
+
+
+if __name__ == "__main__":
+    import argparse
+    from alert_rules import RuleEngine
+    from tick_buffer import TickStore
+
+    parser = argparse.ArgumentParser(description="Simulate adaptive polling over a week of sessions vs fixed 15s")
+    parser.add_argument("--tickers", type=int, default=40, help="half US, half NSE")
+    parser.add_argument("--days", type=float, default=7)
+    parser.add_argument("--start", default="2025-04-14", help="simulation start date (UTC midnight)")
+    parser.add_argument("--fixed", action="store_true", help="poll open tickers every 15s instead (for comparison)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    tickers = [f"U{i}" for i in range(args.tickers // 2)] + [f"N{i}.NS" for i in range(args.tickers - args.tickers // 2)]
+    vols = rng.uniform(0.0001, 0.0006, len(tickers))  # per-second volatility, calm to very volatile
+    prices = dict(zip(tickers, np.full(len(tickers), 100.0)))
+    rules = RuleEngine([rule for t, d in zip(tickers, rng.uniform(0.005, 0.05, len(tickers))) for rule in (
+        {"ticker": t, "type": "below", "value": round(100 * (1 - d), 2)},
+        {"ticker": t, "type": "above", "value": round(100 * (1 + d), 2)},
+    )])
+    store = TickStore(400)
+    limits = {"min_interval": 15, "max_interval": 15, "idle_after": float("inf")} if args.fixed else {}
+    scheduler = PollScheduler(tickers, rules, store.window, **limits)
+    clock_now = datetime.fromisoformat(args.start).replace(tzinfo=ZoneInfo("UTC")).timestamp()
+    end = clock_now + args.days * 86400
+    last_tick = dict.fromkeys(tickers, clock_now)
+
+    t0 = time.perf_counter()
+    alerts = 0
+    while clock_now < end:
+        due = scheduler.due(clock_now)
+        for ticker, vol in zip(tickers, vols):
+            if ticker in due:
+                dt = clock_now - last_tick[ticker]
+                prices[ticker] *= np.exp(vol * np.sqrt(min(dt, 390 * 60)) * rng.normal())
+                store.add(ticker, [int(clock_now * 1e9)], [prices[ticker]], [1.0])
+                last_tick[ticker] = clock_now
+        if due:
+            alerts += len(rules.check_windows(store.window, changed=due, now=clock_now))
+            scheduler.record(due, now=clock_now, requests=1)
+        clock_now = max(min(scheduler.next_wake(), end), clock_now + 1)
+    elapsed = time.perf_counter() - t0
+
+    print(f"{len(tickers)} tickers over {args.days:g} days from {args.start} (simulated in {elapsed:.1f}s)")
+    print(scheduler.budget_report())
+    print(f"{alerts} alerts fired")
@@ -0,0 +1,237 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+PRICE_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+INTRADAY_INTERVALS = {"1m", "2m", "5m", "15m", "30m", "60m", "90m", "1h"}
+
+
+def _align(ts, index):
+    """Make a timestamp comparable with a (possibly tz-aware) DatetimeIndex"""
+    ts = pd.Timestamp(ts)
+    tz = getattr(index, "tz", None)
+    if tz is None:
+        return ts.tz_convert(None) if ts.tzinfo else ts
+    return ts.tz_localize(tz) if ts.tzinfo is None else ts.tz_convert(tz)
+
+
+def _clean(frame):
+    """Keep OHLCV columns, sorted and without duplicate bars (latest wins)"""
+    if frame is None or frame.empty:
+        return None
+    if isinstance(frame.columns, pd.MultiIndex):
+        frame = frame.droplevel(1, axis=1)
+    frame = frame[[c for c in PRICE_COLUMNS if c in frame.columns]]
+    frame = frame[~frame.index.duplicated(keep="last")].sort_index()
+    frame.index.name = "Date"
+    return frame
+
+
+# --- FETCHERS ---
+def yahoo_fetch(ticker, start, end, interval="1d"):
+    """Bars in [start, end) from Yahoo Finance"""
+    import yfinance as yf
+    return yf.download(ticker, start=start, end=end, interval=interval,
+                       multi_level_index=False, progress=False)
+
+
+class FixtureFetcher:
+    """Serves recorded bars from CSV fixtures (<root>/<interval>/<ticker>.csv) for offline use"""
+
+    def __init__(self, root="./fixtures/prices"):
+        self.root = root
+
+    def path(self, ticker, interval):
+        return os.path.join(self.root, interval, f"{ticker}.csv")
+
+    def __call__(self, ticker, start, end, interval="1d"):
+        path = self.path(ticker, interval)
+        if not os.path.exists(path):
+            return None
+        frame = pd.read_csv(path, index_col=0, parse_dates=True)
+        return frame.loc[(frame.index >= _align(start, frame.index)) & (frame.index < _align(end, frame.index))]
+
+
+class RecordingFetcher:
+    """Wraps a live fetcher and appends everything it returns to CSV fixtures"""
+
+    def __init__(self, fetcher=yahoo_fetch, root="./fixtures/prices"):
+        self.fetcher = fetcher
+        self.fixtures = FixtureFetcher(root)
+
+    def __call__(self, ticker, start, end, interval="1d"):
+        frame = _clean(self.fetcher(ticker, start, end, interval))
+        if frame is not None:
+            path = self.fixtures.path(ticker, interval)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if os.path.exists(path):
+                old = pd.read_csv(path, index_col=0, parse_dates=True)
+                frame = _clean(pd.concat([old, frame]))
+            frame.to_csv(path)
+        return frame
+
+
+# --- STORE ---
+class PriceStore:
+    """Local Parquet store of OHLCV bars per ticker and interval.
+
+    Each file records its last fetch time in the Parquet schema metadata.
+    get() only downloads the range missing before the first or after the
+    last stored bar, merges without duplicates and swaps the file in
+    atomically. With fetcher=None the store is read-only (fully offline).
+    """
+
+    def __init__(self, root="./price_data", fetcher=yahoo_fetch, max_age=900):
+        self.root = root
+        self.fetcher = fetcher
+        self.max_age = max_age  # seconds before the newest bars are topped up again
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def path(self, ticker, interval="1d"):
+        return os.path.join(self.root, interval, f"{ticker}.parquet")
+
+    def _lock(self, path):
+        with self._locks_guard:
+            return self._locks.setdefault(path, threading.Lock())
+
+    def read(self, ticker, interval="1d", start=None, end=None):
+        """Stored bars, optionally limited to [start, end); None when nothing is stored.
+
+        The file is memory-mapped, so only the pages read are loaded, but
+        to_pandas() still copies the columns into the returned frame.
+        """
+        path = self.path(ticker, interval)
+        if not os.path.exists(path):
+            return None
+        table = pq.read_table(path, memory_map=True)
+        if table.num_rows == 0:
+            return None
+        frame = table.to_pandas()
+        if start is not None:
+            frame = frame.loc[frame.index >= _align(start, frame.index)]
+        if end is not None:
+            frame = frame.loc[frame.index < _align(end, frame.index)]
+        return frame
+
+    def info(self, ticker, interval="1d"):
+        """Store metadata of a file: fetched_at and, once known, covered_from"""
+        path = self.path(ticker, interval)
+        if not os.path.exists(path):
+            return {}
+        metadata = pq.read_schema(path).metadata or {}
+        value = metadata.get(b"price_store")
+        return json.loads(value) if value else {}
+
+    def fetched_at(self, ticker, interval="1d"):
+        return self.info(ticker, interval).get("fetched_at")
+
+    def write(self, ticker, interval, frame, covered_from=None):
+        """Merge bars into the stored file: dedupe, sort, then atomic replace.
+
+        covered_from records the earliest start already requested, so a
+        ticker listed after that date is not re-fetched at the head forever.
+        A fetch that returned nothing for a ticker with no file still writes
+        an empty file, so its fetch time is stamped too.
+        """
+        path = self.path(ticker, interval)
+        with self._lock(path):
+            old = self.read(ticker, interval)
+            merged = _clean(pd.concat([old, frame]) if old is not None else frame)
+            if merged is None:
+                merged = pd.DataFrame(columns=PRICE_COLUMNS, index=pd.DatetimeIndex([], name="Date"), dtype=float)
+            info = {"fetched_at": time.time()}
+            covered = [pd.Timestamp(t) for t in (self.info(ticker, interval).get("covered_from"), covered_from) if t]
+            if covered:
+                info["covered_from"] = min(_align(t, merged.index) for t in covered).isoformat()
+            table = pa.Table.from_pandas(merged, preserve_index=True)
+            table = table.replace_schema_metadata({
+                **(table.schema.metadata or {}),
+                b"price_store": json.dumps(info).encode(),
+            })
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            pq.write_table(table, tmp)
+            os.replace(tmp, path)
+            return merged if len(merged) else None
+
+    def missing_ranges(self, ticker, start, end, interval="1d"):
+        """[start, end) ranges that are not stored yet or are stale"""
+        stored = self.read(ticker, interval)
+        info = self.info(ticker, interval)
+        if stored is None or stored.empty:
+            # Nothing stored: fetch it all, unless the last attempt found nothing within max_age
+            if time.time() - (info.get("fetched_at") or 0) <= self.max_age:
+                return []
+            return [(start, end)]
+        ranges = []
+        first, last = stored.index[0], stored.index[-1]
+        covered_from = _align(info["covered_from"], stored.index) if info.get("covered_from") else first
+        if _align(start, stored.index) < min(first, covered_from):
+            ranges.append((start, first.to_pydatetime()))
+        fetched_at = info.get("fetched_at") or 0
+        if _align(end, stored.index) > last and time.time() - fetched_at > self.max_age:
+            # Refetch from the last stored bar: it may have been a partial (live) bar
+            last_start = last.to_pydatetime()
+            if interval not in INTRADAY_INTERVALS:
+                last_start = last_start.replace(tzinfo=None)
+            ranges.append((last_start, end))
+        return ranges
+
+    def update(self, ticker, start, end=None, interval="1d"):
+        """Fetch only missing bars; returns the number of bars fetched"""
+        if self.fetcher is None:
+            return 0
+        end = end or datetime.now() + timedelta(days=1)
+        fetched = 0
+        for range_start, range_end in self.missing_ranges(ticker, start, end, interval):
+            frame = _clean(self.fetcher(ticker, range_start, range_end, interval))
+            # Write even when nothing came back so the fetch time is stamped
+            self.write(ticker, interval, frame, covered_from=range_start)
+            fetched += 0 if frame is None else len(frame)
+        return fetched
+
+    def get(self, ticker, start, end=None, interval="1d"):
+        """Bars from start to end, topping up the local store first"""
+        self.update(ticker, start, end, interval)
+        return self.read(ticker, interval, start=start, end=end)
+
+
+def default_store(root="./price_data"):
+    """Store configured by PRICE_SOURCE: yahoo (default), record, fixtures or offline"""
+    source = os.getenv("PRICE_SOURCE", "yahoo")
+    fixtures = os.getenv("PRICE_FIXTURES", "./fixtures/prices")
+    if source == "fixtures":
+        return PriceStore(root, fetcher=FixtureFetcher(fixtures))
+    if source == "record":
+        return PriceStore(root, fetcher=RecordingFetcher(yahoo_fetch, fixtures))
+    if source == "offline":
+        return PriceStore(root, fetcher=None)
+    return PriceStore(root)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Top up and time the local price store")
+    parser.add_argument("tickers", nargs="+")
+    parser.add_argument("--days", type=int, default=930)
+    parser.add_argument("--interval", default="1d")
+    args = parser.parse_args()
+
+    store = default_store()
+    start = datetime.now() - timedelta(days=args.days)
+    for ticker in args.tickers:
+        t0 = time.perf_counter()
+        fetched = store.update(ticker, start, interval=args.interval)
+        t1 = time.perf_counter()
+        frame = store.read(ticker, args.interval, start=start)
+        t2 = time.perf_counter()
+        rows = 0 if frame is None else len(frame)
+        print(f"{ticker:15} fetched {fetched:5} bars in {(t1 - t0) * 1000:8.1f} ms, "
+              f"read {rows:5} bars in {(t2 - t1) * 1000:6.1f} ms")
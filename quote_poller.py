@@ -0,0 +1,174 @@
+import time
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+import pandas as pd
+from bulk_loader import batch_from_fetcher, yahoo_batch_fetch
+from price_store import _clean, yahoo_fetch
+
+# One row per poll cycle
+CycleReport = namedtuple("CycleReport", [
+    "started", "seconds", "requests", "updated", "slow", "failed", "max_lag", "lag",
+])
+PollResult = namedtuple("PollResult", ["quotes", "new_bars", "report"])
+
+
+class QuotePoller:
+    """Polls a watchlist for new intraday bars in batched, concurrent requests.
+
+    Each ticker remembers its last bar, and requests start from it (the last
+    bar is re-fetched because it may still be forming). Tickers sharing the
+    same start go out together in multi-ticker batches on a thread pool. A
+    batch that misses the cycle timeout is left running and its tickers are
+    skipped until it finishes, so one slow request never stalls the cycle;
+    tickers whose last fetch failed are polled on their own until they recover.
+    """
+
+    def __init__(self, tickers, store=None, batch_fetch=None, interval="1m", lookback=timedelta(days=1),
+                 batch_size=50, workers=8, timeout=10.0):
+        self.tickers = list(tickers)
+        self.store = store
+        if batch_fetch is None:
+            fetcher = store.fetcher if store is not None else yahoo_fetch
+            batch_fetch = yahoo_batch_fetch if fetcher in (None, yahoo_fetch) else batch_from_fetcher(fetcher)
+        self.batch_fetch = batch_fetch
+        self.interval = interval
+        self.lookback = lookback
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.last_bar = {}
+        self.quotes = {}
+        self.failures = defaultdict(int)
+        self.in_flight = {}  # future -> tickers, for batches that outlived a cycle
+        if store is not None:
+            # Resume from what is already on disk instead of refetching the session
+            start = datetime.now() - lookback
+            for ticker in self.tickers:
+                stored = store.read(ticker, interval, start=start)
+                if stored is not None and not stored.empty:
+                    self._accept(ticker, stored)
+
+    def resume(self, quotes):
+        """Continue from known last bars, {ticker: (timestamp, price, volume)}, e.g. from a tick log"""
+        for ticker, quote in quotes.items():
+            if ticker not in self.last_bar or quote[0] > self.last_bar[ticker]:
+                self.last_bar[ticker] = quote[0]
+                self.quotes[ticker] = quote
+
+    def _accept(self, ticker, frame):
+        last = frame.iloc[-1]
+        self.last_bar[ticker] = frame.index[-1]
+        self.quotes[ticker] = (frame.index[-1], float(last["Close"]), float(last.get("Volume", 0.0)))
+
+    def _fetch(self, tickers, start, end):
+        return self.batch_fetch(tickers, start, end, self.interval)
+
+    def _collect(self, future, tickers, new_bars, updated, failed):
+        try:
+            frames = future.result()
+        except Exception as e:
+            frames = {}
+            error = f"{type(e).__name__}: {e}"
+        else:
+            error = "no data"
+        for ticker in tickers:
+            frame = _clean(frames.get(ticker))
+            if frame is None:
+                self.failures[ticker] += 1
+                failed[ticker] = error
+                continue
+            self.failures.pop(ticker, None)
+            last = self.last_bar.get(ticker)
+            if last is not None:
+                frame = frame.loc[frame.index >= last]
+            if frame.empty:
+                continue
+            if self.store is not None:
+                self.store.write(ticker, self.interval, frame)
+            self._accept(ticker, frame)
+            new_bars[ticker] = frame
+            updated.append(ticker)
+
+    def poll(self, tickers=None):
+        """One cycle over tickers (default: the whole watchlist)"""
+        started = time.time()
+        new_bars, updated, failed = {}, [], {}
+
+        # Batches left over from earlier cycles that have finished since
+        for future in [f for f in self.in_flight if f.done()]:
+            self._collect(future, self.in_flight.pop(future), new_bars, updated, failed)
+        busy = {t for group in self.in_flight.values() for t in group}
+
+        now = datetime.now(timezone.utc)
+        end = now + timedelta(minutes=1)
+        groups = defaultdict(list)
+        for ticker in tickers or self.tickers:
+            if ticker in busy:
+                continue
+            start = self.last_bar.get(ticker)
+            start = start.to_pydatetime() if start is not None else now - self.lookback
+            # Tickers that failed last time go alone so they can't fail a whole batch
+            groups[(start, ticker if self.failures.get(ticker) else None)].append(ticker)
+
+        futures = {}
+        for (start, _), group in groups.items():
+            for i in range(0, len(group), self.batch_size):
+                batch = group[i:i + self.batch_size]
+                futures[self.pool.submit(self._fetch, batch, start, end)] = batch
+
+        done, pending = wait(futures, timeout=self.timeout)
+        for future in done:
+            self._collect(future, futures[future], new_bars, updated, failed)
+        slow = []
+        for future in pending:
+            self.in_flight[future] = futures[future]
+            slow.extend(futures[future])
+
+        lag = {t: (pd.Timestamp(now) - _utc(self.last_bar[t])).total_seconds()
+               for t in (tickers or self.tickers) if t in self.last_bar}
+        report = CycleReport(
+            started=started, seconds=time.time() - started, requests=len(futures), updated=len(updated),
+            slow=slow, failed=failed, max_lag=max(lag.values(), default=None), lag=lag,
+        )
+        return PollResult(dict(self.quotes), new_bars, report)
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _utc(ts):
+    ts = pd.Timestamp(ts)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+
+def format_report(report):
+    lag = f", max lag {report.max_lag:.0f}s" if report.max_lag is not None else ""
+    text = f"cycle {report.seconds:.2f}s, {report.requests} requests, {report.updated} updated{lag}"
+    for label, tickers in [("slow", list(report.slow)), ("failed", list(report.failed))]:
+        if tickers:
+            names = ", ".join(tickers[:5]) + (f" +{len(tickers) - 5} more" if len(tickers) > 5 else "")
+            text += f", {label}: {names}"
+    return text
+
+
+if __name__ == "__main__":
+    import argparse
+    from bulk_loader import StubBatchFetch
+
+    parser = argparse.ArgumentParser(description="Time poll cycles for a large watchlist against the stub source")
+    parser.add_argument("--tickers", type=int, default=300)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.2, help="stub seconds per request")
+    parser.add_argument("--cycles", type=int, default=3)
+    args = parser.parse_args()
+
+    stub = StubBatchFetch(fail=["T7"], latency=args.latency)
+    poller = QuotePoller([f"T{i}" for i in range(args.tickers)], batch_fetch=stub, interval="1d",
+                         lookback=timedelta(days=10), batch_size=args.batch_size, workers=args.workers,
+                         timeout=args.latency * 5)
+    for _ in range(args.cycles):
+        result = poller.poll()
+        print(format_report(result.report))
+    poller.close()
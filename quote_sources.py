@@ -0,0 +1,292 @@
+import asyncio
+import csv
+import json
+import time
+from collections import defaultdict, namedtuple
+import numpy as np
+import pandas as pd
+from tick_buffer import _ns
+
+Tick = namedtuple("Tick", ["ticker", "ts", "price", "volume"])  # ts in ns since epoch (UTC)
+# Ticks that arrived together; received is the perf_counter() time they were available
+Batch = namedtuple("Batch", ["received", "ticks"])
+
+
+# --- SOURCES ---
+class PollingSource:
+    """Polls with a QuotePoller on a worker thread; each new bar is a tick.
+
+    Without a scheduler the whole watchlist is polled every `every` seconds.
+    With a PollScheduler only the tickers it says are due are polled, and an
+    empty batch still comes out every `every` seconds so status keeps printing
+    while markets are closed.
+    """
+
+    def __init__(self, poller, every=15, scheduler=None):
+        self.poller = poller
+        self.every = every
+        self.scheduler = scheduler
+        self.last_report = None
+
+    async def _poll(self, tickers=None):
+        result = await asyncio.to_thread(self.poller.poll, tickers)
+        self.last_report = result.report
+        ticks = []
+        for ticker, bars in result.new_bars.items():
+            volume = bars["Volume"] if "Volume" in bars else np.zeros(len(bars))
+            ticks.extend(Tick(ticker, int(ts), float(p), float(v))
+                         for ts, p, v in zip(_ns(bars.index), bars["Close"], volume))
+        return result, Batch(time.perf_counter(), ticks)
+
+    async def stream(self):
+        while self.scheduler is None:
+            result, batch = await self._poll()
+            yield batch
+            await asyncio.sleep(max(self.every - result.report.seconds, 0))
+
+        waited = 0.0
+        while True:
+            due = self.scheduler.due()
+            if due:
+                result, batch = await self._poll(due)
+                yield batch
+                # Resumed after the consumer has stored the batch and checked the rules
+                self.scheduler.record(due, result.report.failed, requests=result.report.requests)
+                waited = 0.0
+            elif waited >= self.every:
+                yield Batch(time.perf_counter(), [])
+                waited = 0.0
+            pause = min(max(self.scheduler.next_wake() - time.time(), 0.05), self.every)
+            await asyncio.sleep(pause)
+            waited += pause
+
+
+def parse_trades(message):
+    """Ticks from a JSON trade message: {"data": [{"s", "p", "t" (ms), "v"}]} or flat objects"""
+    payload = json.loads(message)
+    rows = payload.get("data", []) if isinstance(payload, dict) and "data" in payload else payload
+    if isinstance(rows, dict):
+        rows = [rows]
+    ticks = []
+    for row in rows or []:
+        ticker = row.get("s") or row.get("ticker")
+        price = row.get("p", row.get("price"))
+        if ticker is None or price is None:
+            continue
+        ms = row.get("t", row.get("ts"))
+        ts = int(ms) * 1_000_000 if ms is not None else time.time_ns()
+        ticks.append(Tick(ticker, ts, float(price), float(row.get("v", row.get("volume", 0.0)))))
+    return ticks
+
+
+def subscribe_messages(tickers):
+    return [json.dumps({"type": "subscribe", "symbol": t}) for t in tickers]
+
+
+class WebsocketSource:
+    """Push feed over a websocket (needs the optional `websockets` package).
+
+    subscribe(tickers) gives the messages sent after connecting and parse(message)
+    turns each message into ticks; the defaults fit Finnhub-style trade feeds.
+    Reconnects with exponential backoff when the connection drops.
+    """
+
+    def __init__(self, url, tickers, subscribe=subscribe_messages, parse=parse_trades, max_backoff=60):
+        self.url = url
+        self.tickers = list(tickers)
+        self.subscribe = subscribe
+        self.parse = parse
+        self.max_backoff = max_backoff
+
+    async def stream(self):
+        import websockets
+        backoff = 1
+        while True:
+            try:
+                async with websockets.connect(self.url) as socket:
+                    for message in self.subscribe(self.tickers):
+                        await socket.send(message)
+                    backoff = 1
+                    async for message in socket:
+                        ticks = self.parse(message)
+                        if ticks:
+                            yield Batch(time.perf_counter(), ticks)
+            except (OSError, websockets.ConnectionClosed) as e:
+                print(f"Websocket {self.url} dropped ({type(e).__name__}: {e}), retrying in {backoff}s")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+
+
+def read_ticks(path):
+    """Recorded ticks as a frame sorted by ts (CSV with ticker, ts, price, volume)"""
+    frame = pd.read_csv(path, dtype={"ticker": str, "ts": np.int64, "price": float, "volume": float})
+    return frame.sort_values("ts", kind="stable").reset_index(drop=True)
+
+
+class ReplaySource:
+    """Plays a recorded tick file, keeping its timing scaled by `speed` (0 = as fast as possible).
+
+    Ticks sharing a timestamp are one batch. A batch's receive time is when it
+    was due, not when it was yielded, so a consumer falling behind the replay
+    shows up as latency instead of silently slowing the clock.
+    """
+
+    def __init__(self, path, speed=1.0, tickers=None):
+        self.path = path
+        self.speed = speed
+        self.tickers = set(tickers) if tickers else None
+
+    async def stream(self):
+        frame = read_ticks(self.path)
+        if self.tickers is not None:
+            frame = frame[frame["ticker"].isin(self.tickers)]
+        if frame.empty:
+            return
+        ts = frame["ts"].to_numpy()
+        rows = list(zip(frame["ticker"], ts.tolist(), frame["price"].tolist(), frame["volume"].tolist()))
+        bounds = np.append(np.flatnonzero(np.diff(ts)) + 1, len(ts))
+        start_wall, start_ts, begin = time.perf_counter(), ts[0], 0
+        for end in bounds:
+            if self.speed > 0:
+                due = start_wall + (ts[begin] - start_ts) / 1e9 / self.speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            else:
+                due = time.perf_counter()
+                await asyncio.sleep(0)
+            yield Batch(due, [Tick(*row) for row in rows[begin:end]])
+            begin = end
+
+
+class TickRecorder:
+    """Passes another source's batches through while appending them to a CSV tick file for replay"""
+
+    def __init__(self, source, path):
+        self.source = source
+        self.path = path
+
+    def __getattr__(self, name):
+        return getattr(self.source, name)
+
+    async def stream(self):
+        with open(self.path, "a", newline="") as f:
+            writer = csv.writer(f)
+            if f.tell() == 0:
+                writer.writerow(Tick._fields)
+            async for batch in self.source.stream():
+                writer.writerows(batch.ticks)
+                f.flush()
+                yield batch
+
+
+def make_source(kind, tickers, poller=None, every=15, path=None, speed=1.0, url=None, scheduler=None):
+    if kind == "poll":
+        return PollingSource(poller, every, scheduler)
+    if kind == "replay":
+        return ReplaySource(path, speed, tickers)
+    if kind == "websocket":
+        return WebsocketSource(url, tickers)
+    raise ValueError(f"Unknown quote source {kind!r}")
+
+
+# --- CONSUMER ---
+class StreamStats:
+    """Throughput and tick-to-decision latency of a consume() run"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.ticks = 0
+        self.batches = 0
+        self.alerts = 0
+        self.latency = []        # seconds from batch receipt to rules evaluated, per batch
+        self.alert_latency = []  # the same, for batches that fired alerts
+
+    def record(self, batch, alerts, done):
+        self.ticks += len(batch.ticks)
+        self.batches += 1
+        self.alerts += len(alerts)
+        self.latency.append(done - batch.received)
+        if alerts:
+            self.alert_latency.append(done - batch.received)
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        text = f"{self.ticks} ticks in {self.batches} batches, {self.ticks / elapsed if elapsed else 0:,.0f} ticks/s"
+        for label, values in [("latency", self.latency), ("alert latency", self.alert_latency)]:
+            if values:
+                p50, p99 = np.percentile(values, [50, 99]) * 1000
+                text += f", {label} p50 {p50:.2f} ms p99 {p99:.2f} ms"
+        return text + f", {self.alerts} alerts"
+
+
+async def consume(source, rules, store, on_status=None, status_every=15, max_ticks=None):
+    """Feed a source into a TickStore and check the rules after every batch; returns StreamStats"""
+    stats = StreamStats()
+    last_status = time.perf_counter()
+    async for batch in source.stream():
+        grouped = defaultdict(lambda: ([], [], []))
+        latest = None
+        for tick in batch.ticks:
+            ts, price, volume = grouped[tick.ticker]
+            ts.append(tick.ts)
+            price.append(tick.price)
+            volume.append(tick.volume)
+            latest = tick.ts if latest is None or tick.ts > latest else latest
+        for ticker, (ts, price, volume) in grouped.items():
+            store.add(ticker, ts, price, volume)
+        # Cooldowns run on tick time, so a replay at any speed fires the alerts the live feed did
+        now = latest / 1e9 if latest is not None else None
+        alerts = rules.check_windows(store.window, changed=grouped, now=now)
+        stats.record(batch, alerts, time.perf_counter())
+        store.flush()
+
+        if on_status is not None and time.perf_counter() - last_status >= status_every:
+            on_status(stats)
+            last_status = time.perf_counter()
+        if max_ticks is not None and stats.ticks >= max_ticks:
+            break
+    return stats
+
+
+def write_synthetic(path, tickers, minutes=390, start="2024-01-02 14:30", seed=0):
+    """Random-walk 1-minute ticks for offline replay"""
+    rng = np.random.default_rng(seed)
+    ts = pd.date_range(start, periods=minutes, freq="min", tz="UTC").as_unit("ns").asi8
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, (minutes, len(tickers))), axis=0))
+    volume = rng.integers(1_000, 50_000, (minutes, len(tickers)))
+    pd.DataFrame({
+        "ticker": np.tile(tickers, minutes), "ts": np.repeat(ts, len(tickers)),
+        "price": prices.ravel().round(4), "volume": volume.ravel(),
+    }).to_csv(path, index=False)
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+    import tempfile
+    from alert_rules import CallbackSink, RuleEngine
+    from tick_buffer import TickStore
+
+    parser = argparse.ArgumentParser(description="Replay synthetic ticks through the rule engine offline")
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--minutes", type=int, default=390)
+    parser.add_argument("--speed", type=float, default=0, help="replay speed vs real time, 0 = flat out")
+    parser.add_argument("--file", help="replay this tick file instead of a synthetic one")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        path = args.file
+        if path is None:
+            path = os.path.join(root, "ticks.csv")
+            write_synthetic(path, [f"T{i}" for i in range(args.tickers)], args.minutes)
+        tickers = sorted(read_ticks(path)["ticker"].unique())
+        rules = [rule for t in tickers for rule in (
+            {"ticker": t, "type": "pct_move", "value": 2},
+            {"ticker": t, "type": "ma_cross", "window": 20, "direction": "below"},
+            {"ticker": t, "type": "volume_spike", "value": 3, "window": 30},
+        )]
+        engine = RuleEngine(rules, [CallbackSink(lambda alert: None)], {"cooldown_seconds": 0})
+        stats = asyncio.run(consume(ReplaySource(path, args.speed), engine, TickStore(400)))
+    print(f"{len(tickers)} tickers, {len(engine.rules)} rules, speed {args.speed or 'max'}")
+    print(stats.summary())
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+from indicators import sma_kernel
+from sectors import sector_of
+
+HORIZONS = {"1W": 5, "1M": 21, "3M": 63, "6M": 126, "1Y": 252}
+VOLATILITY_DAYS = 63
+YEAR_BARS = 252
+CROSS_LOOKBACK = 10  # bars within which a 50/200 DMA cross is flagged
+MAX_GAP_BARS = 5  # a trading week
+
+
+def price_matrix(frames, column="Close", max_gap=MAX_GAP_BARS):
+    """Align one column of every ticker's frame into a dates x tickers matrix.
+
+    Gaps of up to max_gap bars are forward-filled. Tickers without a price in
+    the last max_gap bars (delisted, suspended or a failed update) are dropped
+    instead of being screened on a stale price.
+    """
+    columns = {ticker: frame[column] for ticker, frame in frames.items() if frame is not None and not frame.empty}
+    if not columns:
+        return pd.DataFrame()
+    matrix = pd.concat(columns, axis=1).sort_index()
+    # Carry prices over days a single ticker did not trade; leading NaN (not yet listed) stay
+    matrix = matrix.ffill(limit=max_gap)
+    return matrix.loc[:, matrix.iloc[-1].notna()]
+
+
+def _last_valid(values, bars):
+    """Value `bars` rows before the last row, NaN where that is out of range"""
+    if bars >= len(values):
+        return np.full(values.shape[1], np.nan)
+    return values[-1 - bars]
+
+
+def screen(close, high=None, low=None, horizons=HORIZONS, cross_lookback=CROSS_LOOKBACK):
+    """One row per ticker with returns, DMA distances, volatility, 52-week proximity and cross flags.
+
+    Every metric is computed for all tickers at once on the aligned matrix.
+    """
+    if close.empty:
+        return pd.DataFrame()
+    values = close.to_numpy(dtype=float)
+    last = values[-1]
+    table = {"Sector": [sector_of(t) or "Other" for t in close.columns], "Price": last}
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for label, bars in horizons.items():
+            table[f"Return {label}"] = last / _last_valid(values, bars) - 1
+
+        (ma50,), _ = sma_kernel((values,), None, window=50)
+        (ma200,), _ = sma_kernel((values,), None, window=200)
+        table["vs 50 DMA"] = last / ma50[-1] - 1
+        table["vs 200 DMA"] = last / ma200[-1] - 1
+
+        log_returns = np.diff(np.log(values[-VOLATILITY_DAYS - 1:]), axis=0)
+        table["Volatility"] = np.nanstd(log_returns, axis=0, ddof=1) * np.sqrt(YEAR_BARS)
+
+        year_high = (high if high is not None else close).to_numpy(dtype=float)[-YEAR_BARS:]
+        year_low = (low if low is not None else close).to_numpy(dtype=float)[-YEAR_BARS:]
+        table["From 52W High"] = last / np.nanmax(year_high, axis=0) - 1
+        table["From 52W Low"] = last / np.nanmin(year_low, axis=0) - 1
+
+        # Sign of 50 - 200 DMA over the lookback; a sign change is a cross
+        spread = np.sign(ma50[-cross_lookback - 1:] - ma200[-cross_lookback - 1:])
+    went_up = ((spread[1:] > 0) & (spread[:-1] < 0)).any(axis=0)
+    went_down = ((spread[1:] < 0) & (spread[:-1] > 0)).any(axis=0)
+    table["Cross"] = np.where(went_up, "Golden", np.where(went_down, "Death", ""))
+    table["Trend"] = np.where(spread[-1] > 0, "50 > 200", np.where(spread[-1] < 0, "50 < 200", ""))
+    return pd.DataFrame(table, index=close.columns.rename("Ticker"))
+
+
+def sector_heatmap(table, columns=None):
+    """Mean of each return column per sector (sectors x horizons)"""
+    columns = columns or [c for c in table.columns if c.startswith("Return ")]
+    return table.groupby("Sector")[columns].mean()
+
+
+if __name__ == "__main__":
+    import time
+    from datetime import datetime, timedelta
+    from bulk_loader import StubBatchFetch
+    from sectors import all_tickers
+
+    stub = StubBatchFetch()
+    end = datetime(2026, 1, 1)
+    frames = {t: stub.bars(t, end - timedelta(days=930), end) for t in all_tickers()}
+
+    t0 = time.perf_counter()
+    table = screen(price_matrix(frames), price_matrix(frames, "High"), price_matrix(frames, "Low"))
+    heatmap = sector_heatmap(table)
+    print(f"{len(table)} tickers screened in {(time.perf_counter() - t0) * 1000:.1f} ms")
+    print(table.round(3).to_string())
+    print(heatmap.round(3).to_string())
@@ -0,0 +1,20 @@
+# NSE tickers shown in the dashboard, grouped by sector
+sectors = {
+    "Banking & Finance": ["HDFCBANK.NS", "ICICIBANK.NS", "SBIN.NS", "KOTAKBANK.NS", "AXISBANK.NS", "BAJFINANCE.NS"],
+    "IT Services": ["TCS.NS", "INFY.NS", "WIPRO.NS", "HCLTECH.NS", "TECHM.NS", "LTIM.NS"],
+    "Energy & Steel": ["RELIANCE.NS", "ADANIENT.NS", "TATASTEEL.NS", "JSWSTEEL.NS", "ONGC.NS", "COALINDIA.NS"],
+    "Automobile": ["TATAMOTORS.NS", "M&M.NS", "MARUTI.NS", "EICHERMOT.NS", "BAJAJ-AUTO.NS"],
+    "FMCG & Consumer": ["HINDUNILVR.NS", "ITC.NS", "ASIANPAINT.NS", "TITAN.NS", "NESTLEIND.NS", "ZOMATO.NS", "JIOFIN.NS"]
+}
+
+
+def all_tickers():
+    """Every ticker across sectors, in sector order"""
+    return [ticker for tickers in sectors.values() for ticker in tickers]
+
+
+def sector_of(ticker):
+    for sector, tickers in sectors.items():
+        if ticker in tickers:
+            return sector
+    return None
@@ -1,3 +1,6 @@
+import json
+import time
+from pathlib import Path
 import pandas as pd
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -5,40 +8,119 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+SAUCEDEMO_URL = "https://www.saucedemo.com/"
+BLOCKED_URLS = ["*.css", "*.woff", "*.woff2", "*.ttf", "*.otf",
+                "*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.webp", "*.ico"]
+
+# Every product field in one round trip: the browser walks the DOM and hands back a JSON string
+EXTRACT_PRODUCTS_JS = """
+const text = (root, selector) => {
+    const el = root.querySelector(selector);
+    return el ? el.textContent.trim() : null;
+};
+return JSON.stringify(Array.from(document.querySelectorAll(".inventory_item"), item => {
+    const img = item.querySelector("img");
+    const button = item.querySelector("button");
+    return {
+        Product: text(item, ".inventory_item_name"),
+        Price: text(item, ".inventory_item_price"),
+        Description: text(item, ".inventory_item_desc"),
+        Image: img ? img.getAttribute("src") : null,
+        Id: button ? button.id.replace(/^(add-to-cart|remove)-/, "") : null,
+    };
+}));
+"""
+
+
 # 1. Setup Browser
-chrome_options = Options()
-# chrome_options.add_argument("--headless") # Optional: Run without a window
-driver = webdriver.Chrome(options=chrome_options)
+def make_driver(headless=True, block_assets=True):
+    """Chrome that skips images, fonts and CSS; the scraper only needs the DOM"""
+    chrome_options = Options()
+    if headless:
+        chrome_options.add_argument("--headless=new")
+    chrome_options.page_load_strategy = "eager"  # DOM ready is enough, don't wait for subresources
+    if block_assets:
+        chrome_options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    driver = webdriver.Chrome(options=chrome_options)
+    if block_assets:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URLS})
+    return driver
+
 
-try:
-    print("Opening SauceDemo...")
-    driver.get("https://www.saucedemo.com/")
+def page_url(url, copies=1):
+    """URL as given, or a file:// URL for a local page (e.g. the static copy in fixtures/saucedemo)"""
+    path = Path(url)
+    if path.exists():
+        url = path.resolve().as_uri()
+    return f"{url}?copies={copies}" if copies > 1 else url
 
-    # 2. Login (This is standard for testing)
-    driver.find_element(By.ID, "user-name").send_keys("standard_user")
-    driver.find_element(By.ID, "password").send_keys("secret_sauce")
+
+# 2. Login (This is standard for testing)
+def login(driver, username="standard_user", password="secret_sauce"):
+    driver.find_element(By.ID, "user-name").send_keys(username)
+    driver.find_element(By.ID, "password").send_keys(password)
     driver.find_element(By.ID, "login-button").click()
 
+
+def open_inventory(driver, url=SAUCEDEMO_URL):
+    """Load the inventory page at url, logging in first if the page asks for it"""
+    print(f"Opening {url}...")
+    driver.get(url)
+    if driver.find_elements(By.ID, "login-button"):
+        login(driver)
+
     # 3. Wait for products to load
     wait = WebDriverWait(driver, 10)
     wait.until(EC.presence_of_element_located((By.CLASS_NAME, "inventory_item")))
 
-    # 4. Fetch Product Data
-    items = driver.find_elements(By.CLASS_NAME, "inventory_item")
-    product_list = []
 
-    for item in items:
+# 4. Fetch Product Data
+def extract_products(driver):
+    return json.loads(driver.execute_script(EXTRACT_PRODUCTS_JS))
+
+
+def extract_products_per_element(driver):
+    """The old way, two WebDriver round trips per product; kept for comparison"""
+    product_list = []
+    for item in driver.find_elements(By.CLASS_NAME, "inventory_item"):
         name = item.find_element(By.CLASS_NAME, "inventory_item_name").text
         price = item.find_element(By.CLASS_NAME, "inventory_item_price").text
         product_list.append({"Product": name, "Price": price})
+    return product_list
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Scrape SauceDemo products into Excel")
+    parser.add_argument("--url", default=SAUCEDEMO_URL,
+                        help="page URL or local file, e.g. fixtures/saucedemo/inventory.html")
+    parser.add_argument("--copies", type=int, default=1, help="repeat the catalogue (local fixture page only)")
+    parser.add_argument("--output", default="SauceDemo_Products.xlsx")
+    parser.add_argument("--headed", action="store_true", help="show the browser window")
+    parser.add_argument("--load-assets", action="store_true", help="don't block images, fonts and CSS")
+    parser.add_argument("--per-element", action="store_true", help="old per-element extraction, for comparison")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    driver = make_driver(headless=not args.headed, block_assets=not args.load_assets)
+    try:
+        t1 = time.perf_counter()
+        open_inventory(driver, page_url(args.url, args.copies))
+        t2 = time.perf_counter()
+        product_list = extract_products_per_element(driver) if args.per_element else extract_products(driver)
+        t3 = time.perf_counter()
 
-    # 5. Save to Excel
-    df = pd.DataFrame(product_list)
-    df.to_excel("SauceDemo_Products.xlsx", index=False)
-    print("✅ Success! Found", len(df), "products. Data saved to SauceDemo_Products.xlsx")
+        # 5. Save to Excel
+        df = pd.DataFrame(product_list)
+        df.to_excel(args.output, index=False)
+        print("✅ Success! Found", len(df), "products. Data saved to", args.output)
+        print(f"browser start {t1 - t0:.2f}s, page load {t2 - t1:.2f}s, extract {t3 - t2:.3f}s "
+              f"({len(df) / max(t3 - t2, 1e-6):,.0f} rows/sec)")
 
-except Exception as e:
-    print(f"❌ An error occurred: {e}")
+    except Exception as e:
+        print(f"❌ An error occurred: {e}")
 
-finally:
-    driver.quit()
\ No newline at end of file
+    finally:
+        driver.quit()
\ No newline at end of file
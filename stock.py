@@ -1,44 +1,92 @@
-import yfinance as yf
+import asyncio
 import time
+from alert_rules import load_rules
+from market_schedule import PollScheduler
+from quote_poller import QuotePoller, format_report
+from quote_sources import TickRecorder, consume, make_source
+from tick_buffer import TickLog, TickStore
 
-def track_stocks():
-    # Updated watchlist with Amazon, Cisco, and Oracle
-    watchlist = {
-        "AMZN": 180.00,  # Amazon
-        "CSCO": 45.00,   # Cisco
-        "ORCL": 160.00,  # Oracle
-        "AAPL": 150.00,  # Apple
-        "TSLA": 180.00   # Tesla
-    }
+POLL_SECONDS = 15
+RECENT_BARS = 400  # a session of 1-minute bars, enough for MA and volume rules
+FLUSH_SECONDS = 60
+
+def print_status(watchlist, ticks, stats, source):
+    print(f"Update Time: {time.strftime('%H:%M:%S')}")
+    print("-" * 35)
+    for ticker in watchlist:
+        _, price, _ = ticks.window(ticker, 1)
+        if len(price):
+            print(f"{ticker:5}: ${price[-1]:>8.2f}")
+        else:
+            print(f"Error fetching {ticker}")
+    print("-" * 35)
+    if getattr(source, "last_report", None) is not None:
+        print(format_report(source.last_report))
+    if getattr(source, "scheduler", None) is not None:
+        print(source.scheduler.summary())
+    print(stats.summary() + "\n")
+
+def track_stocks(rules_path="alert_rules.json", log_root="./tick_log", source="poll", replay=None, speed=1.0,
+                 url=None, record=None, adaptive=True):
+    # Watchlist, alert rules and alert sinks come from the rules config
+    rules, watchlist = load_rules(rules_path)
+
+    # Recent bars live in fixed-size per-ticker rings; live sources reload them from the tick log on restart
+    ticks = TickStore(RECENT_BARS, TickLog(log_root) if source != "replay" else None, flush_seconds=FLUSH_SECONDS)
+    loaded = ticks.warm_up(watchlist)
+
+    # Polling: whole watchlist per cycle in batched requests, asking only for bars after the last one seen
+    poller = scheduler = None
+    if source == "poll":
+        poller = QuotePoller(watchlist)
+        resume = {}
+        for ticker in watchlist:
+            ts, price, volume = ticks.window(ticker, 1)
+            if len(ts):
+                resume[ticker] = (ticks.last_bar(ticker), float(price[-1]), float(volume[-1]))
+        poller.resume(resume)
+        # Only while the ticker's exchange is open, more often near an alert threshold
+        if adaptive:
+            scheduler = PollScheduler(watchlist, rules, ticks.window, base=POLL_SECONDS)
+    quotes = make_source(source, watchlist, poller=poller, every=POLL_SECONDS, path=replay, speed=speed, url=url,
+                         scheduler=scheduler)
+    if record:
+        quotes = TickRecorder(quotes, record)
 
     print("--- Extended Stock Tracker Starting ---")
-    print("Monitoring: " + ", ".join(watchlist.keys()))
+    print("Monitoring: " + ", ".join(watchlist))
+    restored = f", {loaded} bars restored from {log_root}" if ticks.log is not None else ""
+    print(f"Source: {source}, alert rules: {len(rules.rules)}{restored}")
     print("Press Ctrl+C to stop.\n")
 
+    # Polling prints after every cycle; faster sources print a status line at most every 15 seconds
+    every = 0 if source == "poll" else POLL_SECONDS
+    stats = None
     try:
-        while True:
-            print(f"Update Time: {time.strftime('%H:%M:%S')}")
-            print("-" * 35)
-
-            for ticker, limit in watchlist.items():
-                stock = yf.Ticker(ticker)
-                # Fetching 1-minute interval data for the current day
-                data = stock.history(period="1d", interval="1m")
-                
-                if not data.empty:
-                    current_price = data['Close'].iloc[-1]
-                    print(f"{ticker:5}: ${current_price:>8.2f}")
-
-                    if current_price < limit:
-                        print(f"  ⚠️ ALERT: {ticker} is below ${limit}!")
-                else:
-                    print(f"Error fetching {ticker}")
-
-            print("-" * 35)
-            time.sleep(15) # Checking every 15 seconds
-
+        stats = asyncio.run(consume(quotes, rules, ticks,
+                                    on_status=lambda s: print_status(watchlist, ticks, s, quotes), status_every=every))
     except KeyboardInterrupt:
         print("\nTracker stopped.")
+    finally:
+        ticks.flush(force=True)
+        if poller is not None:
+            poller.close()
+    if stats is not None:
+        print(stats.summary())
+    if scheduler is not None:
+        print(scheduler.budget_report())
 
 if __name__ == "__main__":
-    track_stocks()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Console stock tracker with alert rules")
+    parser.add_argument("--rules", default="alert_rules.json")
+    parser.add_argument("--source", choices=["poll", "replay", "websocket"], default="poll")
+    parser.add_argument("--replay", help="tick file (CSV) for --source replay")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed vs real time, 0 = flat out")
+    parser.add_argument("--url", help="websocket feed URL for --source websocket")
+    parser.add_argument("--record", help="also append every tick to this CSV file for later replay")
+    parser.add_argument("--fixed", action="store_true", help="poll every ticker every 15s, even when closed")
+    args = parser.parse_args()
+    track_stocks(args.rules, source=args.source, replay=args.replay, speed=args.speed, url=args.url,
+                 record=args.record, adaptive=not args.fixed)
\ No newline at end of file
@@ -1,51 +1,123 @@
+import time
+import numpy as np
 import streamlit as st
-import yfinance as yf
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
+from backtest import backtest, buy_and_hold, summarize, sweep_pairs
+from bulk_loader import BulkLoader
+from correlation import RollingCorrelation, min_variance_weights
+from downsample import candle_budget, downsample_ohlc, line_budget, lttb_series
+from indicators import IndicatorEngine
+from price_store import default_store
+from screener import price_matrix, screen, sector_heatmap
+from sectors import all_tickers, sectors
+from wealth_sim import ShockSource, max_paths, monthly_log_returns, sensitivity_grid, sip_annual_return, simulate
 
 # --- PAGE SETUP ---
 st.set_page_config(page_title="NSE Pro Dashboard", layout="wide", page_icon="🇮🇳")
 
 # --- DATA LOADING ENGINE ---
+MAX_PERIOD_DAYS = 730
+MA_WARMUP_DAYS = 200  # extra history for the 200 DMA
+
+@st.cache_resource
+def price_store():
+    # Local Parquet store; only bars newer than the last stored one are downloaded
+    return default_store()
+
 @st.cache_data(ttl=3600)
-def load_data(ticker, period_days):
+def load_history(ticker):
+    # One load per ticker covering the widest slider window; periods are slices of it
     try:
-        # Fetch extra data for Moving Average calculations
-        start = datetime.now() - timedelta(days=period_days + 200)
-        end = datetime.now()
-        # CRITICAL FIX: multi_level_index=False flattens columns for Plotly compatibility
-        data = yf.download(ticker, start=start, end=end, multi_level_index=False)
-        return data
+        start = datetime.now() - timedelta(days=MAX_PERIOD_DAYS + MA_WARMUP_DAYS)
+        return price_store().get(ticker, start)
     except Exception as e:
         return None
 
-# --- SECTOR DATA ---
-sectors = {
-    "Banking & Finance": ["HDFCBANK.NS", "ICICIBANK.NS", "SBIN.NS", "KOTAKBANK.NS", "AXISBANK.NS", "BAJFINANCE.NS"],
-    "IT Services": ["TCS.NS", "INFY.NS", "WIPRO.NS", "HCLTECH.NS", "TECHM.NS", "LTIM.NS"],
-    "Energy & Steel": ["RELIANCE.NS", "ADANIENT.NS", "TATASTEEL.NS", "JSWSTEEL.NS", "ONGC.NS", "COALINDIA.NS"],
-    "Automobile": ["TATAMOTORS.NS", "M&M.NS", "MARUTI.NS", "EICHERMOT.NS", "BAJAJ-AUTO.NS"],
-    "FMCG & Consumer": ["HINDUNILVR.NS", "ITC.NS", "ASIANPAINT.NS", "TITAN.NS", "NESTLEIND.NS", "ZOMATO.NS", "JIOFIN.NS"]
-}
+@st.cache_data(ttl=900)
+def preload_sector(sector):
+    # Fill the store for the whole sector in batched requests so switching tickers stays local
+    start = datetime.now() - timedelta(days=MAX_PERIOD_DAYS + MA_WARMUP_DAYS)
+    return BulkLoader(price_store()).load_sector(sector, start)
+
+@st.cache_data(ttl=900)
+def all_prices():
+    # Every sector ticker aligned into dates x tickers matrices
+    start = datetime.now() - timedelta(days=MAX_PERIOD_DAYS + MA_WARMUP_DAYS)
+    status = BulkLoader(price_store()).load_all(start)
+    frames = {t: price_store().read(t, start=start) for t in all_tickers()}
+    close = price_matrix(frames)
+    high, low = (price_matrix(frames, column).reindex(columns=close.columns) for column in ("High", "Low"))
+    return close, high, low, status
+
+@st.cache_data(ttl=900)
+def screener_table():
+    # Every metric is a single array pass over all tickers
+    close, high, low, status = all_prices()
+    t0 = time.perf_counter()
+    table = screen(close, high, low)
+    return table, status, time.perf_counter() - t0
+
+@st.cache_data(ttl=900)
+def run_backtest(fast_windows, slow_windows, cost, allow_short):
+    # Every window pair x ticker in one vectorized pass over the aligned close matrix
+    close = all_prices()[0]
+    if close.empty:
+        return None
+    t0 = time.perf_counter()
+    results = backtest(close, sweep_pairs(fast_windows, slow_windows), cost, allow_short)
+    return summarize(results), buy_and_hold(close).mean(), close.shape[1], time.perf_counter() - t0
+
+@st.cache_resource
+def correlation_engine(tickers, window):
+    # Kept across reruns; each rerun only feeds bars it has not seen yet
+    return RollingCorrelation(tickers, window)
+
+@st.cache_data(max_entries=32)
+def run_simulation(amount, years, style, annual_return, annual_vol, paths, history, target):
+    # Summaries only: the per-path arrays are reduced before they are cached
+    result = simulate(amount, years, style, annual_return, annual_vol, paths, history, target, seed=0)
+    return {
+        "months": result.months, "invested": result.invested, "bands": result.bands,
+        "p_target": result.p_target, "p_loss": result.p_loss,
+        "drawdown": np.percentile(result.max_drawdown, [50, 95]),
+    }
+
+@st.cache_data(max_entries=32)
+def run_grid(amount, style, annual_vol, history, target):
+    return sensitivity_grid(amount, style, annual_vol=annual_vol, history=history, target=target, seed=0)
+
+@st.cache_resource
+def indicator_engine():
+    # Shared across reruns and sessions; new bars only extend the cached indicators
+    return IndicatorEngine()
 
 # --- SIDEBAR CONTROLS ---
 st.sidebar.header("📊 Market Controls")
 sel_sector = st.sidebar.selectbox("Select Sector", list(sectors.keys()))
 sel_ticker = st.sidebar.selectbox("Select Stock", sectors[sel_sector])
-timeframe = st.sidebar.slider("Analysis Period (Days)", 30, 730, 180)
+sector_status = preload_sector(sel_sector)
+failed = [t for t, result in sector_status.items() if result not in ("ok", "cached", "no data")]
+if failed:
+    st.sidebar.warning(f"Could not load: {', '.join(failed)}")
+timeframe = st.sidebar.slider("Analysis Period (Days)", 30, MAX_PERIOD_DAYS, 180)
+chart_width = st.sidebar.number_input("Chart width (px)", 400, 4000, 1400, step=100,
+                                      help="Caps the points sent to the chart; zoom in for full resolution")
 
-# Load the data
-df = load_data(sel_ticker, timeframe)
+# Load the data (full cached history; never modified below)
+df = load_history(sel_ticker)
 
 # --- MAIN INTERFACE TABS ---
-tab_market, tab_calc = st.tabs(["📈 Market Analysis", "🧮 Investment Calculator"])
+tab_market, tab_screen, tab_portfolio, tab_backtest, tab_calc = st.tabs(
+    ["📈 Market Analysis", "🔎 Screener", "🧺 Portfolio", "🧪 Backtest", "🧮 Investment Calculator"])
 
 # --- TAB 1: MARKET ANALYSIS ---
 with tab_market:
     if df is not None and not df.empty:
-        # Technical Calculations
-        df['MA50'] = df['Close'].rolling(50).mean()
-        df['MA200'] = df['Close'].rolling(200).mean()
+        # Technical Calculations (over the full history, then sliced to the period)
+        engine = indicator_engine()
+        ma50 = engine.compute(sel_ticker, df, "sma", window=50)['sma'].tail(timeframe)
+        ma200 = engine.compute(sel_ticker, df, "sma", window=200)['sma'].tail(timeframe)
         plot_df = df.tail(timeframe)
 
         # 1. Header Metrics
@@ -60,20 +132,144 @@ with tab_market:
         m3.metric("Period Low", f"₹{plot_df['Low'].min():,.2f}")
 
         # 2. Plotly Candlestick Chart
+        # Zooming re-slices the full-resolution data, so narrow ranges are drawn bar by bar
+        first, last = plot_df.index[0].to_pydatetime(), plot_df.index[-1].to_pydatetime()
+        zoom = st.slider("Zoom", min_value=first, max_value=last, value=(first, last), format="YYYY-MM-DD") \
+            if len(plot_df) > 1 else (first, last)
+        view = plot_df.loc[zoom[0]:zoom[1]]
+        candles = downsample_ohlc(view, candle_budget(chart_width))
+        if len(candles) < len(view):
+            st.caption(f"Showing {len(candles)} candles for {len(view)} bars; zoom in for full resolution")
+
         fig = go.Figure()
         fig.add_trace(go.Candlestick(
-            x=plot_df.index, open=plot_df['Open'], high=plot_df['High'],
-            low=plot_df['Low'], close=plot_df['Close'], name="Price"
+            x=candles.index, open=candles['Open'], high=candles['High'],
+            low=candles['Low'], close=candles['Close'], name="Price"
         ))
-        fig.add_trace(go.Scatter(x=plot_df.index, y=plot_df['MA50'], line=dict(color='orange', width=1.5), name="50 DMA"))
-        fig.add_trace(go.Scatter(x=plot_df.index, y=plot_df['MA200'], line=dict(color='cyan', width=1.5), name="200 DMA"))
+        for line, color, name in [(ma50, 'orange', "50 DMA"), (ma200, 'cyan', "200 DMA")]:
+            line = lttb_series(line.loc[zoom[0]:zoom[1]], line_budget(chart_width))
+            fig.add_trace(go.Scatter(x=line.index, y=line, line=dict(color=color, width=1.5), name=name))
 
         fig.update_layout(template="plotly_dark", xaxis_rangeslider_visible=False, height=550)
         st.plotly_chart(fig, use_container_width=True)
     else:
         st.error("⚠️ Unable to fetch data. Check your connection or ticker.")
 
-# --- TAB 2: INVESTMENT CALCULATOR ---
+# --- TAB 2: SCREENER ---
+with tab_screen:
+    st.title("🔎 Cross-Sector Screener")
+    # Every sector ticker is batch-downloaded on first use, so only on request
+    if st.checkbox("📥 Screen every sector ticker", key="load_screener"):
+        table, screen_status, screen_seconds = screener_table()
+        if table.empty:
+            st.error("⚠️ Unable to fetch data. Check your connection or ticker.")
+        else:
+            # Failed downloads, and tickers price_matrix dropped for having no recent price
+            missing = [t for t, result in screen_status.items() if result not in ("ok", "cached") or t not in table.index]
+            st.caption(f"{len(table)} tickers screened in {screen_seconds * 1000:.0f} ms"
+                       + (f" · missing: {', '.join(missing)}" if missing else ""))
+
+            f1, f2 = st.columns([2, 1])
+            pick_sectors = f1.multiselect("Sectors", list(sectors.keys()), default=list(sectors.keys()))
+            crosses_only = f2.checkbox("Recent 50/200 DMA crosses only")
+            view = table[table["Sector"].isin(pick_sectors)]
+            if crosses_only:
+                view = view[view["Cross"] != ""]
+
+            # Ratios are shown as percentages; click a column header to sort
+            pct_cols = [c for c in table.columns if c not in ("Sector", "Price", "Cross", "Trend")]
+            shown = view.copy()
+            shown[pct_cols] = shown[pct_cols] * 100
+            st.dataframe(
+                shown, use_container_width=True, height=min(40 + 35 * len(shown), 700),
+                column_config={
+                    "Price": st.column_config.NumberColumn(format="₹%.2f"),
+                    **{c: st.column_config.NumberColumn(format="%.1f%%") for c in pct_cols},
+                },
+            )
+
+            heat = sector_heatmap(table) * 100
+            fig_heat = go.Figure(go.Heatmap(
+                z=heat.values, x=[c.replace("Return ", "") for c in heat.columns], y=heat.index,
+                colorscale="RdYlGn", zmid=0, texttemplate="%{z:.1f}%", colorbar=dict(title="Avg return %")
+            ))
+            fig_heat.update_layout(template="plotly_dark", height=400, title="Average return by sector")
+            st.plotly_chart(fig_heat, use_container_width=True)
+
+# --- TAB 3: PORTFOLIO ---
+with tab_portfolio:
+    st.title("🧺 Diversified Portfolio")
+    # Every sector ticker is batch-downloaded on first use, so only on request
+    if st.checkbox("📥 Load every sector ticker", key="load_portfolio"):
+        close_all = all_prices()[0]
+        if close_all.empty:
+            st.error("⚠️ Unable to fetch data. Check your connection or ticker.")
+        else:
+            p1, p2 = st.columns([2, 1])
+            picked = p1.multiselect("Tickers", list(close_all.columns), default=list(close_all.columns))
+            corr_window = p2.select_slider("Rolling Window (Bars)", [21, 63, 126, 252], value=126)
+            if len(picked) < 2:
+                st.info("Pick at least two tickers.")
+            else:
+                t0 = time.perf_counter()
+                corr_engine = correlation_engine(tuple(close_all.columns), corr_window)
+                corr_engine.advance(close_all)
+                cov = corr_engine.covariance().loc[picked, picked]
+                corr = corr_engine.correlation().loc[picked, picked]
+                weights = min_variance_weights(cov)
+                st.caption(f"{len(picked)} tickers, {corr_window}-bar window, "
+                           f"updated in {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+                fig_corr = go.Figure(go.Heatmap(z=corr.values, x=picked, y=picked, colorscale="RdBu",
+                                                zmin=-1, zmax=1, reversescale=True))
+                fig_corr.update_layout(template="plotly_dark", height=650, title="Rolling Correlation of Daily Returns")
+                st.plotly_chart(fig_corr, use_container_width=True)
+
+                held = weights[weights > 0.0005].sort_values(ascending=False)
+                vol = np.sqrt(weights.values @ np.nan_to_num(cov.values) @ weights.values * 252)
+                st.subheader("Minimum-Variance Weights")
+                st.caption(f"Long-only; expected annual volatility {vol:.1%}. Use as the split of a monthly SIP.")
+                fig_w = go.Figure(go.Bar(x=held.index, y=held.values * 100, marker_color='#00cc96'))
+                fig_w.update_layout(template="plotly_dark", height=350, yaxis_title="Weight %")
+                st.plotly_chart(fig_w, use_container_width=True)
+
+# --- TAB 4: BACKTEST ---
+with tab_backtest:
+    st.title("🧪 MA Crossover Backtest")
+    # Uses the same all-ticker matrix as the screener, so only on request
+    if st.checkbox("📥 Backtest every sector ticker", key="load_backtest"):
+        b1, b2, b3 = st.columns(3)
+        fast = b1.slider("Fast MA windows", 5, 50, (5, 50), step=5)
+        slow = b2.slider("Slow MA windows", 60, 250, (60, 250), step=10)
+        cost = b3.number_input("Cost per Unit of Turnover (%)", 0.0, 1.0, 0.1, step=0.05) / 100
+        allow_short = b3.checkbox("Go short when fast < slow")
+        result = run_backtest(tuple(range(fast[0], fast[1] + 1, 5)), tuple(range(slow[0], slow[1] + 1, 10)),
+                              cost, allow_short)
+        if result is None:
+            st.error("⚠️ Unable to fetch data. Check your connection or ticker.")
+        else:
+            summary, hold, n_tickers, seconds = result
+            st.caption(f"{len(summary)} window pairs x {n_tickers} tickers in {seconds * 1000:.0f} ms; "
+                       f"buy and hold: CAGR {hold['CAGR']:.1%}, Sharpe {hold['Sharpe']:.2f} (mean across tickers)")
+
+            sharpe = summary["Sharpe"].unstack("Slow").sort_index()
+            fig_bt = go.Figure(go.Heatmap(z=sharpe.values, x=sharpe.columns, y=sharpe.index, colorscale="RdYlGn",
+                                          zmid=hold["Sharpe"], colorbar=dict(title="Sharpe")))
+            fig_bt.update_layout(template="plotly_dark", height=450, xaxis_title="Slow MA", yaxis_title="Fast MA",
+                                 title="Mean Sharpe across tickers (centred on buy and hold)")
+            st.plotly_chart(fig_bt, use_container_width=True)
+
+            st.subheader("Best Window Pairs")
+            best = summary.head(10).reset_index()
+            best[["CAGR", "Max Drawdown"]] *= 100
+            st.dataframe(best, use_container_width=True, hide_index=True, column_config={
+                "CAGR": st.column_config.NumberColumn(format="%.1f%%"),
+                "Max Drawdown": st.column_config.NumberColumn(format="%.1f%%"),
+                "Sharpe": st.column_config.NumberColumn(format="%.2f"),
+                "Trades": st.column_config.NumberColumn(format="%.1f"),
+            })
+
+# --- TAB 5: INVESTMENT CALCULATOR ---
 with tab_calc:
     st.title("🧮 Wealth Growth Calculator")
     
@@ -111,4 +307,66 @@ with tab_calc:
             marker=dict(colors=['#1f77b4', '#00cc96'])
         )])
         fig_pie.update_layout(template="plotly_dark", height=400, showlegend=True)
-        st.plotly_chart(fig_pie, use_container_width=True)
\ No newline at end of file
+        st.plotly_chart(fig_pie, use_container_width=True)
+
+    # --- Monte Carlo mode: a distribution of outcomes instead of a single value ---
+    if st.checkbox("🎲 Monte Carlo simulation"):
+        style = "sip" if calc_type == "Monthly SIP" else "lumpsum"
+        s1, s2, s3 = st.columns(3)
+        source = s1.radio("Returns", ["Parametric (normal)", f"Bootstrap from {sel_ticker} history"])
+        # Long tenures get fewer paths so a run stays around a second
+        choices = [p for p in [50_000, 100_000, 200_000, 500_000] if p <= max(max_paths(years), 50_000)]
+        paths = s2.select_slider("Paths", choices, value=min(100_000, choices[-1]))
+        target = s3.number_input("Target Wealth (₹)", min_value=0, value=int(round(f_val, -3)), step=10_000)
+
+        history = None
+        annual_vol = 0.18
+        # Same compounding as the closed-form value above: R/12 a month for a SIP, R a year for a lumpsum
+        sim_ret = sip_annual_return(exp_ret / 100) if style == "sip" else exp_ret / 100
+        if source.startswith("Bootstrap"):
+            history = monthly_log_returns(df['Close']) if df is not None and not df.empty else None
+            if history is None or len(history) < 12:
+                st.warning("Not enough price history to bootstrap; using the parametric model.")
+                history = None
+            elif s1.checkbox("Use the stock's historical average return", value=True):
+                sim_ret = ShockSource(history=history).historical_return()
+                s1.caption(f"Historical average: {sim_ret:.1%} a year")
+        if history is None:
+            annual_vol = s1.slider("Annual Volatility (%)", 5, 40, 18) / 100
+
+        t0 = time.perf_counter()
+        sim = run_simulation(inv_amt, years, style, sim_ret, annual_vol, paths, history, target or None)
+        st.caption(f"{paths:,} paths x {years * 12} months in {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+        k1, k2, k3, k4 = st.columns(4)
+        k1.metric("Median Future Value", f"₹{sim['bands'][50][-1]:,.0f}")
+        k2.metric("Chance of Reaching Target", f"{sim['p_target']:.1%}" if sim['p_target'] is not None else "–")
+        k3.metric("Chance of Loss", f"{sim['p_loss']:.1%}")
+        k4.metric("Max Drawdown (median / worst 5%)", f"{sim['drawdown'][0]:.0%} / {sim['drawdown'][1]:.0%}")
+
+        # Percentile fan chart
+        x = sim['months'] / 12
+        fig_fan = go.Figure()
+        for low, high, alpha in [(5, 95, 0.15), (25, 75, 0.3)]:
+            fig_fan.add_trace(go.Scatter(x=x, y=sim['bands'][high], line=dict(width=0), showlegend=False))
+            fig_fan.add_trace(go.Scatter(x=x, y=sim['bands'][low], fill='tonexty', line=dict(width=0),
+                                         fillcolor=f"rgba(0,204,150,{alpha})", name=f"{low}th–{high}th pct"))
+        fig_fan.add_trace(go.Scatter(x=x, y=sim['bands'][50], line=dict(color='#00cc96', width=2), name="Median"))
+        fig_fan.add_trace(go.Scatter(x=x, y=sim['invested'], line=dict(color='#1f77b4', dash='dash'), name="Invested"))
+        fig_fan.update_layout(template="plotly_dark", height=420, xaxis_title="Years", yaxis_title="₹")
+        st.plotly_chart(fig_fan, use_container_width=True)
+
+        # Return x tenure sensitivity grid
+        grid_median, grid_reach = run_grid(inv_amt, style, annual_vol, history, target or None)
+        show_reach = grid_reach is not None and st.radio(
+            "Sensitivity grid", ["Median future value", "Chance of reaching target"], horizontal=True
+        ) == "Chance of reaching target"
+        grid = grid_reach * 100 if show_reach else grid_median
+        fig_grid = go.Figure(go.Heatmap(
+            z=grid.values, x=[str(t) for t in grid.columns], y=grid.index, colorscale="Viridis",
+            colorbar=dict(title="%" if show_reach else "₹"),
+            hovertemplate="Return %{y}, %{x} years: %{z:,.0f}<extra></extra>",
+        ))
+        fig_grid.update_layout(template="plotly_dark", height=520, xaxis_title="Tenure (Years)",
+                               yaxis_title="Expected Annual Return")
+        st.plotly_chart(fig_grid, use_container_width=True)
\ No newline at end of file
@@ -0,0 +1,260 @@
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+COLUMNS = (("ts", np.int64), ("price", np.float64), ("volume", np.float64))
+
+
+class TickRing:
+    """Fixed-capacity ring of (timestamp ns, price, volume) in preallocated arrays.
+
+    Every tick is written twice, at i and i + capacity, so the newest n ticks
+    are always one contiguous slice and window() can return views instead of
+    copies. A tick with the same timestamp as the newest one replaces it (a
+    bar that was still forming); older timestamps are ignored.
+    """
+
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self.ts = np.zeros(2 * capacity, dtype=np.int64)
+        self.price = np.zeros(2 * capacity)
+        self.volume = np.zeros(2 * capacity)
+        self.head = 0  # next slot to write
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def last_ts(self):
+        return int(self.ts[self.head - 1 + self.capacity]) if self.size else None
+
+    def _write(self, slot, ts, price, volume):
+        for i in (slot, slot + self.capacity):
+            self.ts[i], self.price[i], self.volume[i] = ts, price, volume
+
+    def append(self, ts, price, volume=0.0):
+        """Add one tick; returns False if it was older than the newest tick"""
+        last = self.last_ts
+        if last is not None and ts < last:
+            return False
+        if last is not None and ts == last:
+            self._write((self.head - 1) % self.capacity, ts, price, volume)
+            return True
+        self._write(self.head, ts, price, volume)
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        return True
+
+    def extend(self, ts, price, volume):
+        """Add many ticks in timestamp order with vectorized writes; returns the mask of ticks taken"""
+        ts = np.asarray(ts, dtype=np.int64)
+        price = np.asarray(price, dtype=float)
+        volume = np.asarray(volume, dtype=float)
+        accepted = np.ones(len(ts), dtype=bool)
+        last = self.last_ts
+        if last is not None:
+            keep = ts > last
+            accepted = keep.copy()
+            if len(ts) and ts[0] == last:
+                accepted[0] = self.append(ts[0], price[0], volume[0])
+            ts, price, volume = ts[keep], price[keep], volume[keep]
+        ts, price, volume = ts[-self.capacity:], price[-self.capacity:], volume[-self.capacity:]
+        slots = (self.head + np.arange(len(ts))) % self.capacity
+        for column, values in ((self.ts, ts), (self.price, price), (self.volume, volume)):
+            column[slots] = values
+            column[slots + self.capacity] = values
+        self.head = (self.head + len(ts)) % self.capacity
+        self.size = min(self.size + len(ts), self.capacity)
+        return accepted
+
+    def window(self, n=None):
+        """Read-only views (ts, price, volume) of the newest n ticks, oldest first"""
+        n = self.size if n is None else min(n, self.size)
+        end = self.head + self.capacity
+        views = []
+        for column in (self.ts, self.price, self.volume):
+            view = column[end - n:end]
+            view.flags.writeable = False
+            views.append(view)
+        return tuple(views)
+
+
+class TickLog:
+    """Append-only columnar tick log: <root>/<ticker>.<column>.bin, one raw array per column.
+
+    Appends are plain binary writes, and reading the newest n ticks memory-maps
+    only the tail of each file. A crash between column writes leaves files of
+    different lengths; readers use the shortest.
+    """
+
+    def __init__(self, root="./tick_log"):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, ticker, column):
+        return os.path.join(self.root, f"{ticker}.{column}.bin")
+
+    def append(self, ticker, ts, price, volume):
+        for (column, dtype), values in zip(COLUMNS, (ts, price, volume)):
+            with open(self.path(ticker, column), "ab") as f:
+                np.asarray(values, dtype=dtype).tofile(f)
+
+    def length(self, ticker):
+        sizes = []
+        for column, dtype in COLUMNS:
+            path = self.path(ticker, column)
+            sizes.append(os.path.getsize(path) // np.dtype(dtype).itemsize if os.path.exists(path) else 0)
+        return min(sizes)
+
+    def tail(self, ticker, n):
+        """Newest n logged ticks, with re-logged revisions of a bar collapsed to the latest"""
+        rows = self.length(ticker)
+        if rows == 0:
+            return tuple(np.empty(0, dtype=dtype) for _, dtype in COLUMNS)
+        maps = [np.memmap(self.path(ticker, column), dtype=dtype, mode="r", shape=(rows,)) for column, dtype in COLUMNS]
+        # Revisions take extra rows: read further back until there are n distinct timestamps
+        span = n
+        while True:
+            start = max(rows - span, 0)
+            ts = np.array(maps[0][start:rows])
+            keep = _last_of_each(ts)
+            if keep.sum() >= n or start == 0:
+                break
+            span *= 2
+        columns = [ts] + [np.array(data[start:rows]) for data in maps[1:]]
+        del maps
+        return tuple(c[keep][-n:] for c in columns)
+
+    def compact(self, ticker, keep):
+        """Rewrite a ticker's log with only its newest `keep` ticks"""
+        columns = self.tail(ticker, keep)
+        for (column, dtype), values in zip(COLUMNS, columns):
+            tmp = self.path(ticker, column) + ".tmp"
+            values.astype(dtype).tofile(tmp)
+            os.replace(tmp, self.path(ticker, column))
+
+
+def _last_of_each(ts):
+    """Mask keeping the last of each run of equal timestamps"""
+    return np.append(ts[1:] != ts[:-1], True)
+
+
+def _ns(index):
+    index = pd.DatetimeIndex(index)
+    return (index.tz_convert("UTC") if index.tz is not None else index).as_unit("ns").asi8
+
+
+class TickStore:
+    """Per-ticker rings plus periodic flushes of new ticks to a TickLog"""
+
+    def __init__(self, capacity=4096, log=None, flush_seconds=30):
+        self.capacity = capacity
+        self.log = log
+        self.flush_seconds = flush_seconds
+        self.rings = {}
+        self.pending = {}
+        self.last_flush = time.time()
+        self._lock = threading.Lock()
+
+    def ring(self, ticker):
+        if ticker not in self.rings:
+            self.rings[ticker] = TickRing(self.capacity)
+        return self.rings[ticker]
+
+    def warm_up(self, tickers, compact_over=4):
+        """Refill rings from the log; returns how many ticks were loaded"""
+        loaded = 0
+        if self.log is None:
+            return loaded
+        for ticker in tickers:
+            if self.log.length(ticker) > compact_over * self.capacity:
+                self.log.compact(ticker, self.capacity)
+            ts, price, volume = self.log.tail(ticker, self.capacity)
+            self.ring(ticker).extend(ts, price, volume)
+            loaded += len(ts)
+        return loaded
+
+    def add(self, ticker, ts, price, volume):
+        """Add ticks to the ring; only the ticks it accepted are queued for the log"""
+        with self._lock:
+            if len(ts) == 1:
+                accepted = np.array([self.ring(ticker).append(ts[0], price[0], volume[0])])
+            else:
+                accepted = self.ring(ticker).extend(ts, price, volume)
+            if self.log is not None and accepted.any():
+                self.pending.setdefault(ticker, []).append((np.asarray(ts, dtype=np.int64)[accepted],
+                                                            np.asarray(price, dtype=float)[accepted],
+                                                            np.asarray(volume, dtype=float)[accepted]))
+
+    def add_bars(self, ticker, frame):
+        """Add bars from a poll (Close as price); a re-sent forming bar replaces the previous copy"""
+        volume = frame["Volume"].to_numpy(dtype=float) if "Volume" in frame else np.zeros(len(frame))
+        self.add(ticker, _ns(frame.index), frame["Close"].to_numpy(dtype=float), volume)
+
+    def window(self, ticker, n=None):
+        ring = self.rings.get(ticker)
+        return ring.window(n) if ring is not None else (np.empty(0, np.int64), np.empty(0), np.empty(0))
+
+    def last_bar(self, ticker):
+        ring = self.rings.get(ticker)
+        return pd.Timestamp(ring.last_ts, tz="UTC") if ring is not None and len(ring) else None
+
+    def flush(self, force=False):
+        """Append pending ticks to the log at most every flush_seconds; returns ticks written"""
+        if self.log is None or (not force and time.time() - self.last_flush < self.flush_seconds):
+            return 0
+        with self._lock:
+            pending, self.pending = self.pending, {}
+            self.last_flush = time.time()
+        written = 0
+        for ticker, chunks in pending.items():
+            ts, price, volume = (np.concatenate(parts) for parts in zip(*chunks))
+            # Each poll re-sends the forming bar; only its latest revision goes to the log
+            order = np.argsort(ts, kind="stable")
+            ts, price, volume = ts[order], price[order], volume[order]
+            keep = _last_of_each(ts)
+            ts, price, volume = ts[keep], price[keep], volume[keep]
+            self.log.append(ticker, ts, price, volume)
+            written += len(ts)
+        return written
+
+
+if __name__ == "__main__":
+    import argparse
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="Time ring appends, window views and log warm-up")
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--ticks", type=int, default=2000)
+    parser.add_argument("--capacity", type=int, default=4096)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as root:
+        store = TickStore(args.capacity, TickLog(root))
+        ts = np.arange(args.ticks, dtype=np.int64) * 60_000_000_000
+        prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, (args.tickers, args.ticks)), axis=1))
+
+        t0 = time.perf_counter()
+        for i in range(args.tickers):
+            store.add(f"T{i}", ts, prices[i], np.ones(args.ticks))
+        t1 = time.perf_counter()
+        for i in range(args.tickers):
+            store.ring(f"T{i}").append(int(ts[-1]) + 60_000_000_000, 101.0, 1.0)
+        t2 = time.perf_counter()
+        means = [store.window(f"T{i}", 200)[1].mean() for i in range(args.tickers)]
+        t3 = time.perf_counter()
+        written = store.flush(force=True)
+        t4 = time.perf_counter()
+
+        restarted = TickStore(args.capacity, TickLog(root))
+        loaded = restarted.warm_up([f"T{i}" for i in range(args.tickers)])
+        t5 = time.perf_counter()
+
+    print(f"{args.tickers} tickers x {args.ticks} ticks")
+    print(f"bulk add {(t1 - t0) * 1000:.0f} ms, single appends {(t2 - t1) / args.tickers * 1e6:.1f} us each, "
+          f"200-tick window means {(t3 - t2) * 1000:.1f} ms")
+    print(f"flush {written} ticks {(t4 - t3) * 1000:.0f} ms, warm-up {loaded} ticks {(t5 - t4) * 1000:.0f} ms")
@@ -0,0 +1,190 @@
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+
+PERCENTILES = (5, 25, 50, 75, 95)
+BARS_PER_MONTH = 21
+PATH_MONTH_BUDGET = 60_000_000  # paths x months per interactive run, about a second
+
+SimulationResult = namedtuple("SimulationResult", [
+    "months",         # snapshot months (every 12 months plus the last one)
+    "invested",       # total invested at each snapshot
+    "bands",          # {percentile: wealth at each snapshot}
+    "final",          # final wealth per path
+    "max_drawdown",   # worst peak-to-trough fall of the portfolio value per path (0.25 = -25%)
+    "p_target",       # probability the final wealth reaches the target (None without a target)
+    "p_loss",         # probability the final wealth is below the amount invested
+])
+
+
+def monthly_log_returns(close, bars_per_month=BARS_PER_MONTH):
+    """Overlapping one-month log returns from a daily close series (the bootstrap sample)"""
+    close = close.dropna()
+    values = np.log(close.to_numpy(dtype=float))
+    return values[bars_per_month:] - values[:-bars_per_month]
+
+
+class ShockSource:
+    """Zero-mean monthly log-return shocks: normal (parametric) or resampled from history.
+
+    The drift is added separately, so the same shocks can be reused for any
+    expected return (common random numbers across the sensitivity grid).
+    """
+
+    def __init__(self, annual_vol=0.18, history=None, seed=None):
+        self.rng = np.random.default_rng(seed)
+        if history is not None and len(history):
+            history = np.asarray(history, dtype=np.float64)
+            self.history_mean = float(history.mean())
+            self.residuals = (history - self.history_mean).astype(np.float32)
+            self.variance = float(self.residuals.var())
+        else:
+            self.history_mean = None
+            self.residuals = None
+            self.sigma = annual_vol / np.sqrt(12)
+            self.variance = self.sigma ** 2
+
+    def drift(self, annual_return):
+        """Monthly log drift whose compounded expectation is annual_return"""
+        return np.log1p(annual_return) / 12 - self.variance / 2
+
+    def historical_return(self):
+        """Annual expected return implied by the bootstrap sample"""
+        return float(np.expm1(12 * (self.history_mean + self.variance / 2)))
+
+    def draw(self, months, paths):
+        if self.residuals is None:
+            # Antithetic pairs: half the random draws, and lower variance for the same path count
+            half = (paths + 1) // 2
+            out = np.empty((months, 2 * half), dtype=np.float32)
+            for row in out:  # drawn straight into the first half of each month, mirrored into the second
+                self.rng.standard_normal(dtype=np.float32, out=row[:half])
+                row[:half] *= np.float32(self.sigma)
+                np.negative(row[:half], out=row[half:])
+            return out[:, :paths]
+        return self.residuals[self.rng.integers(len(self.residuals), size=(months, paths))]
+
+
+def sip_annual_return(annual_return):
+    """Effective annual return of the SIP calculator's convention (annual_return / 12 a month)"""
+    return (1 + annual_return / 12) ** 12 - 1
+
+
+def max_paths(years, budget=PATH_MONTH_BUDGET):
+    """Most paths a run of this tenure can use within the path-month budget"""
+    return budget // (years * 12)
+
+
+def _snapshots(months):
+    return sorted(set(range(12, months + 1, 12)) | {months})
+
+
+def simulate(amount, years, style="sip", annual_return=0.12, annual_vol=0.18, paths=200_000,
+             history=None, target=None, seed=None, chunk_months=12):
+    """Monte Carlo wealth paths for a monthly SIP or a one-time lumpsum.
+
+    SIP contributions go in at the start of each month (as in the closed-form
+    calculator). Paths advance month by month over all paths at once; shocks
+    are drawn in chunks so memory stays O(paths) for any tenure.
+    """
+    months = years * 12
+    shocks = ShockSource(annual_vol, history, seed)
+    drift = np.float32(shocks.drift(annual_return))
+    sip = style == "sip"
+
+    # float32 throughout: percentiles of 7 significant digits are plenty and it halves the work
+    wealth = np.full(paths, 0.0 if sip else amount, dtype=np.float32)
+    log_nav = np.zeros(paths, dtype=np.float32)
+    peak = np.zeros(paths, dtype=np.float32)
+    worst = np.zeros(paths, dtype=np.float32)
+    drop = np.empty(paths, dtype=np.float32)
+    snapshots = _snapshots(months)
+    bands = {p: [] for p in PERCENTILES}
+    invested = []
+
+    month = 0
+    while month < months:
+        block = shocks.draw(min(chunk_months, months - month), paths)
+        block += drift
+        for step in block:
+            month += 1
+            # Drawdown of the unit value (log space), independent of contributions
+            log_nav += step
+            np.maximum(peak, log_nav, out=peak)
+            np.subtract(log_nav, peak, out=drop)
+            np.minimum(worst, drop, out=worst)
+            if sip:
+                wealth += amount
+            wealth *= np.exp(step, out=step)
+            if month in snapshots:
+                for p, value in zip(PERCENTILES, np.percentile(wealth, PERCENTILES)):
+                    bands[p].append(value)
+                invested.append(amount * month if sip else amount)
+
+    total_invested = invested[-1]
+    return SimulationResult(
+        months=np.array(snapshots),
+        invested=np.array(invested),
+        bands={p: np.array(v) for p, v in bands.items()},
+        final=wealth,
+        max_drawdown=-np.expm1(worst),
+        p_target=float((wealth >= target).mean()) if target else None,
+        p_loss=float((wealth < total_invested).mean()),
+    )
+
+
+def sensitivity_grid(amount, style="sip", returns=np.arange(5, 26), tenures=np.arange(1, 31),
+                     annual_vol=0.18, paths=4_000, history=None, target=None, seed=None):
+    """Median final wealth (and probability of target) for every return x tenure pair.
+
+    All expected returns share the same shocks and advance together as one
+    (returns x paths) array, so the whole grid costs one pass over the longest
+    tenure.
+    """
+    returns = np.asarray(returns, dtype=float)
+    tenures = np.asarray(tenures, dtype=int)
+    shocks = ShockSource(annual_vol, history, seed)
+    drift = shocks.drift(returns / 100)[:, None]
+    sip = style == "sip"
+    months = int(tenures.max()) * 12
+    tenure_months = set(int(t) * 12 for t in tenures)
+
+    wealth = np.zeros((len(returns), paths)) if sip else np.full((len(returns), paths), float(amount))
+    median = {}
+    reach = {}
+    for month, step in enumerate(shocks.draw(months, paths), 1):
+        if sip:
+            wealth += amount
+        wealth *= np.exp(drift + step)
+        if month in tenure_months:
+            median[month // 12] = np.median(wealth, axis=1)
+            if target:
+                reach[month // 12] = (wealth >= target).mean(axis=1)
+
+    labels = [f"{r:g}%" for r in returns]
+    median = pd.DataFrame(median, index=labels)[list(tenures)]
+    reach = pd.DataFrame(reach, index=labels)[list(tenures)] if target else None
+    return median, reach
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Time the Monte Carlo wealth simulation")
+    parser.add_argument("--amount", type=float, default=10_000)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--style", choices=["sip", "lumpsum"], default="sip")
+    parser.add_argument("--paths", type=int, default=200_000)
+    parser.add_argument("--target", type=float, default=2_500_000)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    result = simulate(args.amount, args.years, args.style, paths=args.paths, target=args.target, seed=0)
+    t1 = time.perf_counter()
+    median, reach = sensitivity_grid(args.amount, args.style, target=args.target, seed=0)
+    t2 = time.perf_counter()
+    print(f"{args.paths} paths x {args.years * 12} months: {(t1 - t0) * 1000:.0f} ms")
+    print(f"median final {result.bands[50][-1]:,.0f}, P(target) {result.p_target:.1%}, "
+          f"P(loss) {result.p_loss:.1%}, median max drawdown {np.median(result.max_drawdown):.1%}")
+    print(f"sensitivity grid {median.shape[0]}x{median.shape[1]}: {(t2 - t1) * 1000:.0f} ms")